@@ -0,0 +1,16 @@
+from errbot import BotPlugin, botcmd
+
+from plugins.circuit import breakers
+
+
+class Breakers(BotPlugin):
+    """
+    Reports the circuit breakers of the third party services the plugins
+    use, see ``Breaker``.
+    """
+
+    @botcmd(admin_only=True)
+    def breakers(self, msg, arg):
+        """Show the state and counters of every circuit breaker."""  # Ignore QuotesBear
+        return ('\n'.join(breaker.stats() for breaker in breakers()) or
+                'No third party service was called yet.')
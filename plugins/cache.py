@@ -0,0 +1,286 @@
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import zlib
+
+log = logging.getLogger(__name__)
+
+
+class CachedResource:
+    """
+    A remote JSON document kept in memory.
+
+    The document is served from memory for ``ttl`` seconds. Once it expires
+    it is revalidated with the ``ETag`` and ``Last-Modified`` validators the
+    server sent along with it, so an unchanged document costs a ``304``
+    instead of a full download. Meanwhile the expired document keeps being
+    served, only the very first download is waited for, and concurrent
+    callers wait on that single request instead of issuing their own.
+
+    With ``persist_to`` the last good document is also kept on disk, so a
+    restarted process can serve it right away.
+    """
+
+    def __init__(self, fetch, ttl, transform=None):
+        """
+        :param fetch:     Callable taking a dict of extra request headers and
+                          returning a ``requests.Response``.
+        :param ttl:       Number of seconds a fetched document stays fresh.
+        :param transform: Optional callable applied once to every freshly
+                          downloaded document, its result is what ``get``
+                          returns.
+        """
+        self.fetch = fetch
+        self.ttl = ttl
+        self.transform = transform or (lambda x: x)
+        self.snapshot_path = None
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+        self._document = None
+        self._value = None
+        self._etag = None
+        self._last_modified = None
+        self._fetched_at = None
+        self._restored = False
+        # Guards the state above, never held during a request.
+        self._lock = threading.Lock()
+        # Held by the single request running, which others wait on.
+        self._fetch_lock = threading.Lock()
+        self._revalidating = False
+
+    @property
+    def age(self):
+        """Seconds since the document was last fetched or revalidated."""  # Ignore QuotesBear
+        if self._fetched_at is None:
+            return None
+        return time.time() - self._fetched_at
+
+    @property
+    def fresh(self):
+        return (not self._restored and self._fetched_at is not None and
+                self.age < self.ttl)
+
+    def get(self):
+        """
+        Return the document. An expired document is returned as is and
+        revalidated in the background, only a missing one is waited for.
+        """
+        value = self._cached()
+        if value is None:
+            with self._fetch_lock:
+                # Downloaded by another caller meanwhile, most likely.
+                value = self._cached()
+                if value is None:
+                    with self._lock:
+                        self.misses += 1
+                    value = self._refresh()
+        return value
+
+    def refresh(self):
+        """Fetch or revalidate the document now, whether expired or not."""  # Ignore QuotesBear
+        with self._fetch_lock:
+            return self._refresh()
+
+    def _cached(self):
+        with self._lock:
+            if self.fresh:
+                self.hits += 1
+            elif self._value is not None:
+                self.stale_hits += 1
+                self._revalidate_in_background()
+            return self._value
+
+    def invalidate(self):
+        """Mark the document as expired, keeping it for revalidation."""  # Ignore QuotesBear
+        with self._lock:
+            self._fetched_at = None
+
+    def persist_to(self, path):
+        """
+        Keep the last good document in the file at ``path`` and, unless a
+        document is already loaded, serve the one stored there. A restored
+        document is revalidated on first use.
+        """
+        with self._lock:
+            self.snapshot_path = path
+            if self._value is not None:
+                return
+            try:
+                with open(path, 'rb') as snapshot:
+                    state = json.loads(
+                        zlib.decompress(snapshot.read()).decode())
+            except (OSError, ValueError, zlib.error):
+                log.debug('No usable snapshot at {}'.format(path))
+                return
+            self._value = self.transform(state['document'])
+            self._document = state['document']
+            self._etag = state['etag']
+            self._last_modified = state['last_modified']
+            self._fetched_at = state['fetched_at']
+            self._restored = True
+
+    def _revalidate_in_background(self):
+        if not self._revalidating:
+            self._revalidating = True
+            threading.Thread(target=self._background_refresh,
+                             daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception:
+            log.exception('Could not revalidate, still serving the expired '
+                          'document.')
+        finally:
+            with self._lock:
+                self._revalidating = False
+
+    def _refresh(self):
+        # Called with the fetch lock held. The state lock is only taken to
+        # read the validators and to swap in the result, so that readers
+        # are served the current document while the request runs.
+        with self._lock:
+            cached = self._value is not None
+            headers = {}
+            if cached:
+                if self._etag:
+                    headers['If-None-Match'] = self._etag
+                if self._last_modified:
+                    headers['If-Modified-Since'] = self._last_modified
+
+        response = self.fetch(headers)
+        if response.status_code == 304 and cached:
+            with self._lock:
+                self.revalidations += 1
+                self._fetched_at = time.time()
+                self._restored = False
+        else:
+            response.raise_for_status()
+            document = response.json()
+            value = self.transform(document)
+            with self._lock:
+                self._document = document
+                self._value = value
+                self._etag = response.headers.get('ETag')
+                self._last_modified = response.headers.get('Last-Modified')
+                self._fetched_at = time.time()
+                self._restored = False
+        self._store_snapshot()
+        return self._value
+
+    def _store_snapshot(self):
+        with self._lock:
+            if self.snapshot_path is None:
+                return
+            state = {'document': self._document,
+                     'etag': self._etag,
+                     'last_modified': self._last_modified,
+                     'fetched_at': self._fetched_at}
+        try:
+            fd, tmp = tempfile.mkstemp(
+                dir=os.path.dirname(self.snapshot_path))
+            with os.fdopen(fd, 'wb') as snapshot:
+                snapshot.write(zlib.compress(json.dumps(state).encode()))
+            os.replace(tmp, self.snapshot_path)
+        except OSError:
+            log.exception('Could not store the snapshot')
+
+    def stats(self):
+        """Human readable summary of the counters of this cache."""  # Ignore QuotesBear
+        age = ('never fetched' if self.age is None
+               else 'fetched {:.0f}s ago'.format(self.age))
+        return '{} hits, {} stale hits, {} misses, {} revalidated, {}'.format(
+            self.hits, self.stale_hits, self.misses, self.revalidations, age)
+
+
+class ResultCache:
+    """
+    A least recently used mapping of bounded size whose entries expire
+    after ``ttl`` seconds.
+
+    Entries are stamped with the wall clock time, so a cache restored with
+    ``entries()`` of a previous process keeps expiring at the right time.
+    """
+
+    def __init__(self, size, ttl, entries=()):
+        """
+        :param size:    Number of entries after which the least recently used
+                        ones are dropped.
+        :param ttl:     Number of seconds an entry is kept.
+        :param entries: ``(key, stored_at, value)`` tuples as returned by
+                        ``entries()``.
+        """
+        self.size = size
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        for key, stored_at, value in entries:
+            self._entries[key] = (stored_at, value)
+        self._evict()
+
+    @staticmethod
+    def key(*parts):
+        """
+        Content address of the given JSON serializable ``parts``, equal for
+        equal parts regardless of the order of dictionary keys.
+        """
+        normalized = json.dumps(parts, sort_keys=True)
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0
+
+    def get(self, key):
+        """Return the value stored for ``key`` or None."""  # Ignore QuotesBear
+        with self._lock:
+            stored_at, value = self._entries.get(key, (None, None))
+            if stored_at is None or stored_at < time.time() - self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def entries(self):
+        """The entries of the cache, least recently used first."""  # Ignore QuotesBear
+        with self._lock:
+            return [(key, stored_at, value)
+                    for key, (stored_at, value) in self._entries.items()]
+
+    def _evict(self):
+        expired = time.time() - self.ttl
+        for key in [key for key, (stored_at, _) in self._entries.items()
+                    if stored_at < expired]:
+            del self._entries[key]
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        """Human readable summary of the counters of this cache."""  # Ignore QuotesBear
+        return '{} hits, {} misses ({:.0%} hit ratio), {} stored'.format(
+            self.hits, self.misses, self.hit_ratio, len(self))
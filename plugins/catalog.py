@@ -0,0 +1,183 @@
+from collections import Counter, defaultdict
+import re
+
+
+class BearIndex:
+    """
+    Lookup tables built once from a ``/list/bears`` document.
+
+    Languages are casefolded, so answering which bears support a language
+    is a dictionary lookup however the catalog or the user spells it.
+    """
+
+    # Common names of languages which the catalog spells differently.
+    ALIASES = {
+        'cpp': 'c++',
+        'golang': 'go',
+        'js': 'javascript',
+        'md': 'markdown',
+        'py': 'python',
+        'py2': 'python 2',
+        'py3': 'python 3',
+        'rst': 'restructuredtext',
+        'shell': 'sh',
+    }
+
+    def __init__(self, bears):
+        """
+        :param bears: The decoded ``/list/bears`` document, a dict mapping
+                      bear names to their info.
+        """
+        self.bears = bears
+        self.names = {name.casefold(): name for name in bears}
+        self.languages = set()
+        self._search = None
+
+        by_language = defaultdict(set)
+        for name, info in bears.items():
+            for language in info['languages']:
+                self.languages.add(language)
+                by_language[language.casefold()].add(name)
+        self.by_language = {language: sorted(names)
+                            for language, names in by_language.items()}
+
+        # Chat commands split on whitespace, so `python3` has to find the
+        # bears of `Python 3`.
+        self.aliases = {language.replace(' ', ''): language
+                        for language in self.by_language
+                        if ' ' in language}
+        for alias, language in self.ALIASES.items():
+            if language in self.by_language:
+                self.aliases.setdefault(alias, language)
+
+    def __len__(self):
+        return len(self.bears)
+
+    @property
+    def search(self):
+        """The ``BearSearch`` of the catalog, built on first use."""  # Ignore QuotesBear
+        if self._search is None:
+            self._search = BearSearch(self.bears)
+        return self._search
+
+    def resolve(self, language):
+        """Return the casefolded catalog spelling of ``language``."""  # Ignore QuotesBear
+        language = language.casefold()
+        if language in self.by_language:
+            return language
+        return self.aliases.get(language, language)
+
+    def bears_for(self, language):
+        """Return the sorted names of the bears supporting ``language``."""  # Ignore QuotesBear
+        return self.by_language.get(self.resolve(language), [])
+
+    def find_bear(self, name):
+        """
+        Return the catalog spelling of the bear called ``name``, with or
+        without the ``Bear`` suffix, in any case or misspelled. None if
+        there's no such bear.
+        """
+        folded = name.casefold()
+        for candidate in (folded, folded + 'bear'):
+            if candidate in self.names:
+                return self.names[candidate]
+        matches = self.search.search(name, limit=1)
+        return matches[0] if matches else None
+
+
+class BearSearch:
+    """
+    Fuzzy full text search over the names, languages and descriptions of
+    the bears of a catalog, the fields ``/list/bears`` sends.
+
+    Texts are split into casefolded tokens, ``PyLintBear`` giving ``py``,
+    ``lint`` and ``pylint``. Tokens are indexed by their trigrams, so a
+    misspelled query token still finds the tokens it shares most trigrams
+    with.
+    """
+
+    # Weight of a match in each field of a bear.
+    FIELDS = (
+        ('name', 4),
+        ('languages', 2),
+        ('desc', 1),
+    )
+
+    STOP_WORDS = {'a', 'an', 'and', 'bear', 'for', 'in', 'is', 'it', 'of',
+                  'on', 'the', 'this', 'to', 'with'}
+
+    # Trigram similarity from which two tokens are considered the same.
+    MIN_SIMILARITY = 0.3
+
+    def __init__(self, bears):
+        self.postings = defaultdict(dict)
+        self.trigrams = defaultdict(set)
+        for name, info in bears.items():
+            info = dict(info, name=name)
+            for field, weight in self.FIELDS:
+                for token in self.tokenize(info.get(field) or ''):
+                    postings = self.postings[token]
+                    postings[name] = max(postings.get(name, 0), weight)
+        for token in self.postings:
+            for trigram in self.grams(token):
+                self.trigrams[trigram].add(token)
+
+    @classmethod
+    def tokenize(cls, text):
+        if not isinstance(text, str):
+            text = ' '.join(text)
+        tokens = set()
+        for word in re.findall(r'\w+', text):
+            tokens.add(word.casefold())
+            tokens.update(part.casefold() for part in re.findall(
+                r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+', word))
+        return tokens - cls.STOP_WORDS
+
+    @staticmethod
+    def grams(token):
+        padded = ' {} '.format(token)
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def similar(self, token):
+        """
+        Yield the indexed tokens similar to ``token`` with their similarity.
+        """
+        grams = self.grams(token)
+        shared = Counter(candidate for trigram in grams
+                         for candidate in self.trigrams.get(trigram, ()))
+        for candidate, count in shared.items():
+            similarity = count / (len(grams) + len(self.grams(candidate)) -
+                                  count)
+            if similarity >= self.MIN_SIMILARITY:
+                yield candidate, similarity
+
+    def search(self, query, limit=10):
+        """Return the names of the bears matching ``query`` best first."""  # Ignore QuotesBear
+        scores = Counter()
+        for token in self.tokenize(query):
+            for candidate, similarity in self.similar(token):
+                for name, weight in self.postings[candidate].items():
+                    scores[name] += weight * similarity
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+        return [name for name, _ in ranked[:limit]]
+
+
+class ContributorIndex:
+    """
+    Contributors from a ``/contrib/`` document keyed by casefolded login.
+    """
+
+    def __init__(self, contributors):
+        """
+        :param contributors: The decoded ``/contrib/`` document, a list of
+                             users.
+        """
+        self.by_login = {user['login'].casefold(): user
+                         for user in contributors}
+
+    def __len__(self):
+        return len(self.by_login)
+
+    def get(self, login):
+        """Return the user with the given login or None."""  # Ignore QuotesBear
+        return self.by_login.get(login.casefold())
@@ -0,0 +1,146 @@
+from collections import OrderedDict
+import math
+import threading
+import time
+
+from errbot import CommandError
+
+from plugins import constants
+
+
+class CircuitOpen(CommandError):
+    """
+    Raised instead of calling a service which is down. Being a
+    ``CommandError``, errbot replies with the message alone.
+    """
+
+    def __init__(self, name, retry_in):
+        super().__init__('{} is not answering at the moment, please try '
+                         'again in {} seconds.'.format(name,
+                                                       math.ceil(retry_in)))
+
+
+class Breaker:
+    """
+    Fails calls to a service right away while it's down, rather than
+    having each of them wait for the service to time out.
+
+    The breaker trips after ``failures`` consecutive failed or slow calls.
+    Calls then fail with ``CircuitOpen`` for ``reset`` seconds, after which
+    one call at a time is let through as trial: the breaker closes again if
+    it succeeds and trips again if it fails.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half open'
+
+    def __init__(self, name, failures, slow, reset):
+        """
+        :param name:     Name of the service, told to users.
+        :param failures: Number of consecutive failures after which the
+                         breaker trips.
+        :param slow:     Seconds after which a call counts as failed, even if
+                         it succeeded.
+        :param reset:    Seconds the breaker stays open before a trial.
+        """
+        self.name = name
+        self.failures = failures
+        self.slow = slow
+        self.reset = reset
+
+        self.calls = 0
+        self.rejected = 0
+        self.trips = 0
+
+        self._failed = 0
+        self._opened = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def _state(self):
+        if self._opened is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened < self.reset:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def call(self, function, *args, **kwargs):
+        """
+        Return ``function(*args, **kwargs)``, which fails if it raises, or
+        if it returns an HTTP response with a server error status.
+
+        :raises CircuitOpen: If the breaker is open or a trial is running.
+        """
+        with self._lock:
+            state = self._state()
+            if state == self.OPEN or (state == self.HALF_OPEN and
+                                      self._trial):
+                self.rejected += 1
+                raise CircuitOpen(self.name, max(
+                    self._opened + self.reset - time.monotonic(), 1))
+            self._trial = state == self.HALF_OPEN
+            self.calls += 1
+
+        start = time.monotonic()
+        try:
+            result = function(*args, **kwargs)
+        except Exception:
+            self._done(failed=True)
+            raise
+        self._done(failed=time.monotonic() - start > self.slow or
+                   getattr(result, 'status_code', 0) >= 500)
+        return result
+
+    def _done(self, failed):
+        with self._lock:
+            self._trial = False
+            if not failed:
+                self._failed = 0
+                self._opened = None
+                return
+            self._failed += 1
+            # A failed trial opens the breaker again at once.
+            if self._opened is not None or self._failed >= self.failures:
+                if self._opened is None:
+                    self.trips += 1
+                self._opened = time.monotonic()
+
+    def stats(self):
+        """Human readable summary of the state of this breaker."""  # Ignore QuotesBear
+        with self._lock:
+            return ('{}: {}, {} failures in a row, {} calls, {} rejected, '
+                    'tripped {} times'.format(
+                        self.name, self._state(), self._failed, self.calls,
+                        self.rejected, self.trips))
+
+
+_breakers = OrderedDict()
+_breakers_lock = threading.Lock()
+
+
+def breaker(name, slow=None):
+    """
+    The ``Breaker`` of the service ``name``, shared by the plugins.
+
+    :param slow: Seconds after which a call counts as failed, by default
+                 ``BREAKER_SLOW``. Only used when the breaker is created.
+    """
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = Breaker(
+                name, failures=constants.BREAKER_FAILURES,
+                slow=constants.BREAKER_SLOW if slow is None else slow,
+                reset=constants.BREAKER_RESET)
+        return _breakers[name]
+
+
+def breakers():
+    """Every breaker, in the order they were created."""  # Ignore QuotesBear
+    with _breakers_lock:
+        return list(_breakers.values())
@@ -1,31 +1,46 @@
 import random
-import re
 
 from errbot import BotPlugin
 
+from plugins.dispatch import Dispatcher
+
 
 class Coala_lowercase_c(BotPlugin):
     """coala is always written with a lower case c."""  # Ignore QuotesBear
 
-    def callback_message(self, msg):
+    def activate(self):
+        super().activate()
+        dispatcher = Dispatcher.of(self._bot)
+        # The keywords are parts of any match of the patterns, casefolded.
+        self.triggers = [
+            dispatcher.register(
+                'coala', r'(?:^|[^\w])C+[Oo]+[Aa]+[Ll]+[Aa]+(?:$|[^\w])',
+                self.lowercase_coala, keywords=('oa',)),
+            dispatcher.register(
+                'cEP', r'(?:^|[^\w])CEP(?:$|[^\w])',
+                self.lowercase_cep, keywords=('cep',)),
+        ]
+
+    def deactivate(self):
+        dispatcher = Dispatcher.of(self._bot)
+        for trigger in self.triggers:
+            dispatcher.unregister(trigger)
+        super().deactivate()
+
+    def lowercase_coala(self, msg, match):
         emots = [':(', ':angry:', ':confounded:',
                  ':disappointed:', ':triumph:']
-
-        match_coala = re.search(r'(?:^|[^\w])C+[Oo]+[Aa]+[Ll]+[Aa]+(?:$|[^\w])',
-                                msg.body)
-        if match_coala:
-            self.send(
-                msg.frm,
-                '@{}, coala is always written with a lower case c. {}'.format(
-                    msg.frm.nick, emots[random.randint(0, len(emots) - 1)]
-                )
+        self.send(
+            msg.frm,
+            '@{}, coala is always written with a lower case c. {}'.format(
+                msg.frm.nick, emots[random.randint(0, len(emots) - 1)]
             )
+        )
 
-        match_cep = re.search(r'(?:^|[^\w])CEP(?:$|[^\w])', msg.body)
-        if match_cep:
-            self.send(
-                msg.frm,
-                '@{}, cEP is always written with a lower case c.'.format(
-                    msg.frm.nick
-                )
+    def lowercase_cep(self, msg, match):
+        self.send(
+            msg.frm,
+            '@{}, cEP is always written with a lower case c.'.format(
+                msg.frm.nick
             )
+        )
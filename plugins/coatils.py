@@ -2,13 +2,43 @@ from collections import OrderedDict
 import json
 import os
 import textwrap
+import threading
 
 import requests
-from ramlient import Client
 
-from errbot import BotPlugin, re_botcmd
+from errbot import BotPlugin, botcmd, re_botcmd
 
-client = Client('webservices.raml')
+from plugins import constants, sessions
+from plugins.cache import CachedResource, ResultCache
+from plugins.catalog import BearIndex, ContributorIndex
+from plugins.circuit import CircuitOpen, breaker
+from plugins.jobs import JobQueue, QueueFull
+from plugins.webservices import LazyClient, RAML_PATH
+
+client = LazyClient(RAML_PATH)
+
+# Seconds after which a `run` gives up waiting for coala online.
+RUN_TIMEOUT = constants.COATILS_RUN_TIMEOUT
+
+
+def uri(*path):
+    """The URI of the RAML node at ``path``."""  # Ignore QuotesBear
+    node = client
+    for name in path:
+        node = getattr(node, name)
+    return node.resource.absolute_uri
+
+
+def fetcher(*path):
+    """
+    Build a ``CachedResource`` fetch function for the RAML node at ``path``.
+    ramlient doesn't let us pass request headers nor a session, so only the
+    URI is taken from the spec.
+    """
+    def fetch(headers):
+        return breaker('coala webservices').call(
+            sessions.shared().get, uri(*path), headers=headers)
+    return fetch
 
 
 class Coatils(BotPlugin):
@@ -16,24 +46,76 @@ class Coatils(BotPlugin):
     Various coala related utilities, exposing the REST API, etc.
     """
 
+    # Shared by all commands, so a busy room costs one download per TTL.
+    catalog = CachedResource(fetcher('list', 'bears'),
+                             ttl=constants.COATILS_CACHE_TTL,
+                             transform=BearIndex)
+    contributors = CachedResource(fetcher('contrib'),
+                                  ttl=constants.COATILS_CACHE_TTL,
+                                  transform=ContributorIndex)
+
     def __init__(self, bot, name=None):
         super().__init__(bot, name)
 
+    def activate(self):
+        super().activate()
+        data_dir = self.bot_config.BOT_DATA_DIR
+        client.cache_dir = data_dir
+        Coatils.catalog.persist_to(os.path.join(data_dir, 'bears.snapshot'))
+        Coatils.contributors.persist_to(
+            os.path.join(data_dir, 'contributors.snapshot'))
+        self.jobs = JobQueue(workers=constants.COATILS_RUN_WORKERS,
+                             max_jobs=constants.COATILS_RUN_QUEUE,
+                             max_per_user=constants.COATILS_RUN_PER_USER)
+        self.results = ResultCache(size=constants.COATILS_RESULT_CACHE_SIZE,
+                                   ttl=constants.COATILS_RESULT_CACHE_TTL,
+                                   entries=self.get('run results', ()))
+        self._results_lock = threading.Lock()
+        self.details = ResultCache(size=constants.COATILS_RESULT_CACHE_SIZE,
+                                   ttl=constants.COATILS_CACHE_TTL)
+        self._pages = dict()
+        self._pages_lock = threading.Lock()
+        self.start_poller(constants.COATILS_CACHE_TTL,
+                          self.refresh_contributors)
+
+    def deactivate(self):
+        self.jobs.shutdown()
+        super().deactivate()
+
+    def refresh_contributors(self):
+        """
+        Revalidate the contributor index from the poller. ``contrib stats``
+        keeps being answered with the current index meanwhile, rather than
+        waiting on the download.
+        """
+        Coatils.contributors.refresh()
+
+    @staticmethod
+    def staleness(resource):
+        """
+        Note telling how old the data of ``resource`` is if it's expired, an
+        empty string otherwise.
+        """
+        if resource.fresh or resource.age is None:
+            return ''
+        return ('This data is {} old, it is being refreshed.'.format(
+            Coatils.duration(resource.age)))
+
+    @staticmethod
+    def duration(seconds):
+        for unit, length in (('day', 86400), ('hour', 3600), ('minute', 60)):
+            if seconds >= length:
+                count = int(seconds // length)
+                return '{} {}{}'.format(count, unit, 's' if count > 1 else '')
+        return '{} seconds'.format(int(seconds))
+
     @staticmethod
     def total_bears():
-        bears = client.list.bears.get().json()
-        return len(bears.keys())
+        return len(Coatils.catalog.get())
 
     @staticmethod
     def all_langs():
-        bears = client.list.bears.get().json()
-        langs_list = list(map(lambda x: x['languages'], bears.values()))
-        all_langs = []
-        for ls in langs_list:
-            for lang in ls:
-                all_langs.append(lang)
-
-        return set(all_langs)
+        return Coatils.catalog.get().languages
 
     @re_botcmd(pattern=r'(?:(contrib|bear|lang)\s+)?stats(.+)?(?:(?:\s+)|$)')
     def contrib_stats(self, msg, match):
@@ -51,42 +133,31 @@ class Coatils(BotPlugin):
 
         # contrib stats user
         if stat_type == 'contrib' and entity != '':
-            try:
-                res = list(
-                        filter(
-                            lambda x: x['login'].lower() == entity.lower(),
-                            client.contrib.get().json()
-                        ))[0]
-            except IndexError:
+            res = Coatils.contributors.get().get(entity)
+            if res is None:
                 yield 'stats for {} not found'.format(entity)
-                return
-
-            commits = res['contributions']
-            issues = res['issues']
-            reviews = res['reviews']
+            else:
+                commits = res['contributions']
+                issues = res['issues']
+                reviews = res['reviews']
 
-            success = ('User {} has:\n'
-                       '1. Opened {} issues\n'
-                       '2. Commited {} commits\n'
-                       '3. Done {} reviews'.format(entity, issues,
-                                                   commits, reviews))
+                success = ('User {} has:\n'
+                           '1. Opened {} issues\n'
+                           '2. Commited {} commits\n'
+                           '3. Done {} reviews'.format(entity, issues,
+                                                       commits, reviews))
 
-            yield success
+                yield success
 
         # bear stats
         elif stat_type == 'bear' and entity == '':
             yield 'There are total {} bears.'.format(Coatils.total_bears())
         # bear stats lang
         elif stat_type == 'bear' and entity != '':
-            bears = client.list.bears.get().json()
-            all_langs = Coatils.all_langs()
-            if entity in map(lambda x: x.lower(), all_langs):
-                selected_bears = filter(lambda x: entity in list(map(
-                                            lambda y: y.lower(), x['languages']
-                                        )),
-                                        bears.values())
+            selected_bears = Coatils.catalog.get().bears_for(entity)
+            if selected_bears:
                 yield 'There are {} bears for {} language'.format(
-                    len(list(selected_bears)), entity
+                    len(selected_bears), entity
                 )
             else:
                 yield 'No bear exists for {} language'.format(entity)
@@ -101,6 +172,12 @@ class Coatils(BotPlugin):
                    ''.format(Coatils.total_bears(),
                              len(Coatils.all_langs())))
 
+        note = Coatils.staleness(Coatils.contributors
+                                 if stat_type == 'contrib' else
+                                 Coatils.catalog)
+        if note:
+            yield note
+
     @re_botcmd(pattern=r'ls\s+bears\s+((?:[\w\+]+(?:\s+)?)+)')
     def ls(self, msg, match):
         """
@@ -108,19 +185,10 @@ class Coatils(BotPlugin):
         Example: `ls bears python python3`
         """
         langs = list(map(lambda x: x.lower(), match.group(1).split()))
-        all_langs = Coatils.all_langs()
-
-        bears = client.list.bears.get().json()
-        bears = [{**{'name': bear}, **content}
-                 for bear, content in bears.items()]
+        index = Coatils.catalog.get()
 
         for lang in langs:
-            selected_bears = [
-                ' | ' + bear['name'] for bear in filter(lambda x: lang in list(
-                    map(lambda y: y.lower(), x['languages'])),
-                    bears
-                )
-            ]
+            selected_bears = [' | ' + bear for bear in index.bears_for(lang)]
 
             if selected_bears:
                 yield 'Bears for {} are: '.format(lang)
@@ -128,6 +196,96 @@ class Coatils(BotPlugin):
             else:
                 yield 'No bears found for {}'.format(lang)
 
+        note = Coatils.staleness(Coatils.catalog)
+        if note:
+            yield note
+
+    @botcmd
+    def bear_search(self, msg, arg):
+        """
+        Search bears by name, language and description.
+        Example: `bear search unused imports`
+        """
+        bears = Coatils.catalog.get().search.search(arg)
+        if not bears:
+            reply = 'No bears found for {}'.format(arg)
+        else:
+            reply = 'Bears matching {} are:\n{} |'.format(
+                arg, ''.join(' | ' + bear for bear in bears))
+        return '\n'.join(filter(None, (reply,
+                                       Coatils.staleness(Coatils.catalog))))
+
+    @botcmd
+    def bear_info(self, msg, arg):
+        """
+        Show what a bear does and how to configure it.
+        Example: `bear info pylint`
+        """
+        index = Coatils.catalog.get()
+        name = index.find_bear(arg)
+        if name is None:
+            return 'No bear found for {}'.format(arg)
+
+        info = index.bears[name]
+        details = self.bear_details(name)
+        metadata = details.get('metadata') or {}
+        lines = ['{} ({})'.format(name, ', '.join(info['languages'])),
+                 info.get('desc', '')]
+        for title, values in (
+                ('Can detect', details.get('CAN_DETECT')),
+                ('Can fix', details.get('CAN_FIX')),
+                ('Required settings', metadata.get('non_optional_params')),
+                ('Optional settings', metadata.get('optional_params'))):
+            if values:
+                lines.append('{}: {}'.format(title, ', '.join(values)))
+        lines.append(Coatils.staleness(Coatils.catalog))
+        return '\n'.join(filter(None, lines))
+
+    def bear_details(self, name):
+        """
+        Return the full description of a bear from ``/search/bears``, or an
+        empty dict if it can't be fetched.
+        """
+        details = self.details.get(name)
+        if details is None:
+            try:
+                rq = breaker('coala webservices').call(
+                    sessions.shared().get, uri('search', 'bears'),
+                    params={'bear': name})
+                rq.raise_for_status()
+                details = rq.json()
+            except (requests.RequestException, ValueError, CircuitOpen):
+                self.log.exception('Could not fetch details of {}'.format(name))
+                return {}
+            self.details.put(name, details)
+        return details
+
+    @botcmd(admin_only=True)
+    def coatils_cache(self, msg, arg):
+        """Show the hit and miss counters of the Coatils caches."""  # Ignore QuotesBear
+        return ('Bear catalog: {}\n'
+                'Contributors: {}\n'
+                'Analysis results: {}\n'
+                'Bear details: {}'.format(Coatils.catalog.stats(),
+                                          Coatils.contributors.stats(),
+                                          self.results.stats(),
+                                          self.details.stats()))
+
+    @botcmd
+    def run_status(self, msg, arg):
+        """Show the queued and running coala analyses."""  # Ignore QuotesBear
+        jobs = self.jobs.jobs
+        if not jobs:
+            return 'No coala analysis is queued.'
+        running = [job for job in jobs if job.running]
+        lines = ['{} queued, {} running:'.format(len(jobs) - len(running),
+                                                 len(running))]
+        for job in jobs:
+            lines.append('- #{} by @{}: {} for {:.1f}s'.format(
+                job.id, job.user, 'running' if job.running else 'queued',
+                job.elapsed))
+        return '\n'.join(lines)
+
     @staticmethod
     def construct_settings(settings):
         settings = settings.strip().split()
@@ -175,8 +333,6 @@ class Coatils(BotPlugin):
         code = match.group(3) + ('\n' if not match.group(3).endswith('\n')
                                  else '')
 
-        yield 'coala analysis in progress...'
-
         data = {
             "sections": {
                 "corobo": {
@@ -189,8 +345,60 @@ class Coatils(BotPlugin):
             "file_data": code,
         }
 
-        # Ignore InvalidLinkBear, this only accepts post requests
-        rq = requests.post('https://api.gitmate.io/coala_online/', json=data)
+        # Identical requests get identical analyses, so they are answered
+        # from the cache without asking coala online again.
+        key = ResultCache.key(lang.casefold(), bear_settings, code)
+        results = self.results.get(key)
+        if results is not None:
+            yield self.page(msg, self.render(results))
+            return
+
+        try:
+            job = self.jobs.reserve(msg.frm.nick)
+        except QueueFull as exc:
+            yield str(exc)
+        else:
+            # Started only once the reply is sent, so that it can't arrive
+            # after the results. If sending it fails, or the command is
+            # closed meanwhile, the place in the queue is given up.
+            try:
+                yield 'coala analysis #{} in progress...'.format(job.id)
+            except BaseException:
+                self.jobs.release(job)
+                raise
+            self.jobs.start(job, self.analyse, msg, key, data)
+
+    def analyse(self, job, msg, key, data):
+        """
+        Run a queued analysis and post its results to where it was asked for.
+        """
+        try:
+            chunks = self.coala_online(key, data)
+            self.send(msg.frm, self.page(msg, chunks))
+        except Exception:
+            self.log.exception('coala analysis #{} failed'.format(job.id))
+            self.send(msg.frm, 'coala analysis #{} failed :('.format(job.id))
+
+    def coala_online(self, key, data):
+        """
+        Send an analysis request to coala online and cache its results under
+        ``key``.
+
+        :return: The text describing the results, a chunk per result.
+        """
+        try:
+            # Analyses take long, only those close to timing out are slow.
+            # Ignore InvalidLinkBear, this only accepts post requests
+            rq = breaker('coala online', slow=RUN_TIMEOUT / 2).call(
+                sessions.shared().post,
+                'https://api.gitmate.io/coala_online/', json=data,
+                timeout=sessions.timeout(RUN_TIMEOUT))
+        except CircuitOpen as exc:
+            return [str(exc)]
+        except requests.RequestException:
+            self.log.exception('coala online could not be reached')
+            return ['coala online could not be reached, please try again '
+                    'later.']
         try:
             results = rq.json()['response']['results']['corobo']
         except json.JSONDecodeError:
@@ -200,43 +408,135 @@ class Coatils(BotPlugin):
                 'Are all required settings provided? If a required setting is '
                 'not provided, analysis will fail.'
             ])
-            yield 'Something went wrong, things to check for:\n' + went_wrong
             self.log.exception('Something went wrong, please try again')
-        else:
-            if not results:
-                yield 'Your code is flawless :tada:'
-                return
-            result_message = 'Here is what I think is wrong: \n'
-            for result in results:
-                affected_area = []
-                for afc in result['affected_code']:
-                    affected_area.append((afc['start']['line'],
-                                          afc['start']['column'],
-                                          afc['end']['line'],
-                                          afc['end']['column']))
-
-                afm = '\n'.join([Coatils.position(stl, stc, enl, enc)
-                                 for (stl, stc, enl, enc) in affected_area])
-
-                message = result['message']
-                origin = result['origin']
-                diffs = []
-                if result['diffs']:
-                    for _, diff in result['diffs'].items():
-                        diffs.append(diff)
-
-                diff_message = ''
-                if diffs:
-                    diff_message += ('These patches can help solve the '
-                                     'issue: \n')
-                    for diff in diffs:
-                        diff = ''.join(diff.splitlines(True)[2:])
-                        diff_message += '```diff\n{}```\n'.format(
-                            textwrap.indent(diff, '   ')
-                        )
-
-                result_message += '- {} - {} :\n{}{diff}\n'.format(
-                    origin, afm, message, diff=diff_message
-                )
+            return ['Something went wrong, things to check for:\n' +
+                    went_wrong]
+        except (KeyError, TypeError):
+            # e.g. the error coala online sends along with a server error.
+            self.log.error('coala online sent a {} response without results: '
+                           '{}'.format(rq.status_code, rq.text[:200]))
+            return ['coala online could not analyse the code (HTTP {}), '
+                    'please try again later.'.format(rq.status_code)]
+        self.remember(key, results)
+        return self.render(results)
+
+    def remember(self, key, results):
+        with self._results_lock:
+            self.results.put(key, results)
+            self['run results'] = self.results.entries()
+
+    def page(self, msg, chunks):
+        """
+        Return the first page of text out of ``chunks`` and keep the
+        following ones, still unformatted, for the ``run more`` command of
+        the user who sent ``msg``.
+        """
+        pages = Coatils.paginate(chunks, constants.COATILS_RUN_PAGE_SIZE)
+        page, more = next(pages)
+        with self._pages_lock:
+            if more:
+                self._pages[msg.frm.nick] = pages
+            else:
+                self._pages.pop(msg.frm.nick, None)
+        return self.hint(page, more)
+
+    def hint(self, page, more):
+        if more:
+            return page + ('\nThere is more, use `{}run more` to see the '
+                           'next page.'.format(self.bot_config.BOT_PREFIX))
+        return page
+
+    @botcmd
+    def run_more(self, msg, arg):
+        """Show the next page of the results of your last analysis."""  # Ignore QuotesBear
+        user = msg.frm.nick
+        # Taken out while the page is formatted, so that only the pages of
+        # the same user are held up meanwhile.
+        with self._pages_lock:
+            pages = self._pages.pop(user, None)
+        if pages is None:
+            return 'There are no more results.'
+        page, more = next(pages)
+        if more:
+            with self._pages_lock:
+                # Unless the results of a newer analysis came in meanwhile.
+                self._pages.setdefault(user, pages)
+        return self.hint(page, more)
+
+    @staticmethod
+    def paginate(chunks, size):
+        """
+        Group the text chunks into pages of at most ``size`` characters.
+        Chunks are only consumed as pages are requested.
+
+        :return: Generator of ``(page, more)`` tuples, ``more`` tells if
+                 another page follows.
+        """
+        page = ''
+        for chunk in chunks:
+            for piece in Coatils.split(chunk, size):
+                if page and len(page) + len(piece) > size:
+                    yield page, True
+                    page = ''
+                page += piece
+        yield page, False
 
-            yield result_message
+    @staticmethod
+    def split(text, size):
+        """
+        Split ``text`` into pieces of at most ``size`` characters, at line
+        boundaries where possible.
+        """
+        if len(text) <= size:
+            return [text]
+        pieces = ['']
+        for line in text.splitlines(True):
+            while len(line) > size:
+                pieces.append(line[:size])
+                line = line[size:]
+            if len(pieces[-1]) + len(line) > size:
+                pieces.append('')
+            pieces[-1] += line
+        return [piece for piece in pieces if piece]
+
+    @staticmethod
+    def render(results):
+        """
+        Yield the text describing the results of an analysis, a chunk per
+        result.
+        """
+        if not results:
+            yield 'Your code is flawless :tada:'
+            return
+        yield 'Here is what I think is wrong: \n'
+        for result in results:
+            affected_area = []
+            for afc in result['affected_code']:
+                affected_area.append((afc['start']['line'],
+                                      afc['start']['column'],
+                                      afc['end']['line'],
+                                      afc['end']['column']))
+
+            afm = '\n'.join([Coatils.position(stl, stc, enl, enc)
+                             for (stl, stc, enl, enc) in affected_area])
+
+            message = result['message']
+            origin = result['origin']
+            diffs = []
+            if result['diffs']:
+                for _, diff in result['diffs'].items():
+                    diffs.append(diff)
+
+            diff_message = ''
+            if diffs:
+                diff_message += ('These patches can help solve the '
+                                 'issue: \n')
+                for diff in diffs:
+                    diff = ''.join(diff.splitlines(True)[2:])
+                    diff_message += '```diff\n{}```\n'.format(
+                        textwrap.indent(diff, '   ')
+                    )
+
+            yield '- {} - {} :\n{}{diff}\n'.format(
+                origin, afm, message, diff=diff_message
+            )
@@ -5,3 +5,43 @@ USER_DOCS = 'http://docs.coala.io/en/latest'
 
 GH_ORG_NAME = os.environ.get('GH_ORG_NAME', 'coala')
 GL_ORG_NAME = os.environ.get('GL_ORG_NAME', 'coala')
+LABHUB_DISCOVERY_TIMEOUT = int(os.environ.get('LABHUB_DISCOVERY_TIMEOUT', 10))
+LABHUB_MEMBERS_TTL = int(os.environ.get('LABHUB_MEMBERS_TTL', 600))
+LABHUB_API_RATE = float(os.environ.get('LABHUB_API_RATE', 5))
+LABHUB_API_BURST = int(os.environ.get('LABHUB_API_BURST', 20))
+LABHUB_API_RESERVE = float(os.environ.get('LABHUB_API_RESERVE', 0.2))
+LABHUB_API_MAX_WAIT = int(os.environ.get('LABHUB_API_MAX_WAIT', 30))
+LABHUB_BULK_WORKERS = int(os.environ.get('LABHUB_BULK_WORKERS', 4))
+LABHUB_INVITE_WINDOW = int(os.environ.get('LABHUB_INVITE_WINDOW', 604800))
+LABHUB_REPOS_TTL = int(os.environ.get('LABHUB_REPOS_TTL', 300))
+LABHUB_REPOS_FULL_TTL = int(os.environ.get('LABHUB_REPOS_FULL_TTL', 86400))
+LABHUB_LABELS_TTL = int(os.environ.get('LABHUB_LABELS_TTL', 60))
+LABHUB_CLIENT_CACHE_SIZE = int(os.environ.get('LABHUB_CLIENT_CACHE_SIZE',
+                                              128))
+LABHUB_ISSUE_HOST = os.environ.get('LABHUB_ISSUE_HOST', 'gitlab')
+
+COATILS_CACHE_TTL = int(os.environ.get('COATILS_CACHE_TTL', 300))
+COATILS_RUN_WORKERS = int(os.environ.get('COATILS_RUN_WORKERS', 2))
+COATILS_RUN_QUEUE = int(os.environ.get('COATILS_RUN_QUEUE', 10))
+COATILS_RUN_PER_USER = int(os.environ.get('COATILS_RUN_PER_USER', 1))
+COATILS_RESULT_CACHE_SIZE = int(os.environ.get('COATILS_RESULT_CACHE_SIZE',
+                                               100))
+COATILS_RESULT_CACHE_TTL = int(os.environ.get('COATILS_RESULT_CACHE_TTL',
+                                              86400))
+COATILS_RUN_PAGE_SIZE = int(os.environ.get('COATILS_RUN_PAGE_SIZE', 2000))
+COATILS_RUN_TIMEOUT = float(os.environ.get('COATILS_RUN_TIMEOUT', 120))
+
+GHETTO_TIMEOUT = float(os.environ.get('GHETTO_TIMEOUT', 10))
+WOLFRAM_ALPHA_TIMEOUT = float(os.environ.get('WOLFRAM_ALPHA_TIMEOUT', 10))
+
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 30))
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', 2))
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 10))
+
+PERF_HTTP_SAVE_INTERVAL = int(os.environ.get('PERF_HTTP_SAVE_INTERVAL', 60))
+PERF_PROFILE_TOP = int(os.environ.get('PERF_PROFILE_TOP', 15))
+
+BREAKER_FAILURES = int(os.environ.get('BREAKER_FAILURES', 5))
+BREAKER_SLOW = float(os.environ.get('BREAKER_SLOW', 5))
+BREAKER_RESET = float(os.environ.get('BREAKER_RESET', 60))
@@ -0,0 +1,92 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class Discovery:
+    """
+    Runs slow loaders, e.g. listing every repository of an organization,
+    concurrently in the background and keeps what they return.
+
+    Whatever needs a result waits for its loader only, with a timeout, so
+    that a slow loader doesn't hold back anything else.
+    """
+
+    def __init__(self, loaders, default=dict):
+        """
+        :param loaders: Dict mapping names to callables taking no arguments,
+                        in the order they are reported in.
+        :param default: Callable giving the result of a loader which failed.
+        """
+        self.loaders = loaders
+        self.default = default
+
+        self._results = {}
+        self._done = {name: threading.Event() for name in loaders}
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Run every loader again, in parallel."""  # Ignore QuotesBear
+        with self._lock:
+            for event in self._done.values():
+                event.clear()
+        executor = ThreadPoolExecutor(max_workers=len(self.loaders))
+        for name, loader in self.loaders.items():
+            executor.submit(self._load, name, loader)
+        executor.shutdown(wait=False)
+
+    def _load(self, name, loader):
+        try:
+            result = loader()
+        except Exception:
+            log.exception('Could not load the {}'.format(name))
+            result = self.default()
+        with self._lock:
+            if not self._done[name].is_set():
+                self._results[name] = result
+                self._done[name].set()
+
+    def set(self, name, value):
+        """Replace the result of ``name``, even if it's still loading."""  # Ignore QuotesBear
+        with self._lock:
+            self._results[name] = value
+            self._done[name].set()
+
+    def loaded(self, name):
+        return self._done[name].is_set()
+
+    def wait(self, *names, timeout=None):
+        """
+        Wait for the given loaders, all of them if none is given.
+
+        :return: True if they are all done, False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for name in names or self.loaders:
+            left = (None if deadline is None
+                    else max(deadline - time.monotonic(), 0))
+            if not self._done[name].wait(left):
+                return False
+        return True
+
+    def get(self, name, default=None):
+        """Return the result of ``name``, or ``default`` if it's loading."""  # Ignore QuotesBear
+        with self._lock:
+            return self._results.get(name, default)
+
+    def status(self, *names):
+        """
+        Human readable message telling which of the given loaders, all of
+        them if none is given, are still running.
+        """
+        loading = [name for name in names or self.loaders
+                   if not self.loaded(name)]
+        if not loading:
+            return 'Everything is loaded.'
+        done = sum(self.loaded(name) for name in self.loaders)
+        return ('Still loading the {} ({} of {} loaded), please try again in '
+                'a moment.'.format(', '.join(loading), done,
+                                   len(self.loaders)))
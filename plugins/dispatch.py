@@ -0,0 +1,144 @@
+import logging
+import re
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class Trigger:
+    """
+    A regular expression searched in every chat message, calling
+    ``callback(msg, match)`` when found.
+    """
+
+    def __init__(self, name, pattern, callback, keywords, flags=0):
+        self.name = name
+        self.regex = re.compile(pattern, flags)
+        self.callback = callback
+        self.keywords = tuple(keyword.casefold() for keyword in keywords)
+
+        self.evaluations = 0
+        self.matches = 0
+        self.seconds = 0
+
+    def stats(self):
+        """Human readable summary of the counters of this trigger."""  # Ignore QuotesBear
+        average = self.seconds / self.evaluations if self.evaluations else 0
+        return '{}: {} searches, {} matches, {:.3f} ms per search'.format(
+            self.name, self.evaluations, self.matches, average * 1000)
+
+
+class Dispatcher:
+    """
+    Hands chat messages to the triggers plugins register instead of having
+    every plugin search every message in its ``callback_message``.
+
+    Each trigger names keywords, at least one of which is in any message it
+    matches, ignoring case. All keywords are looked for at once with a
+    single pass of one regular expression over the casefolded message, and
+    only the triggers whose keywords were found search the message with
+    their own regular expression.
+    """
+
+    _of_lock = threading.Lock()
+
+    def __init__(self):
+        self.messages = 0
+        self.candidates = 0
+        self.seconds = 0
+
+        self._triggers = []
+        self._lock = threading.Lock()
+        self._keywords = None
+        self._by_keyword = {}
+
+    @classmethod
+    def of(cls, bot):
+        """The dispatcher shared by the plugins of ``bot``."""  # Ignore QuotesBear
+        # Kept on the bot, which isn't hashable, so that it lives as long.
+        with cls._of_lock:
+            if not hasattr(bot, 'trigger_dispatcher'):
+                bot.trigger_dispatcher = cls()
+            return bot.trigger_dispatcher
+
+    @property
+    def triggers(self):
+        # The list is replaced, never changed, so it is read without locking.
+        return self._triggers
+
+    def register(self, name, pattern, callback, keywords, flags=0):
+        """
+        Call ``callback(msg, match)`` for the messages ``pattern`` is found
+        in.
+
+        :param keywords: Strings at least one of which is in every message
+                         ``pattern`` matches, ignoring case.
+        :return:         The ``Trigger``, to be given to ``unregister``.
+        """
+        trigger = Trigger(name, pattern, callback, keywords, flags)
+        with self._lock:
+            self._triggers = self._triggers + [trigger]
+            self._compile()
+        return trigger
+
+    def unregister(self, trigger):
+        with self._lock:
+            self._triggers = [other for other in self._triggers
+                              if other is not trigger]
+            self._compile()
+
+    def _compile(self):
+        keywords = {keyword for trigger in self._triggers
+                    for keyword in trigger.keywords}
+        # A keyword is also found when a longer one containing it is.
+        self._by_keyword = {
+            keyword: [trigger for trigger in self._triggers
+                      if any(other in keyword for other in trigger.keywords)]
+            for keyword in keywords}
+        # The lookahead finds the keywords at every position, and trying the
+        # longer ones first finds those starting with a shorter one.
+        self._keywords = (re.compile('(?=({}))'.format('|'.join(
+            map(re.escape, sorted(keywords, key=len, reverse=True)))))
+            if keywords else None)
+
+    def candidates_for(self, body):
+        """The triggers whose keywords are in ``body``, in order."""  # Ignore QuotesBear
+        with self._lock:
+            keywords, by_keyword = self._keywords, self._by_keyword
+            triggers = self._triggers
+        if keywords is None:
+            return []
+        found = set()
+        for match in keywords.finditer(body.casefold()):
+            found.update(by_keyword[match.group(1)])
+        return [trigger for trigger in triggers if trigger in found]
+
+    def dispatch(self, msg):
+        """Call the callbacks of the triggers matching ``msg``."""  # Ignore QuotesBear
+        start = time.perf_counter()
+        candidates = self.candidates_for(msg.body)
+        self.messages += 1
+        self.candidates += len(candidates)
+        self.seconds += time.perf_counter() - start
+
+        for trigger in candidates:
+            start = time.perf_counter()
+            match = trigger.regex.search(msg.body)
+            trigger.seconds += time.perf_counter() - start
+            trigger.evaluations += 1
+            if match:
+                trigger.matches += 1
+                try:
+                    trigger.callback(msg, match)
+                except Exception:
+                    log.exception('Trigger {} failed'.format(trigger.name))
+
+    def stats(self):
+        """Human readable summary of the counters of this dispatcher."""  # Ignore QuotesBear
+        average = self.seconds / self.messages if self.messages else 0
+        lines = ['{} messages, {} searches, {:.3f} ms prefiltering per '
+                 'message'.format(self.messages, self.candidates,
+                                  average * 1000)]
+        lines.extend(trigger.stats() for trigger in self.triggers)
+        return '\n'.join(lines)
@@ -1,9 +1,10 @@
 import re
 
-import requests
-
 from errbot import BotPlugin, re_botcmd
 
+from plugins import constants, sessions
+from plugins.circuit import breaker
+
 
 class Ghetto(BotPlugin):
     """
@@ -15,8 +16,10 @@ class Ghetto(BotPlugin):
         """
         Real talk yo
         """
-        rq = requests.post('http://www.gizoogle.net/textilizer.php',
-                           data={'translatetext': match.group(1)})
+        rq = breaker('Gizoogle').call(
+            sessions.shared().post, 'http://www.gizoogle.net/textilizer.php',
+            data={'translatetext': match.group(1)},
+            timeout=sessions.timeout(constants.GHETTO_TIMEOUT))
 
         translated_text = re.search(
             r'<textarea .*;\"/>(.+)</textarea>', rq.text)
@@ -0,0 +1,110 @@
+from collections import OrderedDict
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class InviteQueue:
+    """
+    Invites users from a background thread.
+
+    Submitting a user is a dictionary lookup: users already queued, or
+    invited less than ``window`` seconds ago, are dropped. The users
+    submitted within ``delay`` seconds are handed to ``invite`` together,
+    so that it can save API calls on large batches.
+    """
+
+    def __init__(self, invite, window, delay=1):
+        """
+        :param invite: Callable taking a list of ``(login, context)`` tuples
+                       to invite, called on the thread of the queue.
+        :param window: Seconds an invited user isn't invited again.
+        :param delay:  Seconds invitations are collected before being sent.
+        """
+        self.invite = invite
+        self.window = window
+        self.delay = delay
+
+        self.submitted = 0
+        self.duplicates = 0
+        self.batches = 0
+
+        self._queued = OrderedDict()
+        self._invited = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _fold(login):
+        return (login or '').casefold()
+
+    def submit(self, login, context=None):
+        """
+        Queue an invitation for ``login``, with a ``context`` handed to
+        ``invite`` along with it.
+
+        :return: False if the invitation was dropped as duplicate.
+        """
+        key = self._fold(login)
+        with self._lock:
+            self.submitted += 1
+            invited = self._invited.get(key)
+            if key in self._queued or (
+                    invited is not None and
+                    invited > time.monotonic() - self.window):
+                self.duplicates += 1
+                return False
+            self._queued[key] = (login, context)
+        self._wakeup.set()
+        return True
+
+    def start(self):
+        if self._thread is not None:
+            if not self._stopped.is_set():
+                return
+            # A stopped thread may still be waiting for ``delay`` to pass.
+            self._thread.join()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            if self._stopped.wait(self.delay):
+                return
+            self.flush()
+
+    def flush(self):
+        """Invite the queued users now."""  # Ignore QuotesBear
+        now = time.monotonic()
+        with self._lock:
+            self._wakeup.clear()
+            batch = list(self._queued.items())
+            self._queued.clear()
+            for key in [key for key, invited in self._invited.items()
+                        if invited <= now - self.window]:
+                del self._invited[key]
+            # Remembered right away, so that they aren't queued again while
+            # the invitations are being sent.
+            for key, _ in batch:
+                self._invited[key] = now
+        if not batch:
+            return
+
+        self.batches += 1
+        try:
+            self.invite([invitation for _, invitation in batch])
+        except Exception:
+            log.exception('Could not send {} invitations'.format(len(batch)))
+            with self._lock:
+                for key, _ in batch:
+                    self._invited.pop(key, None)
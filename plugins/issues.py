@@ -0,0 +1,128 @@
+import re
+from urllib.parse import quote
+
+
+class IssueContext:
+    """The labels and assignees of an issue."""  # Ignore QuotesBear
+
+    def __init__(self, labels, assignees):
+        self.labels = frozenset(labels)
+        self.assignees = tuple(assignees)
+
+
+class IssueContexts:
+    """
+    Fetches what ``assign`` needs to know: the labels and assignees of
+    issues and the teams of the user asking.
+
+    Every GitHub issue and the teams are fetched with a single GitHub
+    GraphQL query, GitLab issues with one request each.
+    """
+
+    GRAPHQL = 'https://api.github.com/graphql'
+    GITLAB = 'https://gitlab.com/api/v4/projects/{path}/issues/{number}'
+
+    ISSUE = ('issue{i}: repository(owner: $owner{i}, name: $name{i}) {{ '
+             'issue(number: $number{i}) {{ '
+             'labels(first: 100) {{ nodes {{ name }} }} '
+             'assignees(first: 100) {{ nodes {{ login }} }} }} }}')
+    TEAM = ('team{i}: team(slug: $team{i}) {{ '
+            'members(query: $user, first: 100) {{ nodes {{ login }} }} }}')
+
+    def __init__(self, session, tokens, org, teams):
+        """
+        :param session: ``requests.Session`` the requests are sent with.
+        :param tokens:  Dict mapping ``github`` and ``gitlab`` to the IGitt
+                        tokens the requests are sent with.
+        :param org:     Name of the GitHub org.
+        :param teams:   Dict mapping role names to the names of the GitHub
+                        teams.
+        """
+        self.session = session
+        self.tokens = tokens
+        self.org = org
+        self.teams = teams
+
+    @staticmethod
+    def slug(name):
+        """The slug GitHub gives a team called ``name``."""  # Ignore QuotesBear
+        return re.sub(r'[^a-z0-9_]+', '-', name.lower()).strip('-')
+
+    def fetch(self, user, issues):
+        """
+        :param user:   Login of the user.
+        :param issues: List of ``(host, full path, number)`` tuples.
+        :return:       Whether ``user`` is a member of the org, the set of
+                       its roles and a list of ``IssueContext`` objects,
+                       None for the issues which don't exist.
+        :raises requests.HTTPError: If a request failed.
+        """
+        github = [(i, issue) for i, issue in enumerate(issues)
+                  if issue[0] == 'github']
+        member, roles, found = self._github(user, github)
+        contexts = [found.get(i) for i in range(len(issues))]
+        for i, (host, path, number) in enumerate(issues):
+            if host == 'gitlab':
+                contexts[i] = self._gitlab(path, number)
+        return member, roles, contexts
+
+    def _github(self, user, issues):
+        roles = sorted(self.teams)
+        variables = {'org': self.org, 'user': user or ''}
+        declarations = ['$org: String!', '$user: String!']
+        for i, role in enumerate(roles):
+            variables['team{}'.format(i)] = self.slug(self.teams[role])
+            declarations.append('$team{}: String!'.format(i))
+        for i, (_, path, number) in issues:
+            owner, name = path.split('/', 1)
+            variables.update({'owner{}'.format(i): owner,
+                              'name{}'.format(i): name,
+                              'number{}'.format(i): int(number)})
+            declarations.append('$owner{0}: String!, $name{0}: String!, '
+                                '$number{0}: Int!'.format(i))
+
+        query = 'query({}) {{ {} {} {} }}'.format(
+            ', '.join(declarations),
+            'user(login: $user) { organization(login: $org) { login } }',
+            'organization(login: $org) {{ {} }}'.format(' '.join(
+                self.TEAM.format(i=i) for i in range(len(roles)))),
+            ' '.join(self.ISSUE.format(i=i) for i, _ in issues))
+        response = self.session.post(
+            self.GRAPHQL, json={'query': query, 'variables': variables},
+            headers={'Authorization':
+                     'bearer ' + self.tokens['github'].value})
+        response.raise_for_status()
+        # Users, repositories and issues which don't exist are null, with
+        # an error along.
+        data = response.json().get('data') or {}
+
+        login = (user or '').casefold()
+        member = bool((data.get('user') or {}).get('organization'))
+        member_roles = set()
+        teams = data.get('organization') or {}
+        for i, role in enumerate(roles):
+            members = ((teams.get('team{}'.format(i)) or {}).get('members')
+                       or {}).get('nodes', ())
+            if any(member['login'].casefold() == login for member in members):
+                member_roles.add(role)
+
+        found = {}
+        for i, _ in issues:
+            issue = (data.get('issue{}'.format(i)) or {}).get('issue')
+            if issue is not None:
+                found[i] = IssueContext(
+                    (label['name'] for label in issue['labels']['nodes']),
+                    (assignee['login']
+                     for assignee in issue['assignees']['nodes']))
+        return member, frozenset(member_roles), found
+
+    def _gitlab(self, path, number):
+        response = self.session.get(
+            self.GITLAB.format(path=quote(path, safe=''), number=number),
+            params=self.tokens['gitlab'].parameter)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        issue = response.json()
+        return IssueContext(issue['labels'], (
+            assignee['username'] for assignee in issue['assignees']))
@@ -0,0 +1,105 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import threading
+import time
+
+from plugins.timing import carry
+
+
+class QueueFull(Exception):
+    """
+    Raised when a job is refused because of the global or per user limit.
+    """
+
+
+class Job:
+    """
+    A unit of work submitted to a ``JobQueue``.
+    """
+
+    def __init__(self, id, user):
+        self.id = id
+        self.user = user
+        self.submitted = time.monotonic()
+        self.started = None
+
+    @property
+    def running(self):
+        return self.started is not None
+
+    @property
+    def elapsed(self):
+        """Seconds spent running or, if not started yet, waiting."""  # Ignore QuotesBear
+        return time.monotonic() - (self.started or self.submitted)
+
+
+class JobQueue:
+    """
+    Runs long jobs on a dedicated, bounded pool of threads, so that they
+    don't hold on to the threads errbot processes commands with.
+    """
+
+    def __init__(self, workers, max_jobs, max_per_user):
+        """
+        :param workers:      Number of jobs running at the same time.
+        :param max_jobs:     Number of jobs queued or running after which new
+                             jobs are refused.
+        :param max_per_user: Number of jobs a single user may have queued or
+                             running.
+        """
+        self.max_jobs = max_jobs
+        self.max_per_user = max_per_user
+
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def jobs(self):
+        """The queued and running jobs, oldest first."""  # Ignore QuotesBear
+        with self._lock:
+            return list(self._jobs.values())
+
+    def reserve(self, user):
+        """
+        Take a place in the queue for a job of ``user`` which is started
+        later with ``start``, e.g. once the user was told its id.
+
+        :raises QueueFull: If the global or the per user limit is reached.
+        :return:           The reserved ``Job``.
+        """
+        with self._lock:
+            if len(self._jobs) >= self.max_jobs:
+                raise QueueFull('There are already {} jobs queued, please try '
+                                'again later.'.format(len(self._jobs)))
+            if sum(job.user == user
+                   for job in self._jobs.values()) >= self.max_per_user:
+                raise QueueFull('You already have {} jobs queued, please wait '
+                                'for them to finish.'.format(self.max_per_user))
+            job = Job(next(self._ids), user)
+            self._jobs[job.id] = job
+            return job
+
+    def release(self, job):
+        """Give up the place of a reserved job which won't be started."""  # Ignore QuotesBear
+        with self._lock:
+            self._jobs.pop(job.id, None)
+
+    def start(self, job, function, *args):
+        """Queue ``function(job, *args)`` for a reserved job."""  # Ignore QuotesBear
+        # Run as part of the command which queued it.
+        self._executor.submit(carry(self._run), job, function, args)
+
+    def _run(self, job, function, args):
+        job.started = time.monotonic()
+        try:
+            function(job, *args)
+        finally:
+            with self._lock:
+                del self._jobs[job.id]
+
+    def shutdown(self):
+        """Stop accepting jobs, already queued jobs still run."""  # Ignore QuotesBear
+        self._executor.shutdown(wait=False)
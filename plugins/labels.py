@@ -0,0 +1,131 @@
+import threading
+import time
+from urllib.parse import quote
+
+import requests
+
+
+class Labels:
+    """
+    Adds and removes labels of GitHub pull requests and GitLab merge
+    requests, with as few requests as the APIs allow, keeping the labels
+    of each for ``ttl`` seconds.
+
+    Labels are only ever changed by delta, never by writing a whole set
+    which could undo changes made meanwhile. GitLab adds and removes them
+    in one request, GitHub adds them in one request and removes them one
+    request per label. The known labels only save the removal of labels
+    which aren't there.
+    """
+
+    GITHUB = 'https://api.github.com/repos/{path}/issues/{number}'
+    GITLAB = ('https://gitlab.com/api/v4/projects/{path}/merge_requests/'
+              '{number}')
+
+    def __init__(self, session, tokens, ttl):
+        """
+        :param session: ``requests.Session`` the requests are sent with.
+        :param tokens:  Dict mapping ``github`` and ``gitlab`` to the IGitt
+                        tokens the requests are sent with.
+        :param ttl:     Seconds the labels of a pull request are kept.
+        """
+        self.session = session
+        self.tokens = tokens
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+
+        self._labels = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(host, path, number):
+        return host.lower(), path.strip('/').casefold(), int(number)
+
+    def _url(self, key):
+        host, path, number = key
+        if host == 'github':
+            return self.GITHUB.format(path=path, number=number)
+        return self.GITLAB.format(path=quote(path, safe=''), number=number)
+
+    def _send(self, method, key, suffix='', **kwargs):
+        response = self.session.request(
+            method, self._url(key) + suffix,
+            params=dict(kwargs.pop('params', {}),
+                        **self.tokens[key[0]].parameter),
+            **kwargs)
+        response.raise_for_status()
+        data = response.json()
+        # Either the labels or the pull request, GitHub sends labels as
+        # objects and GitLab as names.
+        labels = data if isinstance(data, list) else data['labels']
+        labels = frozenset(label if isinstance(label, str) else label['name']
+                           for label in labels)
+        self._remember(key, labels)
+        return labels
+
+    def _remember(self, key, labels):
+        with self._lock:
+            self._labels[key] = (time.monotonic() + self.ttl, labels)
+
+    def _known(self, key):
+        with self._lock:
+            expires, labels = self._labels.get(key, (0, None))
+            if expires > time.monotonic():
+                self.hits += 1
+                return labels
+            self._labels.pop(key, None)
+            self.misses += 1
+            return None
+
+    def get(self, host, path, number):
+        """The labels of a pull request, fetched if not known."""  # Ignore QuotesBear
+        key = self._key(host, path, number)
+        labels = self._known(key)
+        return self._fetch(key) if labels is None else labels
+
+    def _fetch(self, key):
+        return self._send('GET', key, '/labels' if key[0] == 'github' else '')
+
+    def change(self, host, path, number, add=(), remove=()):
+        """
+        Add the labels ``add`` to a pull request and remove ``remove``.
+
+        :param host:   ``github`` or ``gitlab``.
+        :param path:   Full path of the repository.
+        :param number: Number of the pull request.
+        :return:       The labels of the pull request afterwards.
+        :raises requests.HTTPError: If a request failed.
+        """
+        key = self._key(host, path, number)
+        add, remove = frozenset(add), frozenset(remove) - frozenset(add)
+        labels = self._known(key)
+        if not add and labels is not None and not remove & labels:
+            return labels
+
+        if key[0] == 'gitlab':
+            return self._send('PUT', key, params={
+                'add_labels': ','.join(sorted(add)),
+                'remove_labels': ','.join(sorted(remove))})
+
+        if add:
+            # Answered with the current labels, which removals go by.
+            labels = self._send('POST', key, '/labels',
+                                json={'labels': sorted(add)})
+        for name in sorted(remove):
+            if labels is None or name in labels:
+                labels = self._remove(key, name)
+        return self._fetch(key) if labels is None else labels
+
+    def _remove(self, key, name):
+        try:
+            return self._send('DELETE', key,
+                              '/labels/' + quote(name, safe=''))
+        except requests.HTTPError as exc:
+            if exc.response is None or exc.response.status_code != 404:
+                raise
+            # It wasn't there, the labels known may be outdated.
+            with self._lock:
+                self._labels.pop(key, None)
+            return None
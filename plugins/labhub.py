@@ -1,13 +1,70 @@
-import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import inspect
 import os
 import re
+import threading
 
 import github3
+import IGitt.Interfaces
 from IGitt.GitHub.GitHub import GitHub, GitHubToken
 from IGitt.GitLab.GitLab import GitLab, GitLabPrivateToken
-from errbot import BotPlugin, re_botcmd
+from errbot import BotPlugin, botcmd, re_botcmd
+import requests
 
 from plugins import constants
+from plugins.cache import ResultCache
+from plugins.discovery import Discovery
+from plugins.dispatch import Dispatcher
+from plugins.invites import InviteQueue
+from plugins.issues import IssueContexts
+from plugins.labels import Labels
+from plugins.membership import MemberCache
+from plugins.ratelimit import RateLimited, Scheduler
+from plugins.repositories import (GitHubRepoSync, GitLabRepoSync, Record,
+                                  Registry)
+from plugins.timing import carry
+
+REPOSITORIES = ('github repositories', 'gitlab repositories')
+
+# start ignoring LineLengthBear PyCodeStyleBear
+ISSUE_URL = r'https://(github|gitlab)\.com/([^/\s]+)/((?:[^/\s]+/)+)issues/(\d+)'
+MR_URL = r'https://(github|gitlab)\.com/([^/\s]+)/((?:[^/\s]+/)+)(pull|merge_requests)/(\d+)'
+# stop ignoring LineLengthBear PyCodeStyleBear
+
+
+def discovered(*names):
+    """
+    Make a command wait for the given ``Discovery`` loaders of the plugin,
+    and tell the user to try again later if they take too long or if the
+    rate limit of the API is exhausted.
+    """
+    def decorator(function):
+        # errbot tells generator commands apart by their function.
+        if inspect.isgeneratorfunction(function):
+            @functools.wraps(function)
+            def wrapper(self, msg, match):
+                if not self.discovery.wait(*names,
+                                           timeout=self.DISCOVERY_TIMEOUT):
+                    yield self.discovery.status(*names)
+                    return
+                try:
+                    yield from function(self, msg, match)
+                except RateLimited as exc:
+                    yield '{} Please try again later.'.format(exc)
+        else:
+            @functools.wraps(function)
+            def wrapper(self, msg, match):
+                if not self.discovery.wait(*names,
+                                           timeout=self.DISCOVERY_TIMEOUT):
+                    return self.discovery.status(*names)
+                try:
+                    return function(self, msg, match)
+                except RateLimited as exc:
+                    return '{} Please try again later.'.format(exc)
+        return wrapper
+    return decorator
 
 
 class LabHub(BotPlugin):
@@ -34,12 +91,109 @@ class LabHub(BotPlugin):
                        'https://github.com/coala/coala/wiki/Membership'
     }
 
+    NOT_ELIGIBLE = 'You are not eligible to be assigned to this issue.'
+
+    MARK_HINTS = {
+        'wip': 'Use `{bot_prefix} mark pending` or push to your branch if '
+               'feedback from the community is needed again.',
+        'pending': 'Use `{bot_prefix} mark wip` if there are known issues '
+                   'that should be corrected by the author.',
+    }
+
+    # The labels ``mark`` adds and removes for each state.
+    MARK_LABELS = {
+        'wip': ({'process/wip'},
+                {'process/pending_review', 'process/pending review'}),
+        'pending': ({'process/pending review'}, {'process/wip'}),
+    }
+
     GH_ORG_NAME = constants.GH_ORG_NAME
     GL_ORG_NAME = constants.GL_ORG_NAME
 
+    DISCOVERY_TIMEOUT = constants.LABHUB_DISCOVERY_TIMEOUT
+    MEMBERS_TTL = constants.LABHUB_MEMBERS_TTL
+    BULK_WORKERS = constants.LABHUB_BULK_WORKERS
+    INVITE_WINDOW = constants.LABHUB_INVITE_WINDOW
+    REPOS_TTL = constants.LABHUB_REPOS_TTL
+    REPOS_FULL_TTL = constants.LABHUB_REPOS_FULL_TTL
+    LABELS_TTL = constants.LABHUB_LABELS_TTL
+    CLIENT_CACHE_SIZE = constants.LABHUB_CLIENT_CACHE_SIZE
+    ISSUE_HOST = constants.LABHUB_ISSUE_HOST
+
+    # Every GitHub and GitLab request of LabHub is paced by it.
+    api = Scheduler(rate=constants.LABHUB_API_RATE,
+                    burst=constants.LABHUB_API_BURST,
+                    reserve=constants.LABHUB_API_RESERVE,
+                    max_wait=constants.LABHUB_API_MAX_WAIT)
+
+    # The teams whose members LabHub keeps in memory.
+    ROLES = ('newcomers', 'developers', 'maintainers')
+
     def __init__(self, bot, name=None):
         super().__init__(bot, name)
 
+        self.GH3_ORG = None
+        gh_token = GitHubToken(os.environ.get('GH_TOKEN'))
+        gl_token = GitLabPrivateToken(os.environ.get('GL_TOKEN'))
+        self.IGH = GitHub(gh_token)
+        self.IGL = GitLab(gl_token)
+        self.repo_syncs = {
+            'github repositories': GitHubRepoSync(
+                gh_token, self.GH_ORG_NAME, self.api.session(),
+                full_every=self.REPOS_FULL_TTL),
+            'gitlab repositories': GitLabRepoSync(
+                gl_token, self.GL_ORG_NAME, self.api.session(),
+                full_every=self.REPOS_FULL_TTL),
+        }
+        # The client objects of the repositories and teams in use.
+        self.objects = ResultCache(size=self.CLIENT_CACHE_SIZE,
+                                   ttl=float('inf'))
+        self._gh = None
+
+        # Listing the teams and repositories of large orgs takes long, so it
+        # is done in the background, see ``activate``.
+        self.discovery = Discovery(OrderedDict([
+            ('teams', self._load_teams),
+            ('github repositories',
+             lambda: self._load_repos('github repositories')),
+            ('gitlab repositories',
+             lambda: self._load_repos('gitlab repositories')),
+        ]))
+        self._repos = None
+        self._refreshing = threading.Lock()
+        self.labels = Labels(self.api.session(),
+                             {'github': gh_token, 'gitlab': gl_token},
+                             ttl=self.LABELS_TTL)
+        self.issues = IssueContexts(
+            self.api.session(), {'github': gh_token, 'gitlab': gl_token},
+            self.GH_ORG_NAME, {role: '{} {}'.format(self.GH_ORG_NAME, role)
+                               for role in self.ROLES})
+        self.members = MemberCache(self._member_groups)
+        self.invites = InviteQueue(self.invite_newcomers,
+                                   window=self.INVITE_WINDOW)
+
+    def activate(self):
+        super().activate()
+        # IGitt creates a session for every request.
+        IGitt.Interfaces.Session = self.api.session
+        self._repos = None
+        self.discovery.start()
+        self.start_poller(self.MEMBERS_TTL, self.refresh_members)
+        self.start_poller(self.REPOS_TTL, self.refresh_repos)
+        self.pool = ThreadPoolExecutor(max_workers=self.BULK_WORKERS)
+        self.invites.start()
+        self.trigger = Dispatcher.of(self._bot).register(
+            'hello world', r'hello\s*,?\s*world', self.hello_world,
+            keywords=('hello',), flags=re.IGNORECASE)
+
+    def deactivate(self):
+        Dispatcher.of(self._bot).unregister(self.trigger)
+        IGitt.Interfaces.Session = requests.Session
+        self.pool.shutdown(wait=False)
+        self.invites.stop()
+        super().deactivate()
+
+    def _load_teams(self):
         teams = dict()
         try:
             gh = github3.login(token=os.environ.get('GH_TOKEN'))
@@ -47,47 +201,171 @@ class LabHub(BotPlugin):
         except AssertionError:
             self.log.error('Cannot create github object, please check GH_TOKEN')
         else:
-            self.GH3_ORG = gh.organization(self.GH_ORG_NAME)
-            for team in self.GH3_ORG.iter_teams():
-                teams[team.name] = team
-
-        self._teams = teams
-
-        self.IGH = GitHub(GitHubToken(os.environ.get('GH_TOKEN')))
-        self.IGL = GitLab(GitLabPrivateToken(os.environ.get('GL_TOKEN')))
-
-        self.REPOS = dict()
-
-        try:
-            self.gh_repos = {repo.full_name.split('/')[-1]: repo for repo in
-                             filter(lambda x: (x.full_name.split('/')[0] ==
-                                               self.GH_ORG_NAME),
-                                    self.IGH.write_repositories)}
-        except RuntimeError:
-            self.log.exception('Something went wrong in fetching github repos.')
-        else:
-            self.REPOS.update(self.gh_repos)
+            gh.session.mount('https://', self.api.adapter)
+            self._gh = gh
+            with self.api.background():
+                self.GH3_ORG = gh.organization(self.GH_ORG_NAME)
+                # Only the teams of the roles are used, large orgs have many
+                # more.
+                for role in self.ROLES:
+                    name = '{} {}'.format(self.GH_ORG_NAME, role)
+                    response = gh.session.get(
+                        'https://api.github.com/orgs/{}/teams/{}'.format(
+                            self.GH_ORG_NAME, IssueContexts.slug(name)))
+                    if response.status_code == 404:
+                        self.log.error('There is no team {}'.format(name))
+                        continue
+                    response.raise_for_status()
+                    teams[name] = Record('github', name,
+                                         response.json()['id'])
+                self.members.refresh(self._member_groups(teams))
+        return teams
+
+    def _team_object(self, record):
+        key = ('team', record.full_name)
+        team = self.objects.get(key)
+        if team is None:
+            team = github3.orgs.Team(
+                {'url': 'https://api.github.com/teams/{}'.format(record.id),
+                 'id': record.id, 'name': record.full_name},
+                self._gh.session)
+            self.objects.put(key, team)
+        return team
+
+    def _repo_object(self, record):
+        key = ('repo', record.host, record.full_name.casefold())
+        repo = self.objects.get(key)
+        if repo is None:
+            hoster = self.IGH if record.host == 'github' else self.IGL
+            repo = hoster.get_repo(record.full_name)
+            self.objects.put(key, repo)
+        return repo
+
+    def refresh_members(self):
+        with self.api.background():
+            self.members.refresh()
+
+    def _member_groups(self, teams=None):
+        teams = self.TEAMS if teams is None else {
+            name: self._team_object(record) for name, record in teams.items()}
+        groups = {name: teams[name] for name in
+                  ('{} {}'.format(self.GH_ORG_NAME, role)
+                   for role in self.ROLES)
+                  if name in teams}
+        if self.GH3_ORG is not None:
+            groups[self.GH_ORG_NAME] = self.GH3_ORG
+        return groups
+
+    def is_member(self, team, user):
+        """
+        Whether ``user`` is a member of ``team``, one of ``ROLES``, or of
+        the org if ``team`` is None.
+        """
+        group = (self.GH_ORG_NAME if team is None
+                 else '{} {}'.format(self.GH_ORG_NAME, team))
+        return self.members.is_member(group, user)
 
+    def _load_repos(self, hoster, full=None):
+        sync = self.repo_syncs[hoster]
         try:
-            self.gl_repos = {repo.full_name.split('/')[-1]: repo for repo in
-                             filter(lambda x: (x.full_name.split('/')[0] ==
-                                               self.GL_ORG_NAME),
-                                    self.IGL.write_repositories)}
-        except RuntimeError:  # pragma: no cover, for logging
-            self.log.exception('Something went wrong in fetching gitlab repos.')
-        else:
-            self.REPOS.update(self.gl_repos)
-
+            with self.api.background():
+                return sync.sync(full)
+        except (RuntimeError, requests.RequestException):
+            self.log.exception('Something went wrong in fetching {}.'.format(
+                hoster))
+            # What was listed before is still good.
+            return sync.repos
+
+    def refresh_repos(self, full=None):
+        """
+        List the repositories changed since the previous listing, or all of
+        them if ``full``, and swap them in.
+        """
+        with self._refreshing:
+            for hoster in REPOSITORIES:
+                self.discovery.set(hoster, self._load_repos(hoster, full))
+            # ``REPOS`` merges them again, readers keep the dict they got.
+            self._repos = None
+
+    # Commands wait for the discovery with ``discovered``, these only return
+    # what is loaded yet, as errbot reads them when collecting the commands.
     @property
     def TEAMS(self):
-        return self._teams
+        return {name: self._team_object(record) for name, record in
+                self.discovery.get('teams', dict()).items()}
 
     @TEAMS.setter
     def TEAMS(self, new):
-        self._teams = new
+        # The given teams are used as the client objects of their records.
+        for name, team in new.items():
+            self.objects.put(('team', name), team)
+        self.discovery.set('teams', {
+            name: Record('github', name, getattr(team, 'id', None))
+            for name, team in new.items()})
+
+    @property
+    def REPOS(self):
+        if self._repos is not None:
+            return self._repos
+        repos = Registry(
+            (((self.repo_syncs[hoster].HOST, path), record)
+             for hoster in REPOSITORIES
+             for path, record in self.discovery.get(hoster, dict()).items()),
+            self._repo_object)
+        if all(map(self.discovery.loaded, REPOSITORIES)):
+            self._repos = repos
+        return repos
+
+    @REPOS.setter
+    def REPOS(self, new):
+        # The given repositories replace whatever is still being discovered
+        # until the next refresh, and are used as the client objects of
+        # their records.
+        for hoster in REPOSITORIES:
+            self.discovery.set(hoster, {})
+        records = {}
+        for (host, path), repo in new.items():
+            records[host, path] = Record(host, path)
+            self.objects.put(('repo', host, path.casefold()), repo)
+        self._repos = Registry(records, self._repo_object)
+
+    def owns(self, url):
+        """Whether an issue or MR URL match is in the org of its host."""  # Ignore QuotesBear
+        host, org = url.group(1, 2)
+        orgs = {'github': self.GH_ORG_NAME, 'gitlab': self.GL_ORG_NAME}
+        return org.casefold() == orgs[host.lower()].casefold()
+
+    def repo_of(self, url):
+        """
+        The repository an issue or MR URL match is on.
+
+        :raises KeyError: If there's no such repository.
+        """
+        host, org, path = url.group(1, 2, 3)
+        return self.REPOS[host, org + '/' + path]
+
+    @botcmd(admin_only=True)
+    def rate_limits(self, msg, arg):
+        """Show what is left of the GitHub and GitLab rate limits."""  # Ignore QuotesBear
+        return self.api.stats()
+
+    @re_botcmd(pattern=r'^refresh\s+repos(?:\s+(full))?$',
+               flags=re.IGNORECASE, admin_only=True)
+    @discovered(*REPOSITORIES)
+    def refresh_repos_cmd(self, msg, match):
+        """
+        List the repositories changed since the last refresh now, or all of
+        them with `full`.
+        """
+        self.refresh_repos(bool(match.group(1)) or None)
+        return '\n'.join(
+            '{}: {} listed, {} known'.format(
+                hoster, sync.listed, len(sync.repos))
+            for hoster, sync in sorted(self.repo_syncs.items()))
 
     # Ignore LineLengthBear, PycodestyleBear
     @re_botcmd(pattern=r'(?:(?:invite)|(?:inv))\s+@?([\w-]+)(?:\s*(?:to)\s+(\w+))?')
+    @discovered('teams')
     def invite_cmd(self, msg, match):
         """
         Invite given user to given team. By default it invites to
@@ -100,7 +378,7 @@ class LabHub(BotPlugin):
 
         self.log.info('{} invited {} to {}'.format(inviter, invitee, team))
 
-        if self.TEAMS[self.GH_ORG_NAME + ' maintainers'].is_member(inviter):
+        if self.is_member('maintainers', inviter):
             valid_teams = ['newcomers', 'developers', 'maintainers']
             if team.lower() not in valid_teams:
                 return 'Please select from one of the ' + ', '.join(valid_teams)
@@ -111,24 +389,47 @@ class LabHub(BotPlugin):
             }
 
             # send the invite
-            self.TEAMS[team_mapping[team.lower()]].invite(invitee)
+            invite = self.TEAMS[team_mapping[team.lower()]].invite(invitee)
+            # Org members join right away, others once they accept.
+            if isinstance(invite, dict) and invite.get('state') == 'active':
+                self.members.add(team_mapping[team.lower()], invitee)
             return self.INVITE_SUCCESS[team.lower()].format(invitee)
         else:
             return ('@{}, you are not a maintainer, only maintainers can invite'
                     ' other people. Nice try :poop:'.format(inviter))
 
-    def callback_message(self, msg):
+    def hello_world(self, msg, match):
         """Invite the user whose message includes the holy 'hello world'"""
-        if re.search(r'hello\s*,?\s*world', msg.body, flags=re.IGNORECASE):
-            user = msg.frm.nick
-            if not self.TEAMS[self.GH_ORG_NAME + ' newcomers'].is_member(user):
+        self.invites.submit(msg.frm.nick, msg.frm)
+
+    def invite_newcomers(self, batch):
+        """
+        Invite the given ``(user, identifier)`` tuples to the newcomers team
+        unless they are members already, and welcome them.
+        """
+        if not self.discovery.wait('teams', timeout=self.DISCOVERY_TIMEOUT):
+            # The queue logs it and forgets the users, so that they are
+            # invited the next time they say hello.
+            raise TimeoutError('The teams are still loading')
+        name = self.GH_ORG_NAME + ' newcomers'
+        team = self.TEAMS[name]
+        if len(batch) > 1:
+            # Listing the members once costs less than checking every user.
+            with self.api.background():
+                self.members.refresh({name: team})
+            is_member = functools.partial(self.members.knows, name)
+        else:
+            is_member = functools.partial(self.is_member, 'newcomers')
+
+        for user, frm in batch:
+            if not is_member(user):
                 # send the invite
-                self.send(msg.frm,
-                          self.INVITE_SUCCESS['newcomers'].format(user))
-                self.TEAMS[self.GH_ORG_NAME + ' newcomers'].invite(user)
+                self.send(frm, self.INVITE_SUCCESS['newcomers'].format(user))
+                team.invite(user)
 
     @re_botcmd(pattern=r'(?:new|file) issue ([\w-]+?)(?: |\n)(.+?)(?:$|\n((?:.|\n)*))',  # Ignore LineLengthBear, PyCodeStyleBear
                flags=re.IGNORECASE)
+    @discovered(*REPOSITORIES)
     def create_issut_cmd(self, msg, match):
         """Create issues on GitHub and GitLab repositories."""  # Ignore QuotesBear, LineLengthBear, PyCodeStyleBear
         repo_name = match.group(1)
@@ -146,32 +447,68 @@ class LabHub(BotPlugin):
             self.log.exception('An exception occured while getting the link to'
                                ' the message')
 
-        if repo_name in self.REPOS:
-            repo = self.REPOS[repo_name]
-            iss = repo.create_issue(iss_title, iss_description + extra_msg)
-            return 'Here you go: {}'.format(iss.url)
-        else:
+        records = self.REPOS.named(repo_name)
+        # A repository mirrored on both hosts gets its issues on ISSUE_HOST.
+        records = [record for record in records
+                   if record.host == self.ISSUE_HOST] or records
+        if not records:
             return ('Can\'t create an issue for a repository that does not '
                     'exist. Please ensure that the repository is available '
                     'and owned by the org.')
+        elif len(records) > 1:
+            return ('Several repositories are called {}: {}. Please create '
+                    'the issue on the one you mean by hand.'.format(
+                        repo_name, ', '.join(
+                            '{}.com/{}'.format(record.host, record.full_name)
+                            for record in records)))
+        else:
+            repo = self.REPOS[records[0].host, records[0].full_name]
+            iss = repo.create_issue(iss_title, iss_description + extra_msg)
+            return 'Here you go: {}'.format(iss.url)
 
-    @re_botcmd(pattern=r'^unassign\s+https://(github|gitlab)\.com/([^/]+)/([^/]+)/issues/(\d+)',  # Ignore LineLengthBear, PyCodeStyleBear
+    def bulk(self, function, urls):
+        """
+        Call ``function(url)`` for the given URL matches concurrently and
+        return the results in order, or what went wrong for failed ones.
+        """
+        def run(url):
+            try:
+                return function(url)
+            except RateLimited as exc:
+                return str(exc)
+            except Exception:
+                self.log.exception('Could not handle {}'.format(url.group(0)))
+                return 'Something went wrong.'
+        return list(self.pool.map(carry(run), urls))
+
+    @staticmethod
+    def table(urls, results):
+        lines = ['| URL | Result |', '| --- | --- |']
+        for url, result in zip(urls, results):
+            lines.append('| {} | {} |'.format(
+                url.group(0), result.replace('\n', ' ').replace('|', '\\|')))
+        return '\n'.join(lines)
+
+    @re_botcmd(pattern=r'^unassign((?:\s+' + ISSUE_URL + ')+)',
                flags=re.IGNORECASE)
+    @discovered(*REPOSITORIES)
     def unassign_cmd(self, msg, match):
-        """Unassign from an issue."""  # Ignore QuotesBear
-        org = match.group(2)
-        repo_name = match.group(3)
-        issue_number = match.group(4)
-
+        """Unassign from one or more issues."""  # Ignore QuotesBear
         user = msg.frm.nick
+        urls = list(re.finditer(ISSUE_URL, match.group(1), re.IGNORECASE))
+        if len(urls) == 1:
+            return self.unassign(user, urls[0])
+        return self.table(urls, self.bulk(
+            functools.partial(self.unassign, user), urls))
 
-        try:
-            assert org == self.GH_ORG_NAME or org == self.GL_ORG_NAME
-        except AssertionError:
+    def unassign(self, user, url):
+        issue_number = url.group(4)
+
+        if not self.owns(url):
             return 'Repository not owned by our org.'
 
         try:
-            iss = self.REPOS[repo_name].get_issue(int(issue_number))
+            iss = self.repo_of(url).get_issue(int(issue_number))
         except KeyError:
             return 'Repository doesn\'t exist.'
         else:
@@ -181,68 +518,116 @@ class LabHub(BotPlugin):
             else:
                 return 'You are not an assignee on the issue.'
 
-    @re_botcmd(pattern=r'mark\s+(wip|pending)\s+https://(github|gitlab)\.com/([^/]+)/([^/]+)/(pull|merge_requests)/(\d+)',  # Ignore LineLengthBear, PyCodeStyleBear
+    @re_botcmd(pattern=r'mark\s+(wip|pending)((?:\s+' + MR_URL + ')+)',
                flags=re.IGNORECASE)
+    @discovered(*REPOSITORIES)
     def mark_cmd(self, msg, match):
-        """Mark a given PR/MR with status labels."""  # Ignore QuotesBear
-        state, host, org, repo_name, xr, number = match.groups()
+        """Mark one or more PRs/MRs with status labels."""  # Ignore QuotesBear
+        state = match.group(1).lower()
+        urls = list(re.finditer(MR_URL, match.group(2), re.IGNORECASE))
+        hint = self.MARK_HINTS[state].format(
+            bot_prefix=self.bot_config.BOT_PREFIX)
+        if len(urls) == 1:
+            result = self.mark(state, urls[0])
+        else:
+            result = self.table(urls, self.bulk(
+                functools.partial(self.mark, state), urls)) + '\n'
+        return result + hint
 
-        if host.lower() == 'github':
-            assert xr.lower() == 'pull'
-        elif host.lower() == 'gitlab':
-            assert xr.lower() == 'merge_requests'
+    def mark(self, state, url):
+        host, org, path, xr, number = url.groups()
+
+        kinds = {'github': 'pull', 'gitlab': 'merge_requests'}
+        if xr.lower() != kinds[host.lower()]:
+            return '{} is not a pull request.'.format(url.group(0))
 
         try:
-            mr = self.REPOS[repo_name].get_mr(number)
+            # The labels change on the API, the client object isn't needed.
+            record = self.REPOS.record((host, org + '/' + path))
         except KeyError:
             return 'Repository doesn\'t exist.'
         else:
-            current_labels = list(mr.labels)
+            add, remove = self.MARK_LABELS[state]
+            self.labels.change(record.host, record.full_name, number, add,
+                               remove)
             if state == 'wip':
-                pending_labels = ['process/pending_review',
-                                  'process/pending review']
-                for label in filter(lambda x: x in current_labels,
-                                    pending_labels):
-                    current_labels.remove(label)
-                current_labels.append('process/wip')
-                mr.labels = current_labels
                 return ('The pull request {mr_link} is marked *work in progress'
-                        '*. Use `{bot_prefix} mark pending` or push to your '
-                        'branch if feedback from the community is needed '
-                        'again.'.format(
-                            mr_link=mr.url,
-                            bot_prefix=self.bot_config.BOT_PREFIX)
-                        )
+                        '*. '.format(mr_link=url.group(0)))
             else:
-                wip_labels = ['process/wip']
-                for label in filter(lambda x: x in current_labels,
-                                    wip_labels):
-                    current_labels.remove(label)
-                current_labels.append('process/pending review')
-                mr.labels = current_labels
                 return ('The pull request {mr_link} is marked *pending review*,'
-                        'so you will get feedback from the community. Use '
-                        '`{bot_prefix} mark wip` if there are known issues that'
-                        ' should be corrected by the author.'.format(
-                            mr_link=mr.url,
-                            bot_prefix=self.bot_config.BOT_PREFIX)
-                        )
-
-    @re_botcmd(pattern=r'^assign\s+https://(github|gitlab)\.com/([^/]+)/([^/]+/)+issues/(\d+)',  # Ignore LineLengthBear, PyCodeStyleBear
+                        'so you will get feedback from the community. '.format(
+                            mr_link=url.group(0)))
+
+    @re_botcmd(pattern=r'^assign((?:\s+' + ISSUE_URL + ')+)',
                flags=re.IGNORECASE)
+    @discovered(*REPOSITORIES)
     def assign_cmd(self, msg, match):
-        """Assign to GitLab and GitHub issues."""  # Ignore QuotesBear
-        org = match.group(2)
-        repo_name = match.group(3)[:-1]
-        iss_number = match.group(4)
-
+        """Assign to one or more GitLab and GitHub issues."""  # Ignore QuotesBear
         user = msg.frm.nick
+        urls = list(re.finditer(ISSUE_URL, match.group(1), re.IGNORECASE))
+        member, roles, contexts = self.issue_contexts(user, urls)
 
-        try:
-            assert org == self.GH_ORG_NAME or org == self.GL_ORG_NAME
-        except AssertionError:
-            yield 'Repository not owned by our org.'
-            return
+        def assign(url):
+            return self.assign(user, url, member, roles,
+                               contexts.get(url.group(0)))
+
+        if len(urls) == 1:
+            results = [assign(urls[0])]
+            yield results[0]
+        else:
+            results = self.bulk(assign, urls)
+            yield self.table(urls, results)
+
+        if self.NOT_ELIGIBLE in results:
+            yield '\n'.join(self.eligibility_conditions())
+
+    def issue_contexts(self, user, urls):
+        """
+        Fetch the membership and roles of ``user`` and the issues of the URL
+        matches which are in repositories of the orgs, all at once.
+
+        :return: Whether ``user`` is a member of the org and its roles, as
+                 returned by ``IssueContexts.fetch``, and a dict mapping the
+                 URLs to their ``IssueContext``.
+        """
+        issues = OrderedDict()
+        for url in urls:
+            try:
+                if self.owns(url):
+                    self.repo_of(url)
+                    issues[url.group(0)] = (
+                        url.group(1).lower(),
+                        url.group(2) + '/' + url.group(3).rstrip('/'),
+                        int(url.group(4)))
+            except KeyError:
+                pass
+        member, roles, contexts = self.issues.fetch(
+            user, list(issues.values()))
+        return member, roles, dict(zip(issues, contexts))
+
+    def eligibility_conditions(self):
+        return [
+            '- You must be a member of {} org to be assigned an issue '
+            'If you are not a member yet, just type Hello World and '
+            'corobo will invite you.'.format(self.GH_ORG_NAME),
+            '- A newcomer cannot be assigned to an issue with a difficulty '
+            'level higher than newcomer or low difficulty.',
+        ]
+
+    def assign(self, user, url, member, roles, iss):
+        """
+        Assign ``user`` to the issue of a URL match.
+
+        :param member: Whether ``user`` is a member of the org.
+        :param roles:  The roles of ``user``, as returned by
+                       ``IssueContexts.fetch``.
+        :param iss:    The ``IssueContext`` of the issue, None if it doesn't
+                       exist.
+        """
+        iss_number = url.group(4)
+
+        if not self.owns(url):
+            return 'Repository not owned by our org.'
 
         checks = []
 
@@ -264,14 +649,9 @@ class LabHub(BotPlugin):
                 2. A newcomer asks for assignment to an issue with difficulty
                    higher than low.
                 """
-                if (self.TEAMS[self.GH_ORG_NAME + ' newcomers'].is_member(user)
-                    and not (self.TEAMS[self.GH_ORG_NAME +
-                                        ' developers'].is_member(
-                            user
-                        ) or
-                        self.TEAMS[self.GH_ORG_NAME + ' maintainers'].is_member(
-                            user
-                        ))):
+                if ('newcomers' in roles and
+                        not ('developers' in roles or
+                             'maintainers' in roles)):
                     diff_labels = filter(
                         lambda x: 'difficulty' in x, iss.labels)
                     if list(filter(lambda x: ('low' in x) or ('newcomer' in x),
@@ -279,7 +659,7 @@ class LabHub(BotPlugin):
                         return True
                     else:
                         return False
-                elif self.GH3_ORG.is_member(user):
+                elif member:
                     return True
 
         def eligible(user, iss):
@@ -288,28 +668,20 @@ class LabHub(BotPlugin):
                     return False
             return True
 
-        eligility_conditions = [
-            '- You must be a member of {} org to be assigned an issue '
-            'If you are not a member yet, just type Hello World and '
-            'corobo will invite you.'.format(self.GH_ORG_NAME),
-            '- A newcomer cannot be assigned to an issue with a difficulty '
-            'level higher than newcomer or low difficulty.',
-        ]
-
         try:
-            iss = self.REPOS[repo_name].get_issue(int(iss_number))
+            repo = self.repo_of(url)
         except KeyError:
-            yield 'Repository doesn\'t exist.'
-        else:
-            if not iss.assignees:
-                if eligible(user, iss):
-                    iss.assign(user)
-                    yield ('Congratulations! You\'ve been assigned to the '
-                           'issue. :tada:')
-                else:
-                    yield 'You are not eligible to be assigned to this issue.'
-                    yield '\n'.join(eligility_conditions)
+            return 'Repository doesn\'t exist.'
+        if iss is None:
+            return 'Issue doesn\'t exist.'
+        if not iss.assignees:
+            if eligible(user, iss):
+                repo.get_issue(int(iss_number)).assign(user)
+                return ('Congratulations! You\'ve been assigned to the '
+                        'issue. :tada:')
             else:
-                yield ('The issue is already assigned to someone. Please '
-                       'check if the assignee is still working on the issue, '
-                       'if not, you should ask for reassignment.')
+                return self.NOT_ELIGIBLE
+        else:
+            return ('The issue is already assigned to someone. Please '
+                    'check if the assignee is still working on the issue, '
+                    'if not, you should ask for reassignment.')
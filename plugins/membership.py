@@ -0,0 +1,84 @@
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class MemberCache:
+    """
+    Logins of the members of GitHub teams and organizations kept in memory,
+    so that asking whether somebody is a member doesn't cost an API call.
+
+    A login missing from a list is checked with the API, as the user may
+    have joined since the list was last refreshed.
+    """
+
+    def __init__(self, groups):
+        """
+        :param groups: Callable returning a dict mapping group names to
+                       github3 teams or organizations.
+        """
+        self.groups = groups
+
+        self.hits = 0
+        self.misses = 0
+
+        self._members = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fold(login):
+        return (login or '').casefold()
+
+    def refresh(self, groups=None):
+        """
+        List the members of every group again.
+
+        :param groups: The groups to refresh, as returned by ``groups``, all
+                       of them by default.
+        """
+        groups = self.groups() if groups is None else groups
+        for name, group in groups.items():
+            try:
+                members = frozenset(self._fold(user.login)
+                                    for user in group.iter_members())
+            except Exception:
+                log.exception('Could not list the members of {}, keeping '
+                              'the previous list'.format(name))
+                continue
+            with self._lock:
+                self._members[name] = members
+
+    def add(self, name, login):
+        """Record that ``login`` joined the group ``name``."""  # Ignore QuotesBear
+        with self._lock:
+            if name in self._members:
+                self._members[name] |= {self._fold(login)}
+
+    def knows(self, name, login):
+        """
+        Whether ``login`` is in the last list of members of the group
+        ``name``, without asking the API.
+        """
+        with self._lock:
+            return self._fold(login) in self._members.get(name, ())
+
+    def is_member(self, name, login):
+        """
+        Whether ``login`` is a member of the group ``name``.
+
+        :raises KeyError: If there's no such group.
+        """
+        group = self.groups()[name]
+        with self._lock:
+            members = self._members.get(name)
+        if members is None:
+            self.refresh({name: group})
+            with self._lock:
+                members = self._members.get(name, frozenset())
+
+        if self._fold(login) in members:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return group.is_member(login)
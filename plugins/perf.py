@@ -0,0 +1,77 @@
+import os
+import re
+import time
+
+from errbot import BotPlugin, botcmd
+
+from plugins import constants, profiling
+from plugins.timing import Recorder
+from plugins.traffic import Traffic
+
+
+class Perf(BotPlugin):
+    """
+    Times the commands of every corobo plugin, see ``Recorder``, counts
+    their HTTP requests, see ``Traffic``, and profiles single commands.
+    """
+
+    def activate(self):
+        super().activate()
+        Recorder.of(self._bot).install(self._bot)
+        # Kept across restarts, to compare commands over a longer time.
+        self.traffic = Traffic(self.get('http traffic'))
+        self.traffic.install()
+        self.start_poller(constants.PERF_HTTP_SAVE_INTERVAL, self.save_traffic)
+
+    def deactivate(self):
+        Recorder.of(self._bot).uninstall(self._bot)
+        # Not there if the activation failed early.
+        if getattr(self, 'traffic', None) is not None:
+            self.traffic.uninstall()
+            self.save_traffic()
+        super().deactivate()
+
+    def save_traffic(self):
+        self['http traffic'] = self.traffic.dump()
+
+    @botcmd(admin_only=True)
+    def perf_stats(self, msg, arg):
+        """
+        Show the calls, errors and latency percentiles of every command, of
+        the plugin given or of all plugins, slowest first.
+        """
+        return (Recorder.of(self._bot).stats(arg.strip() or None) or
+                'No command was run yet.')
+
+    @botcmd(admin_only=True)
+    def perf_http(self, msg, arg):
+        """
+        Show the HTTP requests every command sent to each host, of the
+        plugin given or of all plugins, most per call first.
+        """
+        return (self.traffic.stats(arg.strip() or None) or
+                'No HTTP request was sent yet.')
+
+    @botcmd(admin_only=True)
+    def profile(self, msg, arg):
+        """
+        Run a command under cProfile, e.g. `profile bear stats python`, and
+        show the functions it spent the most time in. The full profile is
+        saved to the data directory, to be read with pstats.
+        """
+        found = profiling.find_command(self._bot, arg)
+        if found is None:
+            yield 'There is no command `{}`.'.format(arg.strip())
+            return
+        name, handler, argument = found
+        replies, stats, seconds = profiling.profile(handler, msg, argument)
+        yield from replies
+
+        path = os.path.join(
+            self.bot_config.BOT_DATA_DIR, '{}-{}.pstats'.format(
+                re.sub(r'\W+', '_', name), time.strftime('%Y%m%d-%H%M%S')))
+        stats.dump_stats(path)
+        yield ('`{}` took {:.3f} seconds, the profile is saved to {}\n'
+               '```\n{}\n```'.format(
+                   name, seconds, path, '\n'.join(
+                       profiling.top(stats, constants.PERF_PROFILE_TOP))))
@@ -0,0 +1,72 @@
+import cProfile
+import inspect
+import os
+import pstats
+import time
+
+
+def find_command(bot, line):
+    """
+    The handler of ``bot`` errbot calls for the command ``line``, without
+    prefix, and the argument it's called with.
+
+    :return: ``(name, handler, argument)``, the argument being the rest of
+             the line or the match of a regular expression command, or None
+             if no command matches.
+    """
+    words = line.strip().split(' ')
+    with bot._gbl:
+        commands = dict(bot.commands)
+        re_commands = dict(bot.re_commands)
+    # The longest command first, like errbot does.
+    for count in range(len(words), 0, -1):
+        name = '_'.join(words[:count])
+        if name in commands:
+            return name, commands[name], ' '.join(words[count:])
+    for name, handler in re_commands.items():
+        match = handler._err_command_re_pattern.search(line.strip())
+        if match:
+            return name, handler, match
+    return None
+
+
+def profile(handler, msg, argument):
+    """
+    Call ``handler`` with ``msg`` and ``argument`` under cProfile, going
+    through every reply of generator commands. Work handed to other
+    threads, e.g. queued jobs, isn't profiled.
+
+    :return: The replies, the ``pstats.Stats`` and the seconds it took. If
+             the handler raised, the last reply is what went wrong.
+    """
+    profiler = cProfile.Profile()
+    replies = []
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        if inspect.isgeneratorfunction(handler):
+            replies.extend(handler(msg, argument))
+        else:
+            replies.append(handler(msg, argument))
+    except Exception as exc:
+        replies.append('The command failed: {!r}'.format(exc))
+    finally:
+        profiler.disable()
+    seconds = time.perf_counter() - start
+    return ([reply for reply in replies if reply], pstats.Stats(profiler),
+            seconds)
+
+
+def top(stats, count):
+    """
+    Lines describing the ``count`` functions ``stats`` spent the most
+    cumulative time in, most first.
+    """
+    stats.sort_stats('cumulative')
+    lines = ['cumulative      own    calls  function']
+    for function in stats.fcn_list[:count]:
+        _, calls, own, cumulative, _ = stats.stats[function]
+        path, line, name = function
+        lines.append('{:9.3f}s {:7.3f}s {:8}  {}:{}({})'.format(
+            cumulative, own, calls, os.path.basename(path), line, name))
+    return lines
@@ -0,0 +1,261 @@
+from contextlib import contextmanager
+import hashlib
+import logging
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from requests import Session
+
+from plugins.traffic import CountingAdapter
+
+log = logging.getLogger(__name__)
+
+
+class RateLimited(Exception):
+    """
+    Raised when a request would have to wait too long for the rate limit
+    of its API to reset.
+    """
+
+    def __init__(self, host, wait):
+        super().__init__('The rate limit of {} is exhausted for another {} '
+                         'seconds.'.format(host, int(wait)))
+        self.host = host
+        self.wait = wait
+
+
+class Budget:
+    """
+    Requests left to one token on one API host.
+
+    Requests are spread by a token bucket of ``burst`` tokens refilled at
+    ``rate`` tokens per second, and held back once the remaining rate limit
+    the API sent in its last response is used up until it resets.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+        self.limit = None
+        self.remaining = None
+        self.reset = None
+
+        self.requests = 0
+        self.waits = 0
+        self.retries = 0
+
+    def delay(self, background, reserve):
+        """
+        Seconds to wait before the next request, leaving a ``reserve``
+        share of the budget to interactive requests if ``background``.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        floor = reserve * self.burst if background else 0
+        wait = max(floor + 1 - self.tokens, 0) / self.rate
+        if self.remaining is not None and self.reset > time.time():
+            floor = reserve * self.limit if background else 0
+            if self.remaining <= floor:
+                wait = max(wait, self.reset - time.time())
+        return wait
+
+    def take(self):
+        self.tokens -= 1
+        self.requests += 1
+        if self.remaining is not None:
+            self.remaining -= 1
+
+    def update(self, headers):
+        """Read the rate limit headers of GitHub or GitLab."""  # Ignore QuotesBear
+        for prefix in ('X-RateLimit-', 'RateLimit-'):
+            if prefix + 'Remaining' in headers:
+                self.remaining = int(headers[prefix + 'Remaining'])
+                self.limit = int(headers.get(prefix + 'Limit',
+                                             self.limit or self.remaining))
+                self.reset = float(headers.get(prefix + 'Reset', time.time()))
+                return
+
+    def stats(self):
+        """Human readable summary of this budget."""  # Ignore QuotesBear
+        if self.remaining is None or self.reset <= time.time():
+            left = 'no rate limit known'
+        else:
+            left = '{}/{} left, resets in {:.0f}s'.format(
+                self.remaining, self.limit, self.reset - time.time())
+        return '{}, {} requests, {} waited, {} retried'.format(
+            left, self.requests, self.waits, self.retries)
+
+
+class Scheduler:
+    """
+    Paces the requests sent to rate limited APIs, with a ``Budget`` per
+    token and host.
+
+    Requests made within ``background()`` leave a reserve of the budget to
+    the ones made by chat commands, and wait for the rate limit to reset
+    however long that takes. Other requests raise ``RateLimited`` instead of
+    waiting longer than ``max_wait`` seconds. Idempotent requests failing
+    because of the rate limit or a server error are retried with
+    exponential backoff.
+    """
+
+    IDEMPOTENT = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    TOKEN_PARAMETERS = ('access_token', 'private_token')
+
+    def __init__(self, rate, burst, reserve, max_wait, retries=3, backoff=1):
+        """
+        :param rate:     Requests per second allowed to each token and host.
+        :param burst:    Requests each token and host may send at once.
+        :param reserve:  Share of every budget background requests leave.
+        :param max_wait: Seconds other requests wait for the budget at most.
+        :param retries:  Number of times a failed request is retried.
+        :param backoff:  Seconds before the first retry, doubled after each.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.retries = retries
+        self.backoff = backoff
+
+        self.budgets = {}
+        self._condition = threading.Condition()
+        self._local = threading.local()
+        self.adapter = SchedulingAdapter(self)
+
+    @contextmanager
+    def background(self):
+        """Make the requests of the current thread background requests."""  # Ignore QuotesBear
+        previous = getattr(self._local, 'background', False)
+        self._local.background = True
+        try:
+            yield
+        finally:
+            self._local.background = previous
+
+    def session(self):
+        """A new ``requests.Session`` sending through this scheduler."""  # Ignore QuotesBear
+        session = Session()
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+        return session
+
+    def key(self, request):
+        """
+        The host and a digest of the token a request is sent with, tokens
+        being sent either as ``Authorization`` header or URL parameter.
+        """
+        url = urlsplit(request.url)
+        # Without its scheme, e.g. ``token``, to match the URL parameter.
+        token = ''.join(request.headers.get('Authorization', '').split()[-1:])
+        query = parse_qs(url.query)
+        for parameter in self.TOKEN_PARAMETERS:
+            token += ''.join(query.get(parameter, ()))
+        digest = hashlib.sha256(token.encode()).hexdigest()[:8]
+        return url.hostname, digest if token else 'anonymous'
+
+    def acquire(self, key):
+        """
+        Wait until ``key`` may send a request.
+
+        :raises RateLimited: If a foreground request would wait longer than
+                             ``max_wait``.
+        """
+        background = getattr(self._local, 'background', False)
+        with self._condition:
+            budget = self.budgets.get(key)
+            if budget is None:
+                budget = self.budgets[key] = Budget(self.rate, self.burst)
+            while True:
+                wait = budget.delay(background, self.reserve)
+                if wait <= 0:
+                    budget.take()
+                    return
+                if not background and wait > self.max_wait:
+                    raise RateLimited(key[0], wait)
+                budget.waits += 1
+                self._condition.wait(wait)
+
+    def update(self, key, response):
+        with self._condition:
+            self.budgets[key].update(response.headers)
+            self._condition.notify_all()
+
+    def retried(self, key):
+        with self._condition:
+            self.budgets[key].retries += 1
+
+    def retry_delay(self, request, response, attempt):
+        """
+        Seconds to wait before retrying ``request`` or None if it isn't
+        retried.
+
+        :raises RateLimited: If a foreground request would wait longer than
+                             ``max_wait``, e.g. as told by ``Retry-After``.
+        """
+        if attempt >= self.retries or request.method not in self.IDEMPOTENT:
+            return None
+        exhausted = (response.status_code == 403 and response.headers.get(
+            'X-RateLimit-Remaining') == '0')
+        if response.status_code not in self.RETRY_STATUSES and not exhausted:
+            return None
+        if exhausted:
+            # ``acquire`` waits for the reset sent along.
+            return 0
+        try:
+            delay = int(response.headers['Retry-After'])
+        except (KeyError, ValueError):
+            delay = self.backoff * 2 ** attempt
+        if (delay > self.max_wait and
+                not getattr(self._local, 'background', False)):
+            raise RateLimited(urlsplit(request.url).hostname, delay)
+        return delay
+
+    def stats(self):
+        """Human readable summary of every budget."""  # Ignore QuotesBear
+        with self._condition:
+            return '\n'.join(
+                '{} ({}): {}'.format(host, token, budget.stats())
+                for (host, token), budget in sorted(self.budgets.items())
+            ) or 'No API request was sent yet.'
+
+
+class SchedulingAdapter(CountingAdapter):
+    """
+    A transport adapter sending every request through a ``Scheduler``, each
+    attempt being counted.
+    """
+
+    def __init__(self, scheduler, **kwargs):
+        super().__init__(**kwargs)
+        self.scheduler = scheduler
+
+    def send(self, request, **kwargs):
+        key = self.scheduler.key(request)
+        attempt = 0
+        while True:
+            self.scheduler.acquire(key)
+            response = super().send(request, **kwargs)
+            self.scheduler.update(key, response)
+            try:
+                delay = self.scheduler.retry_delay(request, response, attempt)
+            except RateLimited:
+                response.close()
+                raise
+            if delay is None:
+                return response
+            log.info('Retrying {} {} in {}s after a {} response'.format(
+                request.method, request.url.split('?')[0], delay,
+                response.status_code))
+            response.close()
+            self.scheduler.retried(key)
+            attempt += 1
+            time.sleep(delay)
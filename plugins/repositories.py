@@ -0,0 +1,200 @@
+from collections.abc import Mapping
+import threading
+import time
+from urllib.parse import quote
+
+
+class Record:
+    """
+    A repository or team, without the client object taking much more
+    memory, which is created from it when needed.
+    """
+
+    __slots__ = ('host', 'full_name', 'id')
+
+    def __init__(self, host, full_name, id=None):
+        self.host = host
+        self.full_name = full_name
+        self.id = id
+
+    def __repr__(self):
+        return 'Record({!r}, {!r}, {!r})'.format(
+            self.host, self.full_name, self.id)
+
+
+class RepoSync:
+    """
+    The repositories of an org on one hoster, kept up to date by listing
+    only the ones which changed since the previous listing.
+
+    Repositories are listed most recently changed first, so that an
+    incremental listing stops at the first one which didn't change since,
+    without fetching the following pages. Deleted repositories and ones
+    moved out of the org only disappear with a full listing, which is done
+    every ``full_every`` seconds.
+    """
+
+    # The host in the URLs of the repositories, the listing, formatted with
+    # the quoted org, and its query parameters.
+    HOST = None
+    URL = None
+    PARAMS = {}
+    # The fields holding the full name of a repository and when it last
+    # changed, as ISO 8601 string.
+    FULL_NAME = None
+    CHANGED = None
+    PER_PAGE = 100
+
+    def __init__(self, token, org, session, full_every):
+        """
+        :param token:      IGitt token the listing is sent with.
+        :param org:        Name of the org.
+        :param session:    ``requests.Session`` the listing is sent with.
+        :param full_every: Seconds after which the next listing is full.
+        """
+        self.token = token
+        self.org = org
+        self.session = session
+        self.full_every = full_every
+
+        self.repos = {}
+        self.since = None
+        self.listed = 0
+        self._full = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def writable(data):
+        """Whether the token may push to the listed repository."""  # Ignore QuotesBear
+        return True
+
+    def pages(self):
+        """
+        The repositories of the listing, one page after the other.
+
+        :raises requests.RequestException: If a page couldn't be fetched.
+        """
+        url = self.URL.format(org=quote(self.org, safe=''))
+        params = dict(self.PARAMS, per_page=self.PER_PAGE,
+                      **self.token.parameter)
+        while url:
+            response = self.session.get(url, params=params)
+            response.raise_for_status()
+            yield from response.json()
+            url = response.links.get('next', {}).get('url')
+            # The next link has every parameter already.
+            params = None
+
+    def sync(self, full=None):
+        """
+        List the repositories again, replacing ``repos`` by a new dict
+        mapping their full paths to their ``Record``, which is returned.
+
+        :param full: Whether all repositories are listed rather than those
+                     changed since the previous listing. By default, only
+                     if ``full_every`` seconds passed since the last full
+                     listing.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if full is None:
+                full = self._full is None or now - self._full >= self.full_every
+            full = full or self.since is None
+
+            repos = {} if full else dict(self.repos)
+            since, listed = self.since, 0
+            for data in self.pages():
+                changed = data[self.CHANGED]
+                # The same timestamp may have been seen partly, so it's
+                # listed again.
+                if not full and changed < self.since:
+                    break
+                listed += 1
+                since = changed if since is None else max(since, changed)
+                full_name = data[self.FULL_NAME]
+                if full_name.split('/')[0] != self.org:
+                    continue
+                if self.writable(data):
+                    repos[full_name] = Record(self.HOST, full_name,
+                                              data['id'])
+                else:
+                    repos.pop(full_name, None)
+
+            # Swapped at once, readers keep the dict they got.
+            self.repos, self.since, self.listed = repos, since, listed
+            if full:
+                self._full = now
+            return repos
+
+
+class GitHubRepoSync(RepoSync):
+    HOST = 'github'
+    URL = 'https://api.github.com/orgs/{org}/repos'
+    PARAMS = {'sort': 'updated', 'direction': 'desc'}
+    FULL_NAME = 'full_name'
+    CHANGED = 'updated_at'
+
+    @staticmethod
+    def writable(data):
+        return data.get('permissions', {}).get('push', False)
+
+
+class GitLabRepoSync(RepoSync):
+    HOST = 'gitlab'
+    URL = 'https://gitlab.com/api/v4/projects'
+    # Developer access, the least allowing to push.
+    PARAMS = {'membership': 'true', 'min_access_level': 30,
+              'order_by': 'last_activity_at', 'sort': 'desc'}
+    FULL_NAME = 'path_with_namespace'
+    CHANGED = 'last_activity_at'
+
+
+class Registry(Mapping):
+    """
+    Repositories keyed by ``(host, full path)``, e.g. ``('gitlab',
+    'coala/sub/a')``, ignoring case, with an index of their names.
+
+    Only the ``Record`` of each repository is kept, its client object is
+    given by ``materialise`` when it's looked up. A registry isn't changed
+    once built, a new one replaces it.
+    """
+
+    def __init__(self, records=(), materialise=None):
+        """
+        :param records:     Dict or iterable of ``((host, full path),
+                            Record)`` tuples. Of records with the same key,
+                            the last one is kept.
+        :param materialise: Callable returning the client object of a
+                            ``Record``.
+        """
+        self.materialise = materialise
+        self._records = {}
+        for key, record in dict(records).items():
+            self._records[self._fold(key)] = record
+        self._names = {}
+        for host, path in self._records:
+            self._names.setdefault(path.split('/')[-1], []).append(
+                (host, path))
+
+    @staticmethod
+    def _fold(key):
+        host, path = key
+        return host.casefold(), path.strip('/').casefold()
+
+    def record(self, key):
+        """The ``Record`` of the repository ``key``."""  # Ignore QuotesBear
+        return self._records[self._fold(key)]
+
+    def __getitem__(self, key):
+        return self.materialise(self.record(key))
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def __len__(self):
+        return len(self._records)
+
+    def named(self, name):
+        """The ``Record`` of the repositories called ``name``, in order."""  # Ignore QuotesBear
+        return [self._records[key]
+                for key in self._names.get(name.casefold(), ())]
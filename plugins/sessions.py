@@ -0,0 +1,65 @@
+import threading
+
+import requests
+from requests.packages.urllib3.util.retry import Retry
+
+from plugins import constants
+from plugins.traffic import CountingAdapter
+
+
+class PooledSession(requests.Session):
+    """
+    A ``requests.Session`` keeping the connections to each host alive in a
+    pool of its own, so that requests don't pay for a new TCP and TLS
+    handshake, and timing out requests which don't set a timeout.
+
+    Idempotent requests are retried after connection errors and gateway
+    errors, other requests aren't as they could have had an effect.
+    """
+
+    # Responses of overloaded or restarting services.
+    RETRY_STATUSES = (502, 503, 504)
+
+    def __init__(self, timeout, retries, pool_size):
+        """
+        :param timeout:   ``(connect, read)`` seconds of requests which don't
+                          set a timeout.
+        :param retries:   Number of times an idempotent request is retried.
+        :param pool_size: Number of connections kept alive per host.
+        """
+        super().__init__()
+        self.timeout = timeout
+        # Retry only retries the idempotent methods by default.
+        adapter = CountingAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size,
+            max_retries=Retry(total=retries, backoff_factor=0.5,
+                              status_forcelist=self.RETRY_STATUSES,
+                              raise_on_status=False))
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared():
+    """The ``PooledSession`` of the plugins, created when first used."""  # Ignore QuotesBear
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = PooledSession(
+                timeout=(constants.HTTP_CONNECT_TIMEOUT,
+                         constants.HTTP_READ_TIMEOUT),
+                retries=constants.HTTP_RETRIES,
+                pool_size=constants.HTTP_POOL_SIZE)
+        return _shared
+
+
+def timeout(read):
+    """The timeout of a service answering in ``read`` seconds."""  # Ignore QuotesBear
+    return constants.HTTP_CONNECT_TIMEOUT, read
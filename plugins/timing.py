@@ -0,0 +1,322 @@
+from collections import OrderedDict
+import functools
+import inspect
+import math
+import os
+import threading
+import time
+import types
+
+from errbot import BotPlugin
+
+# The plugins of corobo, as opposed to those coming with errbot.
+PLUGINS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_local = threading.local()
+
+
+class Invocation:
+    """
+    A call of a handler, running on the current thread while it's used as
+    context manager, so that what's done meanwhile is attributed to it.
+    """
+
+    def __init__(self, plugin, name):
+        self.plugin = plugin
+        self.name = name
+        # Anything counted along, e.g. requests per host.
+        self.counts = {}
+
+    def __enter__(self):
+        # The invocation it interrupts is kept per thread, as ``carry``
+        # enters the same invocation on several threads at once.
+        _previous().append(current())
+        _local.invocation = self
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.invocation = _previous().pop()
+
+
+def _previous():
+    if not hasattr(_local, 'previous'):
+        _local.previous = []
+    return _local.previous
+
+
+def current():
+    """The ``Invocation`` running on this thread, or None."""  # Ignore QuotesBear
+    return getattr(_local, 'invocation', None)
+
+
+def carry(function):
+    """
+    ``function`` running as part of the current invocation, on whichever
+    thread it's called, e.g. of a pool.
+    """
+    invocation = current()
+    if invocation is None:
+        return function
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with invocation:
+            return function(*args, **kwargs)
+    return wrapper
+
+
+class Histogram:
+    """
+    Distribution of durations in a fixed number of buckets, each
+    ``GROWTH`` times as wide as the previous one, so that it takes the same
+    memory whatever the number of samples and its percentiles are off by
+    at most that ratio.
+    """
+
+    SMALLEST = 0.001
+    GROWTH = 1.25
+    # Up to about half an hour, longer durations are in the last bucket.
+    BUCKETS = 64
+
+    def __init__(self):
+        self.counts = [0] * (self.BUCKETS + 1)
+        self.count = 0
+        self.max = 0
+
+    def add(self, seconds):
+        if seconds <= self.SMALLEST:
+            index = 0
+        else:
+            index = min(self.BUCKETS, math.ceil(
+                math.log(seconds / self.SMALLEST, self.GROWTH)))
+        self.counts[index] += 1
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def percentile(self, percent):
+        """
+        The duration ``percent`` percent of the samples didn't exceed,
+        rounded up to the bound of its bucket, or None without samples.
+        """
+        if not self.count:
+            return None
+        rank = math.ceil(percent / 100 * self.count)
+        seen = 0
+        for index, count in enumerate(self.counts[:-1]):
+            seen += count
+            if seen >= rank:
+                return min(self.SMALLEST * self.GROWTH ** index, self.max)
+        return self.max
+
+
+class Timings:
+    """How long a handler of a plugin took and how often it failed."""  # Ignore QuotesBear
+
+    def __init__(self, plugin, name):
+        self.plugin = plugin
+        self.name = name
+
+        self.errors = 0
+        self.latency = Histogram()
+        # Of generator commands, until their first reply.
+        self.first = Histogram()
+        self._lock = threading.Lock()
+
+    def record(self, seconds, failed=False):
+        with self._lock:
+            self.latency.add(seconds)
+            self.errors += failed
+
+    def record_first(self, seconds):
+        with self._lock:
+            self.first.add(seconds)
+
+    @staticmethod
+    def _percentiles(histogram):
+        return ', '.join(
+            'p{} {:.1f} ms'.format(percent,
+                                   histogram.percentile(percent) * 1000)
+            for percent in (50, 95, 99))
+
+    def stats(self):
+        """Human readable summary of the timings of this handler."""  # Ignore QuotesBear
+        with self._lock:
+            line = '{}.{}: {} calls, {} errors, {}'.format(
+                self.plugin, self.name, self.latency.count, self.errors,
+                self._percentiles(self.latency))
+            if self.first.count:
+                line += ', first reply ' + self._percentiles(self.first)
+            return line
+
+
+class Recorder:
+    """
+    Times the commands and ``callback_message`` of the corobo plugins.
+
+    Once installed on a bot, the handlers of every plugin are replaced by
+    timed ones right before errbot registers its commands.
+    """
+
+    _of_lock = threading.Lock()
+
+    def __init__(self):
+        self._timings = OrderedDict()
+        self._lock = threading.Lock()
+        self.installed = False
+        self._inject = None
+
+    @classmethod
+    def of(cls, bot):
+        """The recorder shared by the plugins of ``bot``."""  # Ignore QuotesBear
+        with cls._of_lock:
+            if not hasattr(bot, 'timing_recorder'):
+                bot.timing_recorder = cls()
+            return bot.timing_recorder
+
+    def timings(self, plugin, name):
+        """The ``Timings`` of the handler ``name`` of ``plugin``."""  # Ignore QuotesBear
+        with self._lock:
+            return self._timings.setdefault((plugin, name),
+                                            Timings(plugin, name))
+
+    @staticmethod
+    def timed(function, timings):
+        """
+        ``function`` recording its calls in ``timings``, running as an
+        ``Invocation``.
+        """
+        if inspect.isgeneratorfunction(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                invocation = Invocation(timings.plugin, timings.name)
+                start = time.perf_counter()
+                replied = False
+                replies = function(*args, **kwargs)
+                try:
+                    while True:
+                        # Not while the caller handles the replies.
+                        with invocation:
+                            try:
+                                reply = next(replies)
+                            except StopIteration:
+                                break
+                        if not replied:
+                            replied = True
+                            timings.record_first(time.perf_counter() - start)
+                        yield reply
+                except Exception:
+                    timings.record(time.perf_counter() - start, failed=True)
+                    raise
+                finally:
+                    # The caller may stop reading the replies early, the
+                    # command cleans up as part of the invocation.
+                    with invocation:
+                        replies.close()
+                timings.record(time.perf_counter() - start)
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    with Invocation(timings.plugin, timings.name):
+                        result = function(*args, **kwargs)
+                except Exception:
+                    timings.record(time.perf_counter() - start, failed=True)
+                    raise
+                timings.record(time.perf_counter() - start)
+                return result
+        wrapper.timed = True
+        return wrapper
+
+    @staticmethod
+    def _handlers(plugin):
+        # Looked up on the class, as reading the properties of some plugins
+        # is slow.
+        for name, function in inspect.getmembers(type(plugin),
+                                                  inspect.isfunction):
+            if getattr(function, '_err_command', False) or (
+                    name == 'callback_message' and
+                    function is not BotPlugin.callback_message):
+                yield name, function
+
+    @staticmethod
+    def corobo(plugin):
+        """Whether ``plugin`` is one of the corobo plugins."""  # Ignore QuotesBear
+        source = os.path.abspath(inspect.getfile(type(plugin)))
+        return os.path.dirname(source) == PLUGINS_DIR
+
+    def instrument(self, plugin):
+        """
+        Replace the handlers of ``plugin`` by timed ones, unless it was
+        instrumented already.
+        """
+        for name, function in self._handlers(plugin):
+            if getattr(getattr(plugin, name), 'timed', False):
+                continue
+            timed = self.timed(function, self.timings(plugin.name, name))
+            setattr(plugin, name, types.MethodType(timed, plugin))
+
+    def uninstrument(self, plugin):
+        """
+        Put back the handlers ``instrument`` replaced.
+
+        :return: Whether ``plugin`` was instrumented.
+        """
+        instrumented = False
+        for name, _ in self._handlers(plugin):
+            if getattr(vars(plugin).get(name), 'timed', False):
+                delattr(plugin, name)
+                instrumented = True
+        return instrumented
+
+    def install(self, bot):
+        """
+        Instrument the active plugins of ``bot`` and every plugin activated
+        afterwards.
+        """
+        with self._lock:
+            if self.installed:
+                return
+            self.installed = True
+
+        inject = self._inject = bot.inject_commands_from
+
+        def inject_commands_from(plugin):
+            if self.corobo(plugin):
+                self.instrument(plugin)
+            inject(plugin)
+        bot.inject_commands_from = inject_commands_from
+
+        for plugin in bot.plugin_manager.get_all_active_plugin_objects():
+            bot.remove_commands_from(plugin)
+            inject_commands_from(plugin)
+
+    def uninstall(self, bot):
+        """
+        Undo ``install``: stop instrumenting the plugins activated on
+        ``bot`` and put back the handlers of the active ones.
+        """
+        with self._lock:
+            if not self.installed:
+                return
+            self.installed = False
+
+        bot.inject_commands_from = self._inject
+        for plugin in bot.plugin_manager.get_all_active_plugin_objects():
+            if self.uninstrument(plugin):
+                bot.remove_commands_from(plugin)
+                self._inject(plugin)
+
+    def stats(self, plugin=None):
+        """
+        Human readable summary of the timings of the handlers of ``plugin``,
+        of every plugin by default, slowest first. Handlers which weren't
+        called are left out.
+        """
+        with self._lock:
+            timings = [timing for timing in self._timings.values()
+                       if timing.latency.count and (
+                           plugin is None or
+                           timing.plugin.casefold() == plugin.casefold())]
+        timings.sort(key=lambda timing: -timing.latency.percentile(95))
+        return '\n'.join(timing.stats() for timing in timings)
@@ -0,0 +1,163 @@
+from contextlib import contextmanager
+import threading
+import time
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+from plugins import timing
+
+
+class Usage:
+    """The requests a handler sent to one host."""  # Ignore QuotesBear
+
+    FIELDS = ('requests', 'errors', 'sent', 'received', 'seconds',
+              'invocations', 'most')
+
+    def __init__(self, requests=0, errors=0, sent=0, received=0, seconds=0,
+                 invocations=0, most=0):
+        self.requests = requests
+        self.errors = errors
+        self.sent = sent
+        self.received = received
+        self.seconds = seconds
+        # Invocations of the handler which sent requests to the host, and
+        # the most requests one of them sent.
+        self.invocations = invocations
+        self.most = most
+
+    def dump(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def stats(self):
+        """Human readable summary of this usage."""  # Ignore QuotesBear
+        line = '{} requests'.format(self.requests)
+        if self.invocations:
+            line += ' in {} calls (at most {})'.format(self.invocations,
+                                                      self.most)
+        return line + (', {} errors, {:.1f} kB sent, {:.1f} kB received, '
+                       '{:.1f} ms per request'.format(
+                           self.errors, self.sent / 1000,
+                           self.received / 1000,
+                           self.seconds / self.requests * 1000))
+
+
+def _size(body):
+    return len(body) if isinstance(body, (bytes, str)) else 0
+
+
+class Traffic:
+    """
+    Counts the HTTP requests of the plugins, per handler and host.
+
+    Only the requests of the plugins are counted, as sent through the
+    sessions they own, which have a ``CountingAdapter`` mounted, or within
+    ``counted`` for clients which can't be given a session. They are
+    attributed to the ``timing.Invocation`` running, requests of background
+    threads to none.
+    """
+
+    # The traffic requests are counted for, once installed.
+    active = None
+
+    def __init__(self, usage=None):
+        """
+        :param usage: Dict as returned by ``dump``.
+        """
+        self._usage = {key: Usage(**fields)
+                       for key, fields in (usage or {}).items()}
+        self._lock = threading.Lock()
+
+    def record(self, url, sent, received, seconds, failed=False):
+        """Count a request to ``url`` of the running invocation."""  # Ignore QuotesBear
+        host = urlsplit(url).hostname
+        invocation = timing.current()
+        if invocation is None:
+            key = (None, None, host)
+        else:
+            key = (invocation.plugin, invocation.name, host)
+        with self._lock:
+            usage = self._usage.setdefault(key, Usage())
+            usage.requests += 1
+            usage.errors += failed
+            usage.sent += sent
+            usage.received += received
+            usage.seconds += seconds
+            if invocation is not None:
+                count = invocation.counts.get(host, 0) + 1
+                invocation.counts[host] = count
+                usage.invocations += count == 1
+                usage.most = max(usage.most, count)
+
+    def dump(self):
+        """The counters, as plain dict to be stored."""  # Ignore QuotesBear
+        with self._lock:
+            return {key: usage.dump() for key, usage in self._usage.items()}
+
+    def stats(self, plugin=None):
+        """
+        Human readable summary of the requests of the handlers of
+        ``plugin``, of every plugin by default, most per call first.
+        """
+        with self._lock:
+            usage = [(key, Usage(**usage.dump()))
+                     for key, usage in self._usage.items()
+                     if plugin is None or
+                     (key[0] or '').casefold() == plugin.casefold()]
+        usage.sort(key=lambda item: -item[1].most)
+        return '\n'.join(
+            '{} {}: {}'.format('{}.{}'.format(*key[:2]) if key[0]
+                               else 'background', key[2], usage.stats())
+            for key, usage in usage)
+
+    def install(self):
+        """Count the requests of every plugin from now on."""  # Ignore QuotesBear
+        Traffic.active = self
+
+    def uninstall(self):
+        if Traffic.active is self:
+            Traffic.active = None
+
+
+def _record(*args, **kwargs):
+    traffic = Traffic.active
+    if traffic is not None:
+        traffic.record(*args, **kwargs)
+
+
+class CountingAdapter(HTTPAdapter):
+    """
+    A transport adapter counting the requests it sends in the installed
+    ``Traffic``, to be mounted on the sessions of the plugins.
+    """
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = super().send(request, **kwargs)
+        except Exception:
+            _record(request.url, _size(request.body), 0,
+                    time.perf_counter() - start, failed=True)
+            raise
+        # The body is read right after unless streamed.
+        received = (int(response.headers.get('Content-Length') or 0)
+                    if kwargs.get('stream') else len(response.content))
+        _record(request.url, _size(request.body), received,
+                time.perf_counter() - start,
+                failed=response.status_code >= 400)
+        return response
+
+
+@contextmanager
+def counted(url):
+    """
+    Count what runs meanwhile as one request to ``url``, of which neither
+    size is known, for clients which can't be given a session.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        _record(url, 0, 0, time.perf_counter() - start, failed=True)
+        raise
+    _record(url, 0, 0, time.perf_counter() - start)
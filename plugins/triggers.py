@@ -0,0 +1,18 @@
+from errbot import BotPlugin, botcmd
+
+from plugins.dispatch import Dispatcher
+
+
+class Triggers(BotPlugin):
+    """
+    Hands every chat message to the ``Dispatcher`` other plugins register
+    their triggers with.
+    """
+
+    def callback_message(self, msg):
+        Dispatcher.of(self._bot).dispatch(msg)
+
+    @botcmd(admin_only=True)
+    def triggers(self, msg, arg):
+        """Show how often each trigger searched messages and matched."""  # Ignore QuotesBear
+        return Dispatcher.of(self._bot).stats()
@@ -0,0 +1,90 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+
+import ramlient
+from ramlient import Client
+
+RAML_PATH = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'webservices.raml')
+
+log = logging.getLogger(__name__)
+
+
+class LazyClient:
+    """
+    A ramlient ``Client`` which is only built when it's first used.
+
+    Parsing the RAML spec is slow, so when a ``cache_dir`` is set the parsed
+    spec is pickled there, keyed by the version of ramlient and the hash of
+    the spec, and later clients load it from there instead of parsing the
+    spec again.
+    """
+
+    def __init__(self, path, cache_dir=None):
+        self.path = path
+        self.cache_dir = cache_dir
+        self._client = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attr):
+        return getattr(self.client, attr)
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = self._load()
+            return self._client
+
+    def _load(self):
+        with open(self.path, 'rb') as raml_file:
+            digest = hashlib.sha256(raml_file.read()).hexdigest()
+
+        artifact = None
+        if self.cache_dir is not None:
+            artifact = os.path.join(self.cache_dir, '{}-{}-{}.pickle'.format(
+                os.path.basename(self.path), ramlient.__version__,
+                digest[:16]))
+            try:
+                with open(artifact, 'rb') as cached:
+                    return self._from_raml(pickle.load(cached))
+            except OSError:
+                log.debug('No parsed RAML spec at {}'.format(artifact))
+            except Exception:
+                # Whatever unpickling raises, e.g. for a truncated file.
+                log.exception('Could not load the parsed RAML spec at {}, '
+                              'parsing it again'.format(artifact))
+
+        client = Client(self.path)
+        if artifact is not None:
+            self._store(artifact, client.raml)
+        return client
+
+    def _from_raml(self, raml):
+        # ramlient can only be built from a spec file, so the parsing done in
+        # its constructor is skipped by hand.
+        client = Client.__new__(Client)
+        client.ramlfile = self.path
+        client.ramlconfig = None
+        client.raml = raml
+        client.base_uri = raml.base_uri
+        return client
+
+    @staticmethod
+    def _store(artifact, raml):
+        try:
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(artifact))
+        except OSError:
+            log.exception('Could not store the parsed RAML spec')
+            return
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                pickle.dump(raml, tmp_file)
+            os.replace(tmp, artifact)
+        except (OSError, pickle.PicklingError):
+            log.exception('Could not store the parsed RAML spec')
+            os.remove(tmp)
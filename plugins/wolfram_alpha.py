@@ -4,6 +4,12 @@ import wolframalpha
 
 from errbot import BotPlugin, botcmd
 
+from plugins import constants, sessions
+from plugins.circuit import breaker
+
+# Where the queries are sent.
+QUERY_URL = 'https://api.wolframalpha.com/v2/query'
+
 
 class WolframAlpha(BotPlugin):
     """
@@ -12,7 +18,7 @@ class WolframAlpha(BotPlugin):
 
     def activate(self):
         super().activate()
-        self.client = wolframalpha.Client(os.environ.get('WA_TOKEN'))
+        self.app_id = os.environ.get('WA_TOKEN')
 
     @botcmd
     def wa(self, msg, arg):
@@ -20,7 +26,7 @@ class WolframAlpha(BotPlugin):
         Query the Computational Knowledge Engine.
         """
         ans = ''
-        res = self.client.query(arg)
+        res = breaker('Wolfram Alpha').call(self.query, arg)
         try:
             for pod in res.pods:
                 if pod.title in ['Result', 'Results']:
@@ -29,3 +35,12 @@ class WolframAlpha(BotPlugin):
         except AttributeError:
             self.log.info('KeyError triggered on retrieving pods.')
         return ans if ans else 'Dunno :('
+
+    def query(self, arg):
+        # Sent the way wolframalpha.Client does, but with a timeout, which
+        # its urllib request lacks.
+        rq = sessions.shared().get(
+            QUERY_URL, params={'input': arg, 'appid': self.app_id},
+            timeout=sessions.timeout(constants.WOLFRAM_ALPHA_TIMEOUT))
+        rq.raise_for_status()
+        return wolframalpha.Result(rq.content)
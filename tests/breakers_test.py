@@ -0,0 +1,13 @@
+from plugins import circuit
+
+pytest_plugins = ['errbot.backends.test']
+
+extra_plugin_dir = 'plugins'
+
+
+def test_breakers(testbot):
+    circuit._breakers.clear()
+    testbot.assertCommand('!breakers', 'No third party service')
+    circuit.breaker('Gizoogle')
+    testbot.assertCommand('!breakers', 'Gizoogle: closed, 0 failures')
+    circuit._breakers.clear()
@@ -0,0 +1,232 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import requests
+import requests_mock
+
+from plugins.cache import CachedResource, ResultCache
+
+URL = 'http://webservices.coala.io/list/bears'
+
+
+def fetch(headers):
+    return requests.get(URL, headers=headers)
+
+
+class TestCachedResource(unittest.TestCase):
+
+    def test_ttl(self):
+        cache = CachedResource(fetch, ttl=60, transform=len)
+        self.assertIsNone(cache.age)
+        self.assertIn('never fetched', cache.stats())
+        with requests_mock.Mocker() as m:
+            m.get(URL, json={'a': 1, 'b': 2})
+            self.assertEqual(cache.get(), 2)
+            self.assertEqual(cache.get(), 2)
+            self.assertEqual(m.call_count, 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertIn('1 hits, 0 stale hits, 1 misses, 0 revalidated, '
+                      'fetched', cache.stats())
+
+    def test_revalidation(self):
+        cache = CachedResource(fetch, ttl=60)
+        with requests_mock.Mocker() as m:
+            m.get(URL, json={'a': 1},
+                  headers={'ETag': '"abc"', 'Last-Modified': 'yesterday'})
+            cache.get()
+            self.assertNotIn('If-None-Match', m.last_request.headers)
+
+            m.get(URL, status_code=304)
+            self.assertEqual(cache.refresh(), {'a': 1})
+            self.assertEqual(m.last_request.headers['If-None-Match'], '"abc"')
+            self.assertEqual(m.last_request.headers['If-Modified-Since'],
+                             'yesterday')
+            self.assertEqual(cache.revalidations, 1)
+            self.assertTrue(cache.fresh)
+
+            m.get(URL, json={'b': 2})
+            self.assertEqual(cache.refresh(), {'b': 2})
+
+            m.get(URL, status_code=500)
+            with self.assertRaises(requests.HTTPError):
+                cache.refresh()
+            self.assertEqual(cache.get(), {'b': 2})
+
+    def test_stale_while_revalidate(self):
+        revalidated = threading.Event()
+        cache = CachedResource(fetch, ttl=60)
+        with requests_mock.Mocker() as m:
+            m.get(URL, json={'a': 1})
+            cache.get()
+            cache.invalidate()
+            self.assertFalse(cache.fresh)
+
+            m.get(URL, json={'a': 2})
+            with patch.object(cache, 'refresh',
+                              side_effect=lambda: revalidated.wait(5)):
+                self.assertEqual(cache.get(), {'a': 1})
+                self.assertEqual(cache.get(), {'a': 1})
+                self.assertEqual(cache.stale_hits, 2)
+                self.assertTrue(cache._revalidating)
+                revalidated.set()
+            for _ in range(100):
+                if not cache._revalidating:
+                    break
+                time.sleep(0.01)
+
+            cache._background_refresh()
+            self.assertEqual(cache.get(), {'a': 2})
+
+            cache.invalidate()
+            m.get(URL, status_code=500)
+            with self.assertLogs('plugins.cache', 'ERROR'):
+                cache._background_refresh()
+            # No request may outlive the mocker, to be seen by other tests.
+            with patch.object(cache, '_revalidate_in_background'):
+                self.assertEqual(cache.get(), {'a': 2})
+
+    def test_snapshot(self):
+        path = os.path.join(tempfile.mkdtemp(), 'bears.snapshot')
+        cache = CachedResource(fetch, ttl=60, transform=len)
+        cache.persist_to(path)
+        self.assertIsNone(cache.age)
+
+        with requests_mock.Mocker() as m:
+            m.get(URL, json={'a': 1, 'b': 2}, headers={'ETag': '"abc"'})
+            cache.get()
+
+        restored = CachedResource(fetch, ttl=60, transform=len)
+        restored.persist_to(path)
+        with patch.object(restored, '_revalidate_in_background') as revalidate:
+            self.assertEqual(restored.get(), 2)
+        self.assertTrue(revalidate.called)
+        self.assertFalse(restored.fresh)
+        self.assertLess(restored.age, 60)
+
+        with requests_mock.Mocker() as m:
+            m.get(URL, status_code=304)
+            restored.refresh()
+            self.assertEqual(m.last_request.headers['If-None-Match'], '"abc"')
+        self.assertTrue(restored.fresh)
+
+        # an already loaded document isn't replaced
+        cache.persist_to(os.path.join(os.path.dirname(path), 'missing'))
+        self.assertEqual(cache.get(), 2)
+
+        with open(path, 'wb') as snapshot:
+            snapshot.write(b'garbage')
+        corrupt = CachedResource(fetch, ttl=60)
+        corrupt.persist_to(path)
+        self.assertIsNone(corrupt.age)
+
+        unwritable = CachedResource(fetch, ttl=60)
+        unwritable.persist_to(os.path.join(path, 'not-a-directory'))
+        with requests_mock.Mocker() as m:
+            m.get(URL, json={})
+            with self.assertLogs('plugins.cache', 'ERROR'):
+                unwritable.get()
+
+    def test_refresh(self):
+        cache = CachedResource(fetch, ttl=60)
+        with requests_mock.Mocker() as m:
+            m.get(URL, json={'a': 1}, headers={'ETag': '"abc"'})
+            self.assertEqual(cache.get(), {'a': 1})
+            m.get(URL, status_code=304)
+            self.assertEqual(cache.refresh(), {'a': 1})
+            self.assertEqual(m.call_count, 2)
+        self.assertEqual((cache.hits, cache.misses, cache.revalidations),
+                         (0, 1, 1))
+
+    def test_single_flight(self):
+        calls = []
+
+        def slow_fetch(headers):
+            calls.append(headers)
+            time.sleep(0.1)
+            return fetch(headers)
+
+        cache = CachedResource(slow_fetch, ttl=60)
+        with requests_mock.Mocker() as m:
+            m.get(URL, json={'a': 1})
+            threads = [threading.Thread(target=cache.get) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((cache.hits, cache.misses), (4, 1))
+
+    def test_stale_during_revalidation(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_fetch(headers):
+            if headers:
+                started.set()
+                release.wait(5)
+            return fetch(headers)
+
+        cache = CachedResource(slow_fetch, ttl=60)
+        with requests_mock.Mocker() as m:
+            m.get(URL, json={'a': 1}, headers={'ETag': '"abc"'})
+            cache.get()
+            cache.invalidate()
+
+            m.get(URL, json={'a': 2})
+            self.assertEqual(cache.get(), {'a': 1})
+            self.assertTrue(started.wait(5))
+            # the revalidation running doesn't hold up readers
+            start = time.monotonic()
+            self.assertEqual(cache.get(), {'a': 1})
+            self.assertLess(time.monotonic() - start, 1)
+            self.assertFalse(release.is_set())
+
+            release.set()
+            self.assertEqual(cache.refresh(), {'a': 2})
+
+
+class TestResultCache(unittest.TestCase):
+
+    def test_key(self):
+        self.assertEqual(ResultCache.key('python', {'a': 1, 'b': 2}, 'code'),
+                         ResultCache.key('python', {'b': 2, 'a': 1}, 'code'))
+        self.assertNotEqual(ResultCache.key('python', {}, 'code'),
+                            ResultCache.key('python', {}, 'code\n'))
+
+    def test_lru(self):
+        cache = ResultCache(size=2, ttl=60)
+        self.assertEqual(cache.hit_ratio, 0)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.hit_ratio, 2 / 3)
+        self.assertEqual(cache.stats(),
+                         '2 hits, 1 misses (67% hit ratio), 2 stored')
+
+    def test_ttl(self):
+        now = time.time()
+        cache = ResultCache(size=5, ttl=60,
+                            entries=[('old', now - 120, 1),
+                                     ('new', now, 2)])
+        self.assertEqual([key for key, _, _ in cache.entries()], ['new'])
+
+        cache.put('a', 1)
+        cache._entries['a'] = (now - 120, 1)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 1)
+
+    def test_restore(self):
+        cache = ResultCache(size=5, ttl=60)
+        cache.put('a', [1])
+        cache.put('b', [])
+        restored = ResultCache(size=1, ttl=60, entries=cache.entries())
+        self.assertEqual(restored.get('b'), [])
+        self.assertIsNone(restored.get('a'))
@@ -0,0 +1,83 @@
+import unittest
+
+from plugins.catalog import BearIndex, BearSearch, ContributorIndex
+
+BEARS = {
+    'PEP8Bear': {'languages': ['Python', 'Python 2', 'Python 3'],
+                 'desc': 'Detect and fix PEP8 style issues.'},
+    'PyLintBear': {'languages': ['Python', 'Python 3'],
+                   'desc': 'Checks the code with pylint for unused code.'},
+    'CPPCheckBear': {'languages': ['C++'],
+                     'desc': 'Report possible security weaknesses.'},
+    'AlexBear': {'languages': ['Natural Language'],
+                 'desc': 'Catch insensitive, inconsiderate writing.'},
+}
+
+
+class TestBearIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = BearIndex(BEARS)
+
+    def test_counts(self):
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.index.languages,
+                         {'Python', 'Python 2', 'Python 3', 'C++',
+                          'Natural Language'})
+
+    def test_bears_for(self):
+        self.assertEqual(self.index.bears_for('PYTHON'),
+                         ['PEP8Bear', 'PyLintBear'])
+        self.assertEqual(self.index.bears_for('python2'), ['PEP8Bear'])
+        self.assertEqual(self.index.bears_for('naturallanguage'),
+                         ['AlexBear'])
+        self.assertEqual(self.index.bears_for('Natural Language'),
+                         ['AlexBear'])
+        self.assertEqual(self.index.bears_for('cpp'), ['CPPCheckBear'])
+        self.assertEqual(self.index.bears_for('py3'),
+                         ['PEP8Bear', 'PyLintBear'])
+        self.assertEqual(self.index.bears_for('js'), [])
+        self.assertEqual(self.index.bears_for('brainfuck'), [])
+
+    def test_find_bear(self):
+        self.assertEqual(self.index.find_bear('pylintbear'), 'PyLintBear')
+        self.assertEqual(self.index.find_bear('PyLint'), 'PyLintBear')
+        self.assertEqual(self.index.find_bear('pylnt'), 'PyLintBear')
+        self.assertIsNone(self.index.find_bear('xyz'))
+        self.assertIs(self.index.search, self.index.search)
+
+    def test_resolve(self):
+        self.assertEqual(self.index.resolve('Python'), 'python')
+        self.assertEqual(self.index.resolve('python3'), 'python 3')
+        self.assertNotIn('js', self.index.aliases)
+
+
+class TestBearSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.search = BearSearch(BEARS)
+
+    def test_tokenize(self):
+        self.assertEqual(BearSearch.tokenize('PyLintBear'),
+                         {'py', 'lint', 'pylintbear'})
+        self.assertEqual(BearSearch.tokenize(['Unused Code', 'PEP8']),
+                         {'unused', 'code', 'pep', '8', 'pep8'})
+
+    def test_search(self):
+        self.assertEqual(self.search.search('pep8'), ['PEP8Bear'])
+        self.assertEqual(self.search.search('unused code')[0], 'PyLintBear')
+        self.assertEqual(self.search.search('securty'), ['CPPCheckBear'])
+        self.assertEqual(self.search.search('python', limit=1), ['PEP8Bear'])
+        self.assertEqual(self.search.search('the bear'), [])
+        self.assertEqual(self.search.search('xyz'), [])
+
+
+class TestContributorIndex(unittest.TestCase):
+
+    def test_get(self):
+        index = ContributorIndex([{'login': 'sils', 'issues': 3},
+                                  {'login': 'Makman2', 'issues': 5}])
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.get('SILS')['issues'], 3)
+        self.assertEqual(index.get('makman2')['issues'], 5)
+        self.assertIsNone(index.get('nobody'))
@@ -0,0 +1,97 @@
+import unittest
+from unittest.mock import Mock, patch
+
+from errbot import CommandError
+
+from plugins import circuit
+from plugins.circuit import Breaker, CircuitOpen
+
+
+class TestBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000
+        patcher = patch('time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = Breaker('Gizoogle', failures=2, slow=5, reset=60)
+
+    def fail(self):
+        raise ConnectionError
+
+    def test_trip(self):
+        self.assertEqual(self.breaker.call(lambda: 'ok'), 'ok')
+        with self.assertRaises(ConnectionError):
+            self.breaker.call(self.fail)
+        self.assertEqual(self.breaker.state, Breaker.CLOSED)
+        # server errors are failures too
+        self.breaker.call(lambda: Mock(status_code=503))
+        self.assertEqual(self.breaker.state, Breaker.OPEN)
+
+        function = Mock()
+        self.now += 30
+        with self.assertRaises(CircuitOpen) as raised:
+            self.breaker.call(function)
+        self.assertEqual(str(raised.exception),
+                         'Gizoogle is not answering at the moment, please '
+                         'try again in 30 seconds.')
+        self.assertIsInstance(raised.exception, CommandError)
+        function.assert_not_called()
+        self.assertEqual(self.breaker.stats(),
+                         'Gizoogle: open, 2 failures in a row, 3 calls, '
+                         '1 rejected, tripped 1 times')
+
+    def test_slow(self):
+        def slow():
+            self.now += 6
+            return Mock(status_code=200)
+        self.breaker.call(slow)
+        self.breaker.call(slow)
+        self.assertEqual(self.breaker.state, Breaker.OPEN)
+
+    def test_success_resets(self):
+        with self.assertRaises(ConnectionError):
+            self.breaker.call(self.fail)
+        self.breaker.call(lambda: None)
+        with self.assertRaises(ConnectionError):
+            self.breaker.call(self.fail)
+        self.assertEqual(self.breaker.state, Breaker.CLOSED)
+
+    def test_half_open(self):
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                self.breaker.call(self.fail)
+        self.now += 60
+        self.assertEqual(self.breaker.state, Breaker.HALF_OPEN)
+
+        # a failed trial opens the breaker again
+        with self.assertRaises(ConnectionError):
+            self.breaker.call(self.fail)
+        self.assertEqual(self.breaker.state, Breaker.OPEN)
+        self.assertEqual(self.breaker.trips, 1)
+
+        # one trial at a time
+        self.now += 60
+
+        def trial():
+            with self.assertRaises(CircuitOpen) as raised:
+                self.breaker.call(lambda: None)
+            self.assertIn('try again in 1 seconds', str(raised.exception))
+            return 'ok'
+        self.assertEqual(self.breaker.call(trial), 'ok')
+        self.assertEqual(self.breaker.state, Breaker.CLOSED)
+
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.addCleanup(circuit._breakers.clear)
+        circuit._breakers.clear()
+
+    def test_breaker(self):
+        gizoogle = circuit.breaker('Gizoogle')
+        self.assertIs(circuit.breaker('Gizoogle', slow=1), gizoogle)
+        self.assertEqual(gizoogle.slow, circuit.constants.BREAKER_SLOW)
+        self.assertEqual(circuit.breaker('coala online', slow=60).slow, 60)
+        self.assertEqual([breaker.name for breaker in circuit.breakers()],
+                         ['Gizoogle', 'coala online'])
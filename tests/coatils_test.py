@@ -1,10 +1,18 @@
 import logging
 import unittest
 import queue
+import threading
+import time
+from unittest.mock import patch
 
 from errbot.backends.test import TestBot
+import requests
+import requests_mock
 import vcr
 
+from plugins import circuit
+from plugins.cache import CachedResource, ResultCache
+from plugins.catalog import ContributorIndex
 from plugins.coatils import Coatils
 
 
@@ -34,6 +42,47 @@ class TestCoatils(unittest.TestCase):
                                     'Commited 2654 commits')
         self.testbot.assertCommand('!contrib stats some-non-existent',
                                    'stats for some-non-existent not found')
+        self.testbot.assertCommand('!contrib stats SILS',
+                                   'Commited 2654 commits')
+
+        coatils = self.testbot.bot.plugin_manager.get_plugin_obj_by_name(
+            'coatils')
+        coatils.refresh_contributors()
+        self.testbot.assertCommand('!coatils cache',
+                                   'Contributors: 2 hits, 0 stale hits, '
+                                   '1 misses')
+
+    def test_contrib_stats_while_refreshing(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def fetch(headers):
+            if headers:
+                started.set()
+                release.wait(5)
+            return requests.get('http://webservices.coala.io/contrib/')
+
+        contributors = CachedResource(fetch, ttl=60,
+                                      transform=ContributorIndex)
+        coatils = self.testbot.bot.plugin_manager.get_plugin_obj_by_name(
+            'coatils')
+        with requests_mock.Mocker() as m, \
+                patch.object(type(coatils), 'contributors', contributors):
+            m.get('http://webservices.coala.io/contrib/',
+                  json=[{'login': 'sils', 'contributions': 2654,
+                         'issues': 1, 'reviews': 2}],
+                  headers={'ETag': '"abc"'})
+            contributors.get()
+            refresh = threading.Thread(target=coatils.refresh_contributors)
+            refresh.start()
+            self.assertTrue(started.wait(5))
+            start = time.monotonic()
+            self.testbot.assertCommand('!contrib stats sils',
+                                       'Commited 2654 commits')
+            self.assertLess(time.monotonic() - start, 1)
+            self.assertFalse(release.is_set())
+            release.set()
+            refresh.join()
 
     @vcr.use_cassette('tests/cassettes/coatils_lang_stats.yaml')
     def test_lang_stats(self):
@@ -51,6 +100,8 @@ class TestCoatils(unittest.TestCase):
                                    'There are 17 bears for python language')
         self.testbot.assertCommand('!bear stats abc',
                                    'No bear exists for abc')
+        self.testbot.assertCommand('!bear stats Python3',
+                                   'There are 17 bears for Python3 language')
 
     @vcr.use_cassette('tests/cassettes/coatils_bear_stats_lang.yaml')
     def test_ls_bears(self):
@@ -59,25 +110,98 @@ class TestCoatils(unittest.TestCase):
         self.assertIn('RLintBear', self.testbot.pop_message())
         self.testbot.assertCommand('!ls bears brainfuck',
                                    'No bears found for brainfuck')
+        self.testbot.assertCommand('!ls bears python3',
+                                   'Bears for python3 are')
+        self.assertIn('PyLintBear', self.testbot.pop_message())
 
     @vcr.use_cassette('tests/cassettes/coatils_stats.yaml')
     def test_stats(self):
         self.testbot.assertCommand('!stats',
                                    'coala has 102 bears across 63 languages')
 
+    @vcr.use_cassette('tests/cassettes/coatils_stats.yaml')
+    def test_stale_catalog(self):
+        self.testbot.assertCommand('!stats', 'coala has 102 bears')
+        plugin = self.testbot.bot.plugin_manager.get_plugin_obj_by_name(
+            'coatils')
+        catalog = type(plugin).catalog
+        catalog._fetched_at = time.time() - 7200
+        with patch.object(catalog, '_revalidate_in_background') as revalidate:
+            self.testbot.assertCommand('!stats', 'coala has 102 bears')
+            self.assertEqual(self.testbot.pop_message(),
+                             'This data is 2 hours old, it is being '
+                             'refreshed.')
+            self.testbot.assertCommand('!ls bears r', 'Bears for r are')
+            self.testbot.pop_message()
+            self.assertIn('2 hours old', self.testbot.pop_message())
+        self.assertTrue(revalidate.called)
+        self.assertEqual(catalog.stale_hits, revalidate.call_count)
+
+    def test_duration(self):
+        self.assertEqual(Coatils.duration(5), '5 seconds')
+        self.assertEqual(Coatils.duration(60), '1 minute')
+        self.assertEqual(Coatils.duration(3 * 86400 + 10), '3 days')
+
+    @vcr.use_cassette('tests/cassettes/coatils_bear_stats.yaml')
+    def test_bear_search(self):
+        self.testbot.assertCommand('!bear search pylnt',
+                                   'Bears matching pylnt are:\n | PyLintBear')
+        self.testbot.assertCommand('!bear search xyz', 'No bears found')
+
+    @vcr.use_cassette('tests/cassettes/coatils_bear_stats.yaml')
+    def test_bear_info(self):
+        search = 'http://webservices.coala.io/search/bears?bear=PyLintBear'
+        with requests_mock.Mocker(real_http=True) as m:
+            details = m.get(search, json={
+                'CAN_DETECT': ['Unused Code', 'Formatting'],
+                'CAN_FIX': [],
+                'metadata': {'non_optional_params': [],
+                             'optional_params': ['pylint_rcfile']}})
+            self.testbot.push_message('!bear info pylint')
+            message = self.testbot.pop_message()
+            self.assertIn('PyLintBear (Python 2, Python 3, Python)', message)
+            self.assertIn('Can detect: Unused Code, Formatting', message)
+            self.assertIn('Optional settings: pylint_rcfile', message)
+            self.assertNotIn('Can fix', message)
+            self.assertNotIn('Required settings', message)
+
+            # details are cached
+            self.testbot.assertCommand('!bear info PyLintBear', 'Can detect')
+            self.assertEqual(details.call_count, 1)
+
+            m.get('http://webservices.coala.io/search/bears?bear=PEP8Bear',
+                  status_code=500)
+            self.testbot.push_message('!bear info pep8')
+            message = self.testbot.pop_message()
+            self.assertIn('PEP8Bear', message)
+            self.assertNotIn('Can detect', message)
+
+        self.testbot.assertCommand('!bear info xyz', 'No bear found for xyz')
+
+    @vcr.use_cassette('tests/cassettes/coatils_stats.yaml')
+    def test_coatils_cache(self):
+        self.testbot.assertCommand('!stats', 'coala has 102 bears')
+        self.testbot.assertCommand('!bear stats', 'There are total 102 bears')
+        self.testbot.assertCommand('!coatils cache',
+                                   'Bear catalog: 2 hits, 0 stale hits, '
+                                   '1 misses')
+
     @vcr.use_cassette('tests/cassettes/coatils_run_coala.yaml')
     def test_run_coala(self):
         # no results
         self.testbot.push_message('!run python SpaceConsistencyBear use_spaces=yes\n```\nimport this\n\n```')
         self.assertEqual(self.testbot.pop_message(),
-                         'coala analysis in progress...')
+                         'coala analysis #1 in progress...')
         self.assertEqual(self.testbot.pop_message(),
                          'Your code is flawless :tada:')
+        # the same analysis again, answered from the cache
+        self.testbot.assertCommand('!run PYTHON SpaceConsistencyBear use_spaces=yes\n```\nimport this\n\n```',
+                                   'Your code is flawless :tada:')
         # results and diffs
         self.testbot.push_message('!run python PyUnusedCodeBear remove_unused_imports=yes '
                                   'PycodestyleBear\n```\nimport os\nimport this\na=1\n```')
         self.assertEqual(self.testbot.pop_message(),
-                         'coala analysis in progress...')
+                         'coala analysis #2 in progress...')
         msg = self.testbot.pop_message()
         self.assertIn('Here is what I think is wrong:', msg)
         self.assertIn('This file contains unused source code',
@@ -89,10 +213,157 @@ class TestCoatils(unittest.TestCase):
         # error
         self.testbot.push_message('!run a b\n```\nc\n```')
         self.assertEqual(self.testbot.pop_message(),
-                         'coala analysis in progress...')
+                         'coala analysis #3 in progress...')
         self.assertIn('Something went wrong, things to check for',
                       self.testbot.pop_message())
 
+        self.testbot.assertCommand('!coatils cache',
+                                   'Analysis results: 1 hits, 3 misses (25% '
+                                   'hit ratio), 2 stored')
+
+        # cached results survive restarts
+        coatils = self.testbot.bot.plugin_manager.get_plugin_obj_by_name(
+            'coatils')
+        coatils.deactivate()
+        coatils.activate()
+        self.assertEqual(len(coatils.results), 2)
+
+    def test_run_unreachable(self):
+        with requests_mock.Mocker() as m:
+            m.post('https://api.gitmate.io/coala_online/',
+                   exc=requests.ConnectTimeout)
+            self.testbot.push_message('!run a b\n```\nc\n```')
+            self.assertIn('in progress', self.testbot.pop_message())
+            self.assertIn('coala online could not be reached',
+                          self.testbot.pop_message())
+
+    def test_run_error(self):
+        self.addCleanup(circuit._breakers.clear)
+        with requests_mock.Mocker() as m, \
+                self.assertLogs(level='ERROR') as logs:
+            m.post('https://api.gitmate.io/coala_online/', status_code=500,
+                   json={'detail': 'Internal server error'})
+            self.testbot.push_message('!run a b\n```\nc\n```')
+            self.assertIn('in progress', self.testbot.pop_message())
+            self.assertIn('could not analyse the code (HTTP 500)',
+                          self.testbot.pop_message())
+        self.assertTrue(any('coala online sent a 500 response' in line
+                            for line in logs.output))
+
+        coatils = self.testbot.bot.plugin_manager.get_plugin_obj_by_name(
+            'coatils')
+        with patch.object(coatils, 'coala_online', side_effect=ValueError), \
+                self.assertLogs(level='ERROR') as logs:
+            self.testbot.push_message('!run a b\n```\nd\n```')
+            self.assertIn('in progress', self.testbot.pop_message())
+            self.assertRegex(self.testbot.pop_message(),
+                             r'coala analysis #\d+ failed')
+        self.assertTrue(any('failed' in line for line in logs.output))
+
+    @patch('plugins.constants.BREAKER_FAILURES', 1)
+    def test_run_breaker(self):
+        self.addCleanup(circuit._breakers.clear)
+        circuit._breakers.clear()
+        with requests_mock.Mocker() as m:
+            m.post('https://api.gitmate.io/coala_online/', status_code=503)
+            for reply in ('Something went wrong',
+                          'coala online is not answering at the moment'):
+                self.testbot.push_message('!run a b\n```\nc\n```')
+                self.assertIn('in progress', self.testbot.pop_message())
+                self.assertIn(reply, self.testbot.pop_message())
+            self.assertEqual(m.call_count, 1)
+
+    def test_run_status(self):
+        coatils = self.testbot.bot.plugin_manager.get_plugin_obj_by_name(
+            'coatils')
+        self.testbot.assertCommand('!run status', 'No coala analysis')
+
+        release = threading.Event()
+        coatils.jobs.start(coatils.jobs.reserve(None),
+                           lambda job: release.wait())
+        self.testbot.assertCommand('!run status',
+                                   '0 queued, 1 running')
+        self.testbot.assertCommand('!run a b\n```\nc\n```',
+                                   'You already have 1 jobs queued')
+        release.set()
+
+    def test_run_closed(self):
+        coatils = self.testbot.bot.plugin_manager.get_plugin_obj_by_name(
+            'coatils')
+        match = coatils.run._err_command_re_pattern.search(
+            'run a b\n```\nc\n```')
+        msg = self.testbot.bot.build_message('run')
+        msg.frm = self.testbot.bot.build_identifier('meet')
+        replies = coatils.run(msg, match)
+        self.assertIn('in progress', next(replies))
+        self.assertEqual(len(coatils.jobs.jobs), 1)
+        # e.g. sending the reply failed
+        replies.close()
+        self.assertEqual(coatils.jobs.jobs, [])
+
+    def test_run_more(self):
+        coatils = self.testbot.bot.plugin_manager.get_plugin_obj_by_name(
+            'coatils')
+        result = {'affected_code': [{'start': {'line': 1, 'column': None},
+                                     'end': {'line': 1, 'column': None}}],
+                  'message': 'x' * 900,
+                  'origin': 'SomeBear',
+                  'diffs': None}
+        key = ResultCache.key('python', {'SomeBear': {}}, 'a\n')
+        coatils.results.put(key, [result] * 5)
+
+        self.testbot.push_message('!run python SomeBear\n```\na\n```')
+        page = self.testbot.pop_message()
+        self.assertIn('Here is what I think is wrong', page)
+        self.assertEqual(page.count('SomeBear'), 2)
+        self.assertIn('There is more', page)
+        self.testbot.assertCommand('!run more', 'There is more')
+        self.testbot.push_message('!run more')
+        message = self.testbot.pop_message()
+        self.assertIn('SomeBear', message)
+        self.assertNotIn('There is more', message)
+        self.testbot.assertCommand('!run more', 'There are no more results.')
+
+    def test_run_during_analysis(self):
+        coatils = self.testbot.bot.plugin_manager.get_plugin_obj_by_name(
+            'coatils')
+        key = ResultCache.key('python', {'SomeBear': {}}, 'a\n')
+        coatils.results.put(key, [])
+        started = threading.Event()
+        release = threading.Event()
+
+        def analysis(request, context):
+            started.set()
+            release.wait(5)
+            return {'response': {'results': {'corobo': []}}}
+
+        with requests_mock.Mocker() as m:
+            m.post('https://api.gitmate.io/coala_online/', json=analysis)
+            self.testbot.assertCommand('!run python OtherBear\n```\nb\n```',
+                                       'in progress')
+            self.assertTrue(started.wait(5))
+            # cached results don't wait for the running analysis
+            start = time.monotonic()
+            self.testbot.assertCommand('!run python SomeBear\n```\na\n```',
+                                       'Your code is flawless')
+            self.assertLess(time.monotonic() - start, 1)
+            self.assertFalse(release.is_set())
+            release.set()
+            self.assertIn('Your code is flawless', self.testbot.pop_message())
+
+    def test_paginate(self):
+        pages = list(Coatils.paginate(['a' * 3, 'b' * 3, 'c\n' * 4, 'd'], 5))
+        self.assertEqual(pages, [('aaa', True),
+                                 ('bbb', True),
+                                 ('c\nc\n', True),
+                                 ('c\nc\nd', False)])
+        self.assertEqual(list(Coatils.paginate([], 5)), [('', False)])
+
+    def test_split(self):
+        self.assertEqual(Coatils.split('abc', 3), ['abc'])
+        self.assertEqual(Coatils.split('a\nbcdefgh\nij', 3),
+                         ['a\n', 'bcd', 'efg', 'h\n', 'ij'])
+
     def test_construct_settings(self):
         self.assertEqual(Coatils.construct_settings('bear1 a=1 b=2 bear2 bear3'),
                          {'bear1': {'a': '1', 'b': '2'},
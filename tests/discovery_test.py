@@ -0,0 +1,56 @@
+from collections import OrderedDict
+import threading
+import unittest
+
+from plugins.discovery import Discovery
+
+
+class TestDiscovery(unittest.TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def slow(self):
+        self.release.wait(5)
+        return {'slow': 1}
+
+    def test_parallel(self):
+        discovery = Discovery(OrderedDict([('slow', self.slow),
+                                           ('fast', lambda: {'fast': 1})]))
+        self.assertFalse(discovery.loaded('fast'))
+        discovery.start()
+
+        self.assertTrue(discovery.wait('fast', timeout=5))
+        self.assertEqual(discovery.get('fast'), {'fast': 1})
+        self.assertFalse(discovery.wait(timeout=0.01))
+        self.assertIsNone(discovery.get('slow'))
+        self.assertEqual(discovery.status(),
+                         'Still loading the slow (1 of 2 loaded), please try '
+                         'again in a moment.')
+
+        self.release.set()
+        self.assertTrue(discovery.wait(timeout=5))
+        self.assertEqual(discovery.get('slow'), {'slow': 1})
+        self.assertEqual(discovery.status(), 'Everything is loaded.')
+
+    def test_set(self):
+        discovery = Discovery({'slow': self.slow})
+        discovery.start()
+        discovery.set('slow', {'given': 1})
+        self.assertTrue(discovery.wait('slow', timeout=0))
+        self.release.set()
+        # the loader finishing doesn't replace the given result
+        discovery._load('slow', self.slow)
+        self.assertEqual(discovery.get('slow'), {'given': 1})
+
+    def test_failure(self):
+        def broken():
+            raise RuntimeError
+
+        discovery = Discovery({'broken': broken})
+        with self.assertLogs('plugins.discovery', 'ERROR'):
+            discovery._load('broken', broken)
+        self.assertEqual(discovery.get('broken'), {})
@@ -0,0 +1,63 @@
+import unittest
+from unittest.mock import Mock
+
+from plugins.dispatch import Dispatcher
+
+
+class TestDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.dispatcher = Dispatcher()
+        self.calls = []
+
+    def callback(self, msg, match):
+        self.calls.append(match.group(0))
+
+    def test_of(self):
+        bot = Mock(spec=[])
+        self.assertIs(Dispatcher.of(bot), Dispatcher.of(bot))
+        self.assertIsNot(Dispatcher.of(bot), Dispatcher.of(Mock(spec=[])))
+
+    def test_candidates(self):
+        self.assertEqual(self.dispatcher.candidates_for('hello world'), [])
+        hello = self.dispatcher.register('hello', r'hello\s*world',
+                                         self.callback, keywords=('Hello',))
+        hell = self.dispatcher.register('hell', r'hell', self.callback,
+                                        keywords=('hell',))
+        world = self.dispatcher.register('world', r'world', self.callback,
+                                         keywords=('orl', 'wor'))
+        self.assertEqual(self.dispatcher.candidates_for('HELLO'),
+                         [hello, hell])
+        self.assertEqual(self.dispatcher.candidates_for('a hell of a world'),
+                         [hell, world])
+        self.assertEqual(self.dispatcher.candidates_for('nothing'), [])
+
+        self.dispatcher.unregister(hell)
+        self.assertEqual(self.dispatcher.triggers, [hello, world])
+        self.assertEqual(self.dispatcher.candidates_for('HELLO'), [hello])
+
+    def test_dispatch(self):
+        hello = self.dispatcher.register('hello', r'hello\s*world',
+                                         self.callback, keywords=('hello',))
+        self.dispatcher.register('broken', r'hello', Mock(side_effect=KeyError),
+                                 keywords=('hello',))
+        with self.assertLogs('plugins.dispatch', 'ERROR'):
+            self.dispatcher.dispatch(Mock(body='hello  world'))
+        self.dispatcher.dispatch(Mock(body='hello you'))
+        self.dispatcher.dispatch(Mock(body='good bye'))
+        self.assertEqual(self.calls, ['hello  world'])
+
+        self.assertEqual((hello.evaluations, hello.matches), (2, 1))
+        self.assertEqual(self.dispatcher.messages, 3)
+        self.assertEqual(self.dispatcher.candidates, 4)
+        stats = self.dispatcher.stats().splitlines()
+        self.assertIn('3 messages, 4 searches', stats[0])
+        self.assertIn('hello: 2 searches, 1 matches', stats[1])
+        self.assertIn('broken: 2 searches, 2 matches', stats[2])
+
+    def test_empty_stats(self):
+        self.assertIn('0 messages, 0 searches, 0.000 ms',
+                      self.dispatcher.stats())
+        trigger = self.dispatcher.register('hello', 'hello', self.callback,
+                                           keywords=('hello',))
+        self.assertIn('0.000 ms per search', trigger.stats())
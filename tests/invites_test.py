@@ -0,0 +1,65 @@
+import threading
+import unittest
+from unittest.mock import Mock
+
+from plugins.invites import InviteQueue
+
+
+class TestInviteQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.invite = Mock()
+        self.queue = InviteQueue(self.invite, window=60, delay=0)
+
+    def test_duplicates(self):
+        self.assertTrue(self.queue.submit('meet', 1))
+        self.assertFalse(self.queue.submit('Meet', 2))
+        self.assertTrue(self.queue.submit('sils', 3))
+        self.queue.flush()
+        self.invite.assert_called_once_with([('meet', 1), ('sils', 3)])
+
+        # pending invitations aren't sent again
+        self.assertFalse(self.queue.submit('meet'))
+        self.queue.flush()
+        self.assertEqual(self.invite.call_count, 1)
+        self.assertEqual((self.queue.submitted, self.queue.duplicates,
+                          self.queue.batches), (4, 2, 1))
+
+    def test_window(self):
+        self.queue.window = 0
+        self.queue.submit('meet')
+        self.queue.flush()
+        self.assertTrue(self.queue.submit('meet'))
+        self.queue.flush()
+        self.assertEqual(self.queue._invited.keys(), {'meet'})
+        self.assertEqual(self.invite.call_count, 2)
+
+    def test_failure(self):
+        self.invite.side_effect = RuntimeError
+        self.queue.submit('meet')
+        with self.assertLogs('plugins.invites', 'ERROR'):
+            self.queue.flush()
+        # failed invitations are forgotten
+        self.assertTrue(self.queue.submit('meet'))
+
+    def test_thread(self):
+        invited = threading.Event()
+        self.invite.side_effect = lambda batch: invited.set()
+        self.queue.start()
+        self.queue.submit('meet')
+        self.assertTrue(invited.wait(5))
+        self.queue.stop()
+
+    def test_restart(self):
+        self.queue.delay = 0.1
+        self.queue.start()
+        first = self.queue._thread
+        self.queue.start()
+        self.assertIs(self.queue._thread, first)
+
+        self.queue.submit('meet')
+        self.queue.stop()
+        self.queue.start()
+        self.assertFalse(first.is_alive())
+        self.assertTrue(self.queue._thread.is_alive())
+        self.queue.stop()
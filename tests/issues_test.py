@@ -0,0 +1,71 @@
+import unittest
+from unittest.mock import Mock
+
+import requests
+import vcr
+
+from plugins.issues import IssueContexts
+
+my_vcr = vcr.VCR(record_mode='none', filter_headers=['Authorization'],
+                 filter_query_parameters=['private_token'])
+
+
+class TestIssueContexts(unittest.TestCase):
+
+    def setUp(self):
+        self.session = requests.Session()
+        self.contexts = IssueContexts(
+            self.session,
+            {'github': Mock(value='abc'),
+             'gitlab': Mock(parameter={'private_token': 'def'})},
+            'coala', {role: 'coala ' + role for role in
+                      ('newcomers', 'developers', 'maintainers')})
+
+    def test_slug(self):
+        self.assertEqual(IssueContexts.slug('coala Newcomers'),
+                         'coala-newcomers')
+        self.assertEqual(IssueContexts.slug('Some team: the_best!'),
+                         'some-team-the_best')
+
+    @my_vcr.use_cassette('tests/cassettes/issue_contexts.yaml')
+    def test_fetch(self):
+        member, roles, contexts = self.contexts.fetch('meet', [
+            ('github', 'coala/a', 1),
+            ('gitlab', 'coala/sub/a', 3),
+            ('github', 'coala/a', 2),
+            ('gitlab', 'coala/sub/a', 4)])
+        self.assertTrue(member)
+        self.assertEqual(roles, {'newcomers'})
+        self.assertEqual(contexts[0].labels, {'difficulty/low', 'type/bug'})
+        self.assertEqual(contexts[0].assignees, ())
+        self.assertEqual(contexts[1].labels, {'difficulty/newcomer'})
+        self.assertEqual(contexts[1].assignees, ('somebody', ))
+        self.assertIsNone(contexts[2])
+        self.assertIsNone(contexts[3])
+
+        self.assertEqual(self.contexts.fetch('nobody', []),
+                         (False, frozenset(), []))
+
+    def test_query(self):
+        self.session = Mock()
+        self.session.post.return_value.json.return_value = {}
+        self.contexts.session = self.session
+        self.assertEqual(
+            self.contexts.fetch(None, [('github', 'coala/sub/a', '1')]),
+            (False, frozenset(), [None]))
+
+        (url, ), kwargs = self.session.post.call_args
+        self.assertEqual(url, 'https://api.github.com/graphql')
+        self.assertEqual(kwargs['headers'], {'Authorization': 'bearer abc'})
+        self.assertEqual(kwargs['json']['variables'], {
+            'org': 'coala', 'user': '', 'team0': 'coala-developers',
+            'team1': 'coala-maintainers', 'team2': 'coala-newcomers',
+            'owner0': 'coala', 'name0': 'sub/a', 'number0': 1})
+        query = kwargs['json']['query']
+        self.assertIn('$owner0: String!, $name0: String!, $number0: Int!',
+                      query)
+        self.assertIn('team2: team(slug: $team2)', query)
+        self.assertIn('issue0: repository(owner: $owner0, name: $name0)',
+                      query)
+        # balanced
+        self.assertEqual(query.count('{'), query.count('}'))
@@ -0,0 +1,63 @@
+import threading
+import unittest
+
+from plugins.jobs import JobQueue, QueueFull
+
+
+class TestJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = JobQueue(workers=1, max_jobs=3, max_per_user=2)
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.queue.shutdown()
+
+    def submit(self, user, function):
+        job = self.queue.reserve(user)
+        self.queue.start(job, function)
+        return job
+
+    def block(self, job):
+        self.started.set()
+        self.release.wait()
+
+    def test_limits(self):
+        first = self.submit('meet', self.block)
+        second = self.submit('meet', self.block)
+        self.started.wait()
+
+        self.assertEqual(self.queue.jobs, [first, second])
+        self.assertTrue(first.running)
+        self.assertFalse(second.running)
+        self.assertGreaterEqual(second.elapsed, 0)
+
+        with self.assertRaisesRegex(QueueFull, 'You already have 2 jobs'):
+            self.submit('meet', self.block)
+        third = self.submit('sils', self.block)
+        self.assertEqual(third.id, 3)
+        with self.assertRaisesRegex(QueueFull, 'already 3 jobs queued'):
+            self.submit('jay', self.block)
+
+    def test_release(self):
+        job = self.queue.reserve('meet')
+        self.queue.reserve('meet')
+        with self.assertRaises(QueueFull):
+            self.queue.reserve('meet')
+        self.queue.release(job)
+        self.assertEqual(len(self.queue.jobs), 1)
+        self.queue.reserve('meet')
+
+    def test_finished_jobs_are_removed(self):
+        done = threading.Event()
+        self.submit('meet', lambda job: None)
+        self.submit('meet', lambda job: done.set())
+        done.wait()
+        # the job is removed right after it returned
+        for _ in range(100):
+            if not self.queue.jobs:
+                break
+            self.release.wait(0.01)
+        self.assertEqual(self.queue.jobs, [])
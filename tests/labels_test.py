@@ -0,0 +1,118 @@
+import unittest
+from unittest.mock import Mock, call
+
+import requests
+
+from plugins.labels import Labels
+
+
+def response(data):
+    resp = Mock()
+    resp.json.return_value = data
+    return resp
+
+
+class TestLabels(unittest.TestCase):
+
+    def setUp(self):
+        self.session = Mock()
+        self.labels = Labels(self.session,
+                             {'github': Mock(parameter={'access_token': 'a'}),
+                              'gitlab': Mock(parameter={'private_token': 'b'})},
+                             ttl=60)
+
+    def test_github(self):
+        url = 'https://api.github.com/repos/coala/a/issues/1'
+        # labels are added to whatever they are
+        self.session.request.return_value = response(
+            [{'name': 'process/wip'}, {'name': 'bug'}])
+        self.assertEqual(
+            self.labels.change('GitHub', 'coala/A/', 1, {'process/wip'}),
+            {'process/wip', 'bug'})
+        self.session.request.assert_called_once_with(
+            'POST', url + '/labels', params={'access_token': 'a'},
+            json={'labels': ['process/wip']})
+
+        # and removed one by one, never written as a whole
+        self.session.request.reset_mock()
+        self.session.request.side_effect = [
+            response([{'name': 'process/wip'}, {'name': 'bug'},
+                      {'name': 'process/pending review'}]),
+            response([{'name': 'bug'}, {'name': 'process/pending review'}]),
+        ]
+        self.assertEqual(
+            self.labels.change('github', 'coala/a', '1',
+                               {'process/pending review'},
+                               {'process/wip', 'process/approved'}),
+            {'process/pending review', 'bug'})
+        self.assertEqual(self.session.request.call_args_list, [
+            call('POST', url + '/labels', params={'access_token': 'a'},
+                 json={'labels': ['process/pending review']}),
+            call('DELETE', url + '/labels/process%2Fwip',
+                 params={'access_token': 'a'}),
+        ])
+
+        # nothing to remove
+        self.session.request.reset_mock()
+        self.labels.change('github', 'coala/a', 1, remove={'process/wip'})
+        self.assertEqual(self.labels.get('github', 'coala/a', 1),
+                         {'process/pending review', 'bug'})
+        self.session.request.assert_not_called()
+        self.assertEqual((self.labels.hits, self.labels.misses), (3, 1))
+
+    def test_github_remove(self):
+        url = 'https://api.github.com/repos/coala/a/issues/2'
+        self.session.request.return_value = response([])
+        self.assertEqual(self.labels.change('github', 'coala/a', 2,
+                                            remove={'process/wip'}),
+                         frozenset())
+        self.session.request.assert_called_once_with(
+            'DELETE', url + '/labels/process%2Fwip',
+            params={'access_token': 'a'})
+
+        # labels which aren't there anymore
+        missing = Mock()
+        missing.raise_for_status.side_effect = requests.HTTPError(
+            response=Mock(status_code=404))
+        self.session.request.reset_mock()
+        self.session.request.side_effect = [
+            missing, response([{'name': 'bug'}])]
+        self.labels._remember(self.labels._key('github', 'coala/a', 3),
+                              frozenset({'process/wip'}))
+        self.assertEqual(self.labels.change('github', 'coala/a', 3,
+                                            remove={'process/wip'}),
+                         {'bug'})
+        self.session.request.assert_called_with(
+            'GET', 'https://api.github.com/repos/coala/a/issues/3/labels',
+            params={'access_token': 'a'})
+
+    def test_gitlab(self):
+        self.session.request.return_value = response(
+            {'labels': ['process/wip']})
+        self.assertEqual(self.labels.change(
+            'gitlab', 'coala/sub/a', 3, {'process/wip'},
+            {'process/pending review'}), {'process/wip'})
+        self.session.request.assert_called_once_with(
+            'PUT',
+            'https://gitlab.com/api/v4/projects/coala%2Fsub%2Fa/'
+            'merge_requests/3',
+            params={'add_labels': 'process/wip',
+                    'remove_labels': 'process/pending review',
+                    'private_token': 'b'})
+
+        # expired labels are fetched again
+        self.labels.ttl = 0
+        self.assertEqual(self.labels.get('gitlab', 'coala/sub/a', 4),
+                         {'process/wip'})
+        self.labels.get('gitlab', 'coala/sub/a', 4)
+        self.assertEqual(self.session.request.call_count, 3)
+        self.assertEqual(self.session.request.call_args[0][0], 'GET')
+
+    def test_failure(self):
+        self.session.request.return_value.raise_for_status.side_effect = (
+            requests.HTTPError)
+        with self.assertRaises(requests.HTTPError):
+            self.labels.change('github', 'coala/a', 1, {'process/wip'})
+        with self.assertRaises(requests.HTTPError):
+            self.labels.change('github', 'coala/a', 1, remove={'bug'})
+        self.assertEqual(self.labels._labels, {})
@@ -1,17 +1,24 @@
 import logging
 import os
+import threading
+import time
 import unittest
 from unittest.mock import Mock, MagicMock, create_autospec, PropertyMock
 
 import github3
 import IGitt
-from IGitt.GitHub.GitHubMergeRequest import GitHubMergeRequest
+import requests
 from IGitt.GitHub.GitHubIssue import GitHubIssue
 
 from errbot.backends.test import TestBot
 
 import plugins.labhub
+from plugins.cache import ResultCache
+from plugins.issues import IssueContext, IssueContexts
+from plugins.labels import Labels
 from plugins.labhub import LabHub
+from plugins.ratelimit import RateLimited, Scheduler
+from plugins.repositories import Record
 
 from tests.helper import plugin_testbot
 
@@ -27,9 +34,11 @@ class TestLabHub(unittest.TestCase):
         self.mock_team.name = 'mocked team'
         self.mock_repo = create_autospec(IGitt.GitHub.GitHub.GitHubRepository)
 
+        self.mock_gh.session = Mock()
+        self.mock_gh.session.get.return_value.status_code = 200
+        self.mock_gh.session.get.return_value.json.return_value = {'id': 7}
         plugins.labhub.github3.login.return_value = self.mock_gh
         self.mock_gh.organization.return_value = self.mock_org
-        self.mock_org.iter_teams.return_value = [self.mock_team]
         plugins.labhub.github3.organization.return_value = self.mock_org
 
     def test_invite_cmd(self):
@@ -41,12 +50,20 @@ class TestLabHub(unittest.TestCase):
 
         labhub, testbot = plugin_testbot(plugins.labhub.LabHub, logging.ERROR)
         labhub.activate()
-        labhub._teams = teams
+        labhub.discovery.wait(timeout=5)
+        labhub.TEAMS = teams
 
         self.mock_team.is_member.return_value = True
         plugins.labhub.os.environ['GH_TOKEN'] = 'patched?'
         testbot.assertCommand('!invite meet to developers',
                                    '@meet, you are a part of developers')
+
+        # org members join the team right away
+        self.mock_team.invite.return_value = {'state': 'active'}
+        labhub.members.refresh()
+        testbot.assertCommand('!invite meet to developers',
+                                   '@meet, you are a part of developers')
+        self.assertTrue(labhub.members.is_member('coala developers', 'meet'))
         self.assertEqual(labhub.TEAMS, teams)
         testbot.assertCommand('!invite meet to something',
                                    'select from one of the')
@@ -64,11 +81,18 @@ class TestLabHub(unittest.TestCase):
         testbot = TestBot(extra_plugin_dir='plugins', loglevel=logging.ERROR)
         testbot.start()
         labhub = testbot.bot.plugin_manager.get_plugin_obj_by_name('LabHub')
+        labhub.discovery.wait(timeout=5)
         labhub.TEAMS = teams
         self.mock_team.is_member.return_value = False
         testbot.assertCommand('hello, world', 'newcomer')
-        testbot.assertCommand('helloworld', 'newcomer')
-        self.mock_team.invite.assert_called_with(None)
+        # the invitation is pending, so it isn't sent again
+        testbot.push_message('helloworld')
+        for _ in range(100):
+            if labhub.invites.duplicates:
+                break
+            time.sleep(0.05)
+        self.assertEqual(labhub.invites.duplicates, 1)
+        self.mock_team.invite.assert_called_once_with(None)
 
     def test_create_issue_cmd(self):
         plugins.labhub.GitHub = create_autospec(IGitt.GitHub.GitHub.GitHub)
@@ -82,24 +106,43 @@ class TestLabHub(unittest.TestCase):
         plugins.labhub.GitLabPrivateToken.assert_called_with(None)
 
 
-        labhub.REPOS = {'repository': self.mock_repo}
+        mirror = create_autospec(IGitt.GitHub.GitHub.GitHubRepository)
+        labhub.REPOS = {('github', 'coala/repository'): mirror,
+                        ('gitlab', 'coala/repository'): self.mock_repo}
 
         testbot.assertCommand('!new issue repository this is the title\nbo\ndy',
                               'Here you go')
 
-        labhub.REPOS['repository'].create_issue.assert_called_once_with(
+        self.mock_repo.create_issue.assert_called_once_with(
             'this is the title', 'bo\ndy\nOpened by @None '
         )
+        mirror.create_issue.assert_not_called()
 
         testbot.assertCommand('!new issue coala title', 'repository that does not exist')
 
+        # the configured host is preferred
+        labhub.ISSUE_HOST = 'github'
+        testbot.assertCommand('!new issue repository title', 'Here you go')
+        mirror.create_issue.assert_called_once_with('title',
+                                                    '\nOpened by @None ')
+
+        # several repositories of the same name on a host
+        labhub.REPOS = {('gitlab', 'coala/repository'): self.mock_repo,
+                        ('gitlab', 'coala/sub/repository'): mirror}
+        testbot.assertCommand(
+            '!new issue repository title',
+            'Several repositories are called repository: '
+            'gitlab.com/coala/repository, gitlab.com/coala/sub/repository.')
+        self.assertEqual(self.mock_repo.create_issue.call_count, 1)
+        self.assertEqual(mirror.create_issue.call_count, 1)
+
     def test_unassign_cmd(self):
         plugins.labhub.GitHub = create_autospec(IGitt.GitHub.GitHub.GitHub)
         plugins.labhub.GitLab = create_autospec(IGitt.GitLab.GitLab.GitLab)
         labhub, testbot = plugin_testbot(plugins.labhub.LabHub, logging.ERROR)
 
         labhub.activate()
-        labhub.REPOS = {'name': self.mock_repo}
+        labhub.REPOS = {('github', 'coala/name'): self.mock_repo}
 
         mock_iss = create_autospec(IGitt.GitHub.GitHubIssue)
         self.mock_repo.get_issue.return_value = mock_iss
@@ -132,94 +175,386 @@ class TestLabHub(unittest.TestCase):
         mock_issue = create_autospec(GitHubIssue)
         self.mock_repo.get_issue.return_value = mock_issue
 
-        labhub.REPOS = {'a': self.mock_repo}
+        labhub.REPOS = {('github', 'coala/a'): self.mock_repo}
 
-        mock_dev_team = create_autospec(github3.orgs.Team)
-        mock_maint_team = create_autospec(github3.orgs.Team)
-        mock_dev_team.is_member.return_value = False
-        mock_maint_team.is_member.return_value = False
-
-        labhub.TEAMS = {'coala newcomers': self.mock_team,
-                        'coala developers': mock_dev_team,
-                        'coala maintainers': mock_maint_team}
+        member, roles = True, set()
+        context = IssueContext(labels=(), assignees=())
+        labhub.issues = create_autospec(IssueContexts)
+        labhub.issues.fetch.side_effect = lambda user, issues: (
+            member, frozenset(roles), [context] * len(issues))
 
         cmd = '!assign https://github.com/{}/{}/issues/{}'
         # no assignee, not newcomer
-        mock_issue.assignees = tuple()
-        self.mock_team.is_member.return_value = False
-
         testbot.assertCommand(cmd.format('coala', 'a', '23'),
                               'You\'ve been assigned to the issue')
+        labhub.issues.fetch.assert_called_once_with(
+            None, [('github', 'coala/a', 23)])
+        self.mock_repo.get_issue.assert_called_once_with(23)
+        mock_issue.assign.assert_called_once_with(None)
 
         # no assignee, newcomer, difficulty/low
-        mock_issue.labels = PropertyMock()
-        mock_issue.labels = ('difficulty/low', )
-        mock_issue.assignees = tuple()
-        self.mock_team.is_member.return_value = True
-
+        roles.add('newcomers')
+        context = IssueContext(labels=('difficulty/low', ), assignees=())
         testbot.assertCommand(cmd.format('coala', 'a', '23'),
                               'You\'ve been assigned to the issue')
 
         # no assignee, newcomer, no labels
-        self.mock_team.is_member.return_value = True
-        mock_issue.labels = tuple()
-        mock_issue.assignees = tuple()
+        context = IssueContext(labels=(), assignees=())
         testbot.assertCommand(cmd.format('coala', 'a', '23'),
                               'not eligible to be assigned to this issue')
         testbot.pop_message()
 
         # no assignee, newcomer, difficulty medium
-        mock_issue.labels = ('difficulty/medium', )
+        context = IssueContext(labels=('difficulty/medium', ), assignees=())
         testbot.assertCommand(cmd.format('coala', 'a', '23'),
                               'not eligible to be assigned to this issue')
         testbot.pop_message()
 
         # no assignee, newcomer, difficulty medium
-        labhub.GH_ORG_NAME = 'not-coala'
+        labhub.GL_ORG_NAME = 'not-coala'
         testbot.assertCommand(cmd.format('coala', 'a', '23'),
                               'assigned')
-        labhub.GH_ORG_NAME = 'coala'
+        labhub.GL_ORG_NAME = 'coala'
 
         # newcomer, developer, difficulty/medium
-        mock_dev_team.is_member.return_value = True
-        mock_maint_team.is_member.return_value = False
+        roles.add('developers')
         testbot.assertCommand(cmd.format('coala', 'a', '23'),
                               'assigned')
 
+        # not a member of the org
+        member = False
+        roles.clear()
+        testbot.assertCommand(cmd.format('coala', 'a', '23'),
+                              'not eligible to be assigned to this issue')
+        testbot.pop_message()
+
         # has assignee
-        mock_issue.assignees = ('somebody', )
+        context = IssueContext(labels=(), assignees=('somebody', ))
         testbot.assertCommand(cmd.format('coala', 'a', '23'),
                               'already assigned to someone')
 
+        # non-existent issue
+        context = None
+        testbot.assertCommand(cmd.format('coala', 'a', '23'),
+                              'Issue doesn\'t exist.')
+
         # non-existent repository
+        labhub.issues.fetch.reset_mock()
         testbot.assertCommand(cmd.format('coala', 'c', '23'),
                               'Repository doesn\'t exist.')
+        labhub.issues.fetch.assert_called_once_with(None, [])
 
         # unknown org
         testbot.assertCommand(cmd.format('coa', 'a', '23'),
                               'Repository not owned by our org.')
+        # the org of the other host
+        labhub.GL_ORG_NAME = 'coa'
+        testbot.assertCommand(cmd.format('coa', 'a', '23'),
+                              'Repository not owned by our org.')
+        labhub.GL_ORG_NAME = 'coala'
 
     def test_mark_cmd(self):
         labhub, testbot = plugin_testbot(plugins.labhub.LabHub, logging.ERROR)
         labhub.activate()
 
-        labhub.REPOS = {'a': self.mock_repo}
-        mock_mr = create_autospec(GitHubMergeRequest)
-        self.mock_repo.get_mr.return_value = mock_mr
-        mock_mr.labels = PropertyMock()
+        labhub.REPOS = {('github', 'coala/a'): self.mock_repo,
+                        ('gitlab', 'coala/sub/a'): self.mock_repo}
+        labhub.labels = create_autospec(Labels)
         cmd = '!mark {} https://github.com/{}/{}/pull/{}'
 
-        # Non-eistent repo
+        # Non-existent repo
         testbot.assertCommand(cmd.format('wip', 'a', 'b', '23'),
                               'Repository doesn\'t exist.')
         testbot.assertCommand('!mark wip https://gitlab.com/a/b/merge_requests/2',
                               'Repository doesn\'t exist.')
 
         # mark wip
-        mock_mr.labels = ['process/pending review']
         testbot.assertCommand(cmd.format('wip', 'coala', 'a', '23'),
                               'marked work in progress')
+        labhub.labels.change.assert_called_once_with(
+            'github', 'coala/a', '23', {'process/wip'},
+            {'process/pending_review', 'process/pending review'})
         # mark pending
-        mock_mr.labels = ['process/wip']
-        testbot.assertCommand(cmd.format('pending', 'coala', 'a', '23'),
-                              'marked pending review')
+        testbot.assertCommand(
+            '!mark PENDING https://gitlab.com/coala/sub/a/merge_requests/2',
+            'https://gitlab.com/coala/sub/a/merge_requests/2 is marked '
+            'pending review')
+        labhub.labels.change.assert_called_with(
+            'gitlab', 'coala/sub/a', '2', {'process/pending review'},
+            {'process/wip'})
+
+        # the kind of the URL doesn't match its host
+        testbot.assertCommand(
+            '!mark wip https://github.com/coala/a/merge_requests/2',
+            'https://github.com/coala/a/merge_requests/2 is not a pull '
+            'request.')
+
+    def test_discovery(self):
+        plugins.labhub.GitHub = create_autospec(IGitt.GitHub.GitHub.GitHub)
+        plugins.labhub.GitLab = create_autospec(IGitt.GitLab.GitLab.GitLab)
+        repo = create_autospec(IGitt.GitHub.GitHub.GitHubRepository)
+        plugins.labhub.GitHub.return_value.get_repo.return_value = repo
+
+        labhub, testbot = plugin_testbot(plugins.labhub.LabHub, logging.ERROR)
+        github = labhub.repo_syncs['github repositories']
+        gitlab = labhub.repo_syncs['gitlab repositories']
+        github.session = Mock()
+        github.session.get.return_value.links = {}
+        github.session.get.return_value.json.return_value = [
+            {'full_name': 'coala/a', 'updated_at': '2018-01-02T00:00:00Z',
+             'id': 1, 'permissions': {'push': True}},
+            {'full_name': 'other/b', 'updated_at': '2018-01-01T00:00:00Z',
+             'id': 2, 'permissions': {'push': True}}]
+        gitlab.session = Mock()
+        gitlab.session.get.side_effect = requests.ConnectionError
+        found, missing = Mock(status_code=200), Mock(status_code=404)
+        found.json.return_value = {'id': 7}
+        self.mock_gh.session.get.side_effect = lambda url: (
+            missing if url.endswith('developers') else found)
+
+        self.assertEqual(labhub.REPOS, {})
+        labhub.activate()
+        self.assertTrue(labhub.discovery.wait(timeout=5))
+        self.assertEqual(labhub.REPOS, {('github', 'coala/a'): repo})
+        # only the teams of the roles are fetched, a missing one is skipped
+        self.mock_gh.session.get.assert_any_call(
+            'https://api.github.com/orgs/coala/teams/coala-newcomers')
+        self.assertEqual(sorted(labhub.TEAMS),
+                         ['coala maintainers', 'coala newcomers'])
+        plugins.labhub.github3.orgs.Team.assert_any_call(
+            {'url': 'https://api.github.com/teams/7', 'id': 7,
+             'name': 'coala newcomers'}, self.mock_gh.session)
+        self.assertEqual(labhub.GH3_ORG, self.mock_org)
+        plugins.labhub.GitHub.return_value.get_repo.assert_called_once_with(
+            'coala/a')
+
+        # client objects are created once and dropped when least used
+        labhub.objects = ResultCache(size=1, ttl=float('inf'))
+        labhub.REPOS['github', 'coala/a']
+        labhub.REPOS['github', 'coala/a']
+        labhub.TEAMS
+        labhub.REPOS['github', 'coala/a']
+        self.assertEqual(
+            plugins.labhub.GitHub.return_value.get_repo.call_count, 3)
+        self.assertEqual(len(labhub.objects), 1)
+
+    def test_refresh_repos(self):
+        labhub, testbot = plugin_testbot(plugins.labhub.LabHub, logging.ERROR)
+        github = labhub.repo_syncs['github repositories']
+        gitlab = labhub.repo_syncs['gitlab repositories']
+        for sync in (github, gitlab):
+            sync.session = Mock()
+            sync.session.get.return_value.links = {}
+            sync.session.get.return_value.json.return_value = []
+        labhub.activate()
+        self.assertTrue(labhub.discovery.wait(timeout=5))
+        self.assertEqual(labhub.REPOS, {})
+
+        github.session.get.return_value.json.return_value = [
+            {'full_name': 'coala/a', 'updated_at': '2018-01-02T00:00:00Z',
+             'id': 3, 'permissions': {'push': True}}]
+        labhub.refresh_repos()
+        self.assertEqual(list(labhub.REPOS), [('github', 'coala/a')])
+
+        github.session.get.return_value.json.return_value = [
+            {'full_name': 'coala/b', 'updated_at': '2018-01-03T00:00:00Z',
+             'id': 4, 'permissions': {'push': True}},
+            {'full_name': 'coala/a', 'updated_at': '2018-01-02T00:00:00Z',
+             'id': 5, 'permissions': {'push': True}}]
+        testbot.assertCommand('!refresh repos',
+                              'github repositories: 2 listed, 2 known')
+        self.assertEqual(sorted(labhub.REPOS), [('github', 'coala/a'),
+                                                ('github', 'coala/b')])
+
+        github.session.get.return_value.json.return_value = [
+            {'full_name': 'coala/b', 'updated_at': '2018-01-03T00:00:00Z',
+             'id': 6, 'permissions': {'push': True}}]
+        testbot.assertCommand('!refresh repos full',
+                              'github repositories: 1 listed, 1 known')
+        self.assertEqual(list(labhub.REPOS), [('github', 'coala/b')])
+
+        # a failed listing keeps the repositories
+        github.session.get.side_effect = requests.ConnectionError
+        labhub.refresh_repos()
+        self.assertEqual(list(labhub.REPOS), [('github', 'coala/b')])
+
+    def test_discovery_in_progress(self):
+        labhub, testbot = plugin_testbot(plugins.labhub.LabHub, logging.ERROR)
+        release = threading.Event()
+        labhub.discovery.loaders['teams'] = lambda: release.wait(5) and {
+            'coala newcomers': Record('github', 'coala newcomers', 1)}
+        labhub.objects.put(('team', 'coala newcomers'), self.mock_team)
+        labhub.DISCOVERY_TIMEOUT = 0
+        labhub.activate()
+        labhub.discovery.wait(*plugins.labhub.REPOSITORIES, timeout=5)
+
+        testbot.assertCommand('!invite meet',
+                              'Still loading the teams (2 of 3 loaded)')
+        # assign asks for the teams of the user along with the issue
+        labhub.issues = create_autospec(IssueContexts)
+        labhub.issues.fetch.return_value = (False, frozenset(), [])
+        testbot.assertCommand('!assign https://github.com/coala/a/issues/1',
+                              'Repository doesn\'t exist.')
+
+        # invitations wait for the teams
+        labhub.DISCOVERY_TIMEOUT = 5
+        labhub.send = Mock()
+        self.mock_team.is_member.return_value = False
+        labhub.invites.delay = 0
+        labhub.hello_world(Mock(frm=Mock(nick='meet')), None)
+        time.sleep(0.1)
+        self.mock_team.invite.assert_not_called()
+        release.set()
+        labhub.discovery.wait('teams', timeout=5)
+        for _ in range(100):
+            if self.mock_team.invite.called:
+                break
+            time.sleep(0.05)
+        self.mock_team.invite.assert_called_once_with('meet')
+
+    def test_discovered_generator(self):
+        plugin = Mock(DISCOVERY_TIMEOUT=0)
+        plugin.discovery.wait.return_value = False
+        plugin.discovery.status.return_value = 'Still loading the teams'
+
+        @plugins.labhub.discovered('teams')
+        def command(self, msg, match):
+            yield 'done'
+
+        self.assertEqual(list(command(plugin, None, None)),
+                         ['Still loading the teams'])
+        plugin.discovery.wait.assert_called_once_with('teams', timeout=0)
+
+    def test_rate_limits(self):
+        labhub, testbot = plugin_testbot(plugins.labhub.LabHub, logging.ERROR)
+        # Not shared with the other tests.
+        labhub.api = Scheduler(rate=5, burst=20, reserve=0.2, max_wait=30)
+        for sync in labhub.repo_syncs.values():
+            sync.session = Mock()
+        labhub.activate()
+        labhub.discovery.wait(timeout=5)
+        labhub.REPOS = {('github', 'coala/a'): self.mock_repo,
+                        ('gitlab', 'coala/a'): self.mock_repo}
+        labhub.TEAMS = {'coala newcomers': self.mock_team}
+
+        testbot.assertCommand('!rate limits', 'No API request')
+
+        labhub.labels = create_autospec(Labels)
+        labhub.labels.change.side_effect = RateLimited('api.github.com', 90)
+        testbot.assertCommand('!mark wip https://github.com/coala/a/pull/1',
+                              'exhausted for another 90 seconds. Please try '
+                              'again later.')
+        labhub.issues = create_autospec(IssueContexts)
+        labhub.issues.fetch.side_effect = RateLimited('gitlab.com', 90)
+        testbot.assertCommand('!assign https://gitlab.com/coala/a/issues/1',
+                              'The rate limit of gitlab.com is exhausted')
+
+        labhub.refresh_members()
+        self.mock_team.iter_members.assert_called_with()
+
+    def test_bulk(self):
+        labhub, testbot = plugin_testbot(plugins.labhub.LabHub, logging.ERROR)
+        labhub.activate()
+        labhub.REPOS = {('github', 'coala/a'): self.mock_repo,
+                        ('gitlab', 'coala/sub/a'): self.mock_repo}
+        roles = set()
+        contexts = {1: IssueContext((), ()),
+                    2: IssueContext((), ('somebody', )),
+                    4: IssueContext((), ())}
+        labhub.issues = create_autospec(IssueContexts)
+        labhub.issues.fetch.side_effect = lambda user, issues: (
+            True, frozenset(roles),
+            [contexts.get(number) for _, _, number in issues])
+
+        issues = {1: create_autospec(GitHubIssue),
+                  2: create_autospec(GitHubIssue)}
+
+        def get_issue(number):
+            if number not in issues:
+                raise RuntimeError('Not Found', 404)
+            return issues[number]
+        self.mock_repo.get_issue.side_effect = get_issue
+
+        testbot.push_message(
+            '!assign https://github.com/coala/a/issues/1 '
+            'https://gitlab.com/coala/sub/a/issues/2\n'
+            'https://github.com/coala/b/issues/3 '
+            'https://github.com/coala/a/issues/4')
+        table = testbot.pop_message()
+        rows = [table.index(text) for text in (
+            'You\'ve been assigned to the issue',
+            'already assigned to someone',
+            'Repository doesn\'t exist.',
+            'Something went wrong.')]
+        self.assertEqual(rows, sorted(rows))
+        self.assertIn('https://gitlab.com/coala/sub/a/issues/2', table)
+        issues[1].assign.assert_called_once_with(None)
+        # the repository which doesn't exist isn't asked for
+        labhub.issues.fetch.assert_called_once_with(None, [
+            ('github', 'coala/a', 1), ('gitlab', 'coala/sub/a', 2),
+            ('github', 'coala/a', 4)])
+
+        # eligibility is still checked for every issue
+        roles.add('newcomers')
+        contexts[2] = IssueContext(('difficulty/low', ), ())
+        contexts[1] = IssueContext(('difficulty/medium', ), ())
+        testbot.assertCommand('!assign https://github.com/coala/a/issues/1 '
+                              'https://github.com/coala/a/issues/2',
+                              'not eligible to be assigned')
+        self.assertIn('A newcomer cannot be assigned', testbot.pop_message())
+
+        issues[1].assignees = (None, )
+        testbot.push_message('!unassign https://github.com/coala/a/issues/1 '
+                             'https://github.com/coala/a/issues/2')
+        table = testbot.pop_message()
+        self.assertIn('you are unassigned now', table)
+        self.assertIn('You are not an assignee on the issue.', table)
+
+        labhub.labels = create_autospec(Labels)
+        testbot.push_message('!mark pending https://github.com/coala/a/pull/1 '
+                             'https://github.com/coala/b/pull/2')
+        reply = testbot.pop_message()
+        self.assertIn('is marked pending review', reply)
+        self.assertIn('Repository doesn\'t exist.', reply)
+        self.assertIn('should be corrected by the author.', reply)
+        labhub.labels.change.assert_called_once_with(
+            'github', 'coala/a', '1', {'process/pending review'},
+            {'process/wip'})
+
+        labhub.labels.change.side_effect = RateLimited('api.github.com', 90)
+        testbot.assertCommand('!mark wip https://github.com/coala/a/pull/1 '
+                              'https://github.com/coala/a/pull/2',
+                              'rate limit of api.github.com is exhausted')
+
+    def test_invites(self):
+        labhub, testbot = plugin_testbot(plugins.labhub.LabHub, logging.ERROR)
+        labhub.activate()
+        labhub.discovery.wait(timeout=5)
+        labhub.TEAMS = {'coala newcomers': self.mock_team}
+        labhub.invites.delay = 60
+        labhub.send = Mock()
+        self.mock_team.iter_members.return_value = [Mock(login='meet')]
+        self.mock_team.is_member.return_value = False
+
+        for user in ('meet', 'sils', 'Sils'):
+            labhub.hello_world(Mock(frm=Mock(nick=user)), None)
+        labhub.invites.flush()
+        self.mock_team.invite.assert_called_once_with('sils')
+        self.assertEqual(labhub.send.call_count, 1)
+        self.mock_team.is_member.assert_not_called()
+
+        labhub.hello_world(Mock(frm=Mock(nick='jay')), None)
+        labhub.invites.flush()
+        self.mock_team.is_member.assert_called_once_with('jay')
+        self.mock_team.invite.assert_called_with('jay')
+
+        # the teams didn't load in time
+        labhub.discovery = Mock()
+        labhub.discovery.wait.return_value = False
+        labhub.hello_world(Mock(frm=Mock(nick='sam')), None)
+        with self.assertLogs('plugins.invites', 'ERROR'):
+            labhub.invites.flush()
+        labhub.discovery.wait.assert_called_once_with(
+            'teams', timeout=labhub.DISCOVERY_TIMEOUT)
+        self.assertEqual(self.mock_team.invite.call_count, 2)
+        self.assertTrue(labhub.invites.submit('sam'))
@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import Mock, create_autospec
+
+import github3
+
+from plugins.membership import MemberCache
+
+
+class TestMemberCache(unittest.TestCase):
+
+    def setUp(self):
+        self.team = create_autospec(github3.orgs.Team)
+        self.team.iter_members.return_value = [Mock(login='Meet'),
+                                               Mock(login='sils')]
+        self.team.is_member.return_value = False
+        self.groups = {'coala newcomers': self.team}
+        self.members = MemberCache(lambda: self.groups)
+
+    def test_is_member(self):
+        self.assertTrue(self.members.is_member('coala newcomers', 'meet'))
+        self.assertTrue(self.members.is_member('coala newcomers', 'sils'))
+        self.team.is_member.assert_not_called()
+        self.assertEqual(self.team.iter_members.call_count, 1)
+
+        # misses are checked with the API
+        self.assertFalse(self.members.is_member('coala newcomers', 'jay'))
+        self.team.is_member.return_value = True
+        self.assertTrue(self.members.is_member('coala newcomers', 'jay'))
+        self.assertEqual((self.members.hits, self.members.misses), (2, 2))
+
+        with self.assertRaises(KeyError):
+            self.members.is_member('coala maintainers', 'meet')
+
+    def test_refresh(self):
+        self.members.refresh()
+        self.members.add('coala newcomers', 'Jay')
+        self.members.add('coala developers', 'jay')
+        self.assertTrue(self.members.is_member('coala newcomers', 'jay'))
+
+        self.team.iter_members.return_value = [Mock(login='jay')]
+        self.members.refresh()
+        self.assertFalse(self.members.is_member('coala newcomers', 'meet'))
+
+        self.team.iter_members.side_effect = RuntimeError
+        with self.assertLogs('plugins.membership', 'ERROR'):
+            self.members.refresh()
+        self.assertTrue(self.members.is_member('coala newcomers', 'jay'))
+
+    def test_unknown_user(self):
+        self.assertFalse(self.members.is_member('coala newcomers', None))
+        self.team.is_member.assert_called_once_with(None)
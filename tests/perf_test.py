@@ -0,0 +1,38 @@
+import os
+
+pytest_plugins = ['errbot.backends.test']
+
+extra_plugin_dir = 'plugins'
+
+
+def test_perf_stats(testbot):
+    testbot.assertCommand('!perf stats ship_it', 'No command was run yet.')
+    testbot.push_message('!ship it')
+    testbot.pop_message()
+    testbot.assertCommand('!perf stats ship_it',
+                          'ship_it.ship_it: 1 calls, 0 errors, p50 ')
+    testbot.push_message('!perf stats')
+    stats = testbot.pop_message()
+    assert 'Triggers.callback_message: ' in stats
+    assert 'Perf.perf_stats: ' in stats
+
+
+def test_perf_http(testbot):
+    testbot.assertCommand('!perf http coatils', 'No HTTP request')
+    plugin = testbot.bot.plugin_manager.get_plugin_obj_by_name('Perf')
+    plugin.traffic.record('https://webservices.coala.io/list/bears', 0, 0, 1)
+    testbot.assertCommand('!perf http',
+                          'background webservices.coala.io: 1 requests')
+    plugin.save_traffic()
+    assert plugin['http traffic'] == plugin.traffic.dump()
+
+
+def test_profile(testbot):
+    testbot.assertCommand('!profile no such command', 'There is no command')
+    testbot.push_message('!profile ship it')
+    assert 'http' in testbot.pop_message()
+    summary = testbot.pop_message()
+    assert summary.startswith('ship_it took ')
+    assert '(ship_it)' in summary
+    path = summary.split('saved to ')[1].split('\n')[0]
+    assert os.path.exists(path) and path.endswith('.pstats')
@@ -0,0 +1,52 @@
+import re
+import threading
+import unittest
+from unittest.mock import Mock
+
+from plugins import profiling
+
+
+def regex_command(pattern):
+    handler = Mock()
+    handler._err_command_re_pattern = re.compile(pattern)
+    return handler
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_find_command(self):
+        bot = Mock(_gbl=threading.RLock())
+        bot.commands = {'bear': 'bear', 'bear_stats': 'bear stats'}
+        bot.re_commands = {'ghetto': regex_command(r'ghetto\s+(.+)')}
+
+        self.assertEqual(profiling.find_command(bot, 'bear stats python'),
+                         ('bear_stats', 'bear stats', 'python'))
+        self.assertEqual(profiling.find_command(bot, ' bear'),
+                         ('bear', 'bear', ''))
+        name, handler, match = profiling.find_command(bot, 'ghetto hi yo')
+        self.assertEqual((name, match.group(1)), ('ghetto', 'hi yo'))
+        self.assertIsNone(profiling.find_command(bot, 'nothing'))
+
+    def test_profile(self):
+        def lines(msg, arg):
+            yield arg
+            yield ''
+            yield sorted(range(1000))[-1]
+
+        replies, stats, seconds = profiling.profile(lines, None, 'first')
+        self.assertEqual(replies, ['first', 999])
+        self.assertGreaterEqual(seconds, 0)
+        top = profiling.top(stats, 2)
+        self.assertEqual(len(top), 3)
+        self.assertTrue(top[0].startswith('cumulative'))
+        self.assertIn('(lines)', top[1] + top[2])
+
+    def test_profile_failure(self):
+        def fail(msg, arg):
+            raise ValueError(arg)
+
+        replies, _, _ = profiling.profile(fail, None, 'oops')
+        self.assertEqual(replies, ['The command failed: {!r}'.format(
+            ValueError('oops'))])
+        replies, _, _ = profiling.profile(lambda msg, arg: arg, None, 'hi')
+        self.assertEqual(replies, ['hi'])
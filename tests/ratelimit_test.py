@@ -0,0 +1,157 @@
+import io
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from plugins.ratelimit import Budget, RateLimited, Scheduler
+
+URL = 'https://api.github.com/orgs/coala/repos?access_token=abc'
+
+
+def response(status=200, **headers):
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers.update(headers)
+    resp.raw = io.BytesIO(b'{}')
+    return resp
+
+
+class TestBudget(unittest.TestCase):
+
+    def test_token_bucket(self):
+        budget = Budget(rate=10, burst=2)
+        self.assertEqual(budget.delay(False, 0.5), 0)
+        budget.take()
+        budget.take()
+        self.assertAlmostEqual(budget.delay(False, 0.5), 0.1, places=1)
+        # background requests leave half of the bucket
+        self.assertAlmostEqual(budget.delay(True, 0.5), 0.2, places=1)
+        self.assertEqual(budget.stats(),
+                         'no rate limit known, 2 requests, 0 waited, '
+                         '0 retried')
+
+    def test_rate_limit(self):
+        budget = Budget(rate=1000, burst=10)
+        reset = int(time.time()) + 60
+        budget.update({'X-RateLimit-Remaining': '10',
+                       'X-RateLimit-Limit': '100',
+                       'X-RateLimit-Reset': str(reset)})
+        self.assertEqual(budget.delay(False, 0.2), 0)
+        self.assertGreater(budget.delay(True, 0.2), 50)
+        self.assertIn('10/100 left, resets in', budget.stats())
+
+        budget.update({'RateLimit-Remaining': '0'})
+        self.assertEqual((budget.remaining, budget.limit), (0, 100))
+        # the reset passed, the remaining count is outdated
+        self.assertEqual(budget.delay(False, 0.2), 0)
+        budget.update({})
+        self.assertEqual(budget.remaining, 0)
+
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = Scheduler(rate=1000, burst=10, reserve=0.2,
+                                   max_wait=1, backoff=0)
+        self.session = self.scheduler.session()
+
+    def test_key(self):
+        token = requests.Request('GET', URL).prepare()
+        header = requests.Request('GET', 'https://api.github.com/user',
+                                  headers={'Authorization': 'token abc'}
+                                  ).prepare()
+        gitlab = requests.Request(
+            'GET', 'https://gitlab.com/api/v4/projects?private_token=abc'
+        ).prepare()
+        anonymous = requests.Request('GET', 'https://gitlab.com/').prepare()
+        self.assertEqual(self.scheduler.key(token),
+                         self.scheduler.key(header))
+        self.assertEqual(self.scheduler.key(gitlab)[0], 'gitlab.com')
+        self.assertEqual(self.scheduler.key(gitlab)[1],
+                         self.scheduler.key(token)[1])
+        self.assertEqual(self.scheduler.key(anonymous),
+                         ('gitlab.com', 'anonymous'))
+
+    @patch.object(HTTPAdapter, 'send')
+    def test_send(self, send):
+        self.assertEqual(self.scheduler.stats(), 'No API request was sent yet.')
+        send.return_value = response(**{
+            'X-RateLimit-Remaining': '42', 'X-RateLimit-Limit': '50',
+            'X-RateLimit-Reset': str(int(time.time()) + 60)})
+        self.session.get(URL)
+        self.assertIn('api.github.com (', self.scheduler.stats())
+        self.assertIn('42/50 left', self.scheduler.stats())
+
+    @patch.object(HTTPAdapter, 'send')
+    def test_retry(self, send):
+        send.side_effect = [response(502), response(429, **{'Retry-After': '0'}),
+                            response(200)]
+        self.assertEqual(self.session.get(URL).status_code, 200)
+        self.assertEqual(send.call_count, 3)
+        self.assertIn('3 requests, 0 waited, 2 retried',
+                      self.scheduler.stats())
+
+        # not idempotent
+        send.side_effect = [response(502), response(200)]
+        self.assertEqual(self.session.post(URL).status_code, 502)
+
+        send.side_effect = [response(502) for _ in range(4)]
+        self.assertEqual(self.session.get(URL).status_code, 502)
+
+        send.side_effect = [response(404)]
+        self.assertEqual(self.session.get(URL).status_code, 404)
+
+    @patch.object(HTTPAdapter, 'send')
+    def test_retry_after(self, send):
+        # longer than chat commands wait
+        send.side_effect = [response(503, **{'Retry-After': '120'})]
+        with self.assertRaisesRegex(RateLimited, 'another 120 seconds'):
+            self.session.get(URL)
+        self.assertEqual(send.call_count, 1)
+
+        # background requests wait however long it takes
+        send.side_effect = [response(503, **{'Retry-After': '120'}),
+                            response(200)]
+        with patch('time.sleep') as sleep, self.scheduler.background():
+            self.assertEqual(self.session.get(URL).status_code, 200)
+        sleep.assert_called_once_with(120)
+
+    @patch.object(HTTPAdapter, 'send')
+    def test_exhausted(self, send):
+        send.return_value = response(403, **{
+            'X-RateLimit-Remaining': '0', 'X-RateLimit-Limit': '50',
+            'X-RateLimit-Reset': str(int(time.time()) + 60)})
+        with self.assertRaisesRegex(RateLimited,
+                                    'rate limit of api.github.com'):
+            self.session.get(URL)
+        self.assertEqual(send.call_count, 1)
+
+    @patch.object(HTTPAdapter, 'send')
+    def test_background_waits(self, send):
+        reset = time.time() + 0.5
+        send.return_value = response(**{
+            'X-RateLimit-Remaining': '1', 'X-RateLimit-Limit': '50',
+            'X-RateLimit-Reset': str(reset)})
+        self.session.get(URL)
+
+        # the last request is left to the chat commands
+        done = threading.Event()
+
+        def background():
+            with self.scheduler.background():
+                self.session.get(URL)
+            done.set()
+
+        send.return_value = response()
+        thread = threading.Thread(target=background)
+        thread.start()
+        self.assertFalse(done.wait(0.1))
+        self.session.get(URL)
+        thread.join(5)
+        self.assertTrue(done.is_set())
+        self.assertGreaterEqual(time.time(), int(reset))
+        self.assertNotIn(' 0 waited', self.scheduler.stats())
@@ -0,0 +1,135 @@
+import unittest
+from unittest.mock import Mock
+
+import requests
+
+from plugins.repositories import (GitHubRepoSync, GitLabRepoSync, Record,
+                                  Registry)
+
+
+def page(repos, next_url=None):
+    response = Mock()
+    response.json.return_value = repos
+    response.links = {'next': {'url': next_url}} if next_url else {}
+    return response
+
+
+def github(name, updated, push=True):
+    return {'id': hash(name), 'full_name': name, 'updated_at': updated,
+            'permissions': {'push': push}}
+
+
+def names(repos):
+    return {path: record.full_name for path, record in repos.items()}
+
+
+class TestRepoSync(unittest.TestCase):
+
+    def setUp(self):
+        self.token = Mock(parameter={'access_token': 'abc'})
+        self.session = Mock()
+        self.sync = GitHubRepoSync(self.token, 'coala', self.session,
+                                   full_every=3600)
+
+    def test_full(self):
+        self.session.get.side_effect = [
+            page([github('coala/a', '2018-01-03T00:00:00Z'),
+                  github('coala/b', '2018-01-02T00:00:00Z', push=False)],
+                 next_url='https://api.github.com/next'),
+            page([github('other/c', '2018-01-01T00:00:00Z')]),
+        ]
+        repos = self.sync.sync()
+        self.assertEqual(names(repos), {'coala/a': 'coala/a'})
+        self.assertEqual(repos['coala/a'].host, 'github')
+        self.assertEqual(repos['coala/a'].id, hash('coala/a'))
+        self.assertEqual(self.sync.listed, 3)
+        self.assertEqual(self.sync.since, '2018-01-03T00:00:00Z')
+
+        first, second = self.session.get.call_args_list
+        self.assertEqual(first[0][0], 'https://api.github.com/orgs/coala/repos')
+        self.assertEqual(first[1]['params'],
+                         {'sort': 'updated', 'direction': 'desc',
+                          'per_page': 100, 'access_token': 'abc'})
+        self.assertEqual(second[0][0], 'https://api.github.com/next')
+        self.assertIsNone(second[1]['params'])
+
+    def test_incremental(self):
+        self.session.get.return_value = page([
+            github('coala/a', '2018-01-02T00:00:00Z'),
+            github('coala/b', '2018-01-01T00:00:00Z')])
+        before = self.sync.sync()
+
+        self.session.get.reset_mock()
+        self.session.get.return_value = page([
+            github('coala/c', '2018-01-03T00:00:00Z'),
+            github('coala/a', '2018-01-02T00:00:00Z', push=False),
+            github('coala/b', '2018-01-01T00:00:00Z')],
+            next_url='https://api.github.com/next')
+        after = self.sync.sync()
+        # the listing stopped at the first repository seen before
+        self.session.get.assert_called_once()
+        self.assertEqual(self.sync.listed, 2)
+        self.assertEqual(names(after), {'coala/b': 'coala/b',
+                                        'coala/c': 'coala/c'})
+        self.assertEqual(self.sync.since, '2018-01-03T00:00:00Z')
+        # the previous dict isn't changed
+        self.assertEqual(names(before), {'coala/a': 'coala/a',
+                                         'coala/b': 'coala/b'})
+
+        # deleted repositories are dropped by full listings
+        self.session.get.return_value = page([
+            github('coala/c', '2018-01-03T00:00:00Z')])
+        self.assertEqual(names(self.sync.sync(full=True)),
+                         {'coala/c': 'coala/c'})
+        self.sync.full_every = 0
+        self.session.get.return_value = page([])
+        self.assertEqual(self.sync.sync(), {})
+
+    def test_failure(self):
+        self.session.get.return_value = page([
+            github('coala/a', '2018-01-02T00:00:00Z')])
+        self.sync.sync()
+        self.session.get.return_value.raise_for_status.side_effect = (
+            requests.HTTPError)
+        with self.assertRaises(requests.HTTPError):
+            self.sync.sync(full=True)
+        self.assertEqual(names(self.sync.repos), {'coala/a': 'coala/a'})
+
+    def test_gitlab(self):
+        sync = GitLabRepoSync(Mock(parameter={}), 'coala', self.session,
+                              full_every=3600)
+        self.session.get.return_value = page([
+            {'id': 1, 'path_with_namespace': 'coala/sub/a',
+             'last_activity_at': '2018-01-01T00:00:00.000Z'}])
+        self.assertEqual(names(sync.sync()), {'coala/sub/a': 'coala/sub/a'})
+        self.assertEqual(self.session.get.call_args[0][0],
+                         'https://gitlab.com/api/v4/projects')
+
+
+class TestRegistry(unittest.TestCase):
+
+    def test_routing(self):
+        registry = Registry(
+            [(('github', 'coala/a'), Record('github', 'coala/a')),
+             (('gitlab', 'coala/a'), Record('gitlab', 'coala/a')),
+             (('gitlab', 'coala/Sub/b'), Record('gitlab', 'coala/Sub/b', 3))],
+            lambda record: '{} {}'.format(
+                record.host, record.full_name.split('/')[-1].lower()))
+        self.assertEqual(len(registry), 3)
+        self.assertEqual(registry['GitHub', 'coala/a'], 'github a')
+        self.assertEqual(registry['gitlab', 'coala/a/'], 'gitlab a')
+        self.assertEqual(registry['gitlab', 'coala/sub/b'], 'gitlab b')
+        with self.assertRaises(KeyError):
+            registry['github', 'coala/sub/b']
+        with self.assertRaises(KeyError):
+            registry['github', 'coala/b']
+
+        self.assertEqual([record.host for record in registry.named('A')],
+                         ['github', 'gitlab'])
+        self.assertEqual([record.full_name for record in registry.named('b')],
+                         ['coala/Sub/b'])
+        self.assertEqual(registry.named('c'), [])
+        self.assertEqual(registry.record(('gitlab', 'coala/sub/b')).id, 3)
+        self.assertEqual(repr(registry.record(('github', 'coala/a'))),
+                         "Record('github', 'coala/a', None)")
+        self.assertEqual(Registry(), {})
@@ -0,0 +1,38 @@
+import unittest
+
+import requests_mock
+
+from plugins import constants, sessions
+from plugins.sessions import PooledSession
+
+
+class TestPooledSession(unittest.TestCase):
+
+    def test_timeout(self):
+        session = PooledSession(timeout=(1, 2), retries=3, pool_size=4)
+        with requests_mock.Mocker(session=session) as m:
+            m.get('http://example.com', text='hi')
+            session.get('http://example.com')
+            self.assertEqual(m.last_request.timeout, (1, 2))
+            session.get('http://example.com', timeout=5)
+            self.assertEqual(m.last_request.timeout, 5)
+
+    def test_adapter(self):
+        session = PooledSession(timeout=(1, 2), retries=3, pool_size=4)
+        adapter = session.get_adapter('https://api.gitmate.io')
+        self.assertIs(adapter, session.get_adapter('http://gizoogle.net'))
+        self.assertEqual(adapter._pool_maxsize, 4)
+        self.assertEqual(adapter.max_retries.total, 3)
+        self.assertEqual(adapter.max_retries.status_forcelist,
+                         PooledSession.RETRY_STATUSES)
+        # requests which may have had an effect aren't retried
+        self.assertFalse(adapter.max_retries._is_method_retryable('POST'))
+        self.assertTrue(adapter.max_retries._is_method_retryable('GET'))
+
+    def test_shared(self):
+        self.assertIs(sessions.shared(), sessions.shared())
+        self.assertEqual(sessions.shared().timeout,
+                         (constants.HTTP_CONNECT_TIMEOUT,
+                          constants.HTTP_READ_TIMEOUT))
+        self.assertEqual(sessions.timeout(60),
+                         (constants.HTTP_CONNECT_TIMEOUT, 60))
@@ -0,0 +1,182 @@
+import os
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+from errbot import BotPlugin, botcmd
+
+from plugins.timing import Histogram, Invocation, Recorder, carry, current
+
+
+class Plugin(BotPlugin):
+
+    @botcmd
+    def echo(self, msg, arg):
+        if arg == 'fail':
+            raise ValueError(arg)
+        return arg
+
+    @botcmd
+    def lines(self, msg, arg):
+        yield 'first'
+        if arg == 'fail':
+            raise ValueError(arg)
+        yield 'second'
+
+    def callback_message(self, msg):
+        pass
+
+
+class TestInvocation(unittest.TestCase):
+
+    def test_nested(self):
+        self.assertIsNone(current())
+        with Invocation('Coatils', 'run') as outer:
+            with Invocation('Coatils', 'run_more') as inner:
+                self.assertIs(current(), inner)
+            self.assertIs(current(), outer)
+        self.assertIsNone(current())
+
+    def test_carry_on_threads(self):
+        entered = threading.Barrier(2)
+        seen = {}
+
+        with Invocation('LabHub', 'mark'):
+            job = carry(lambda: entered.wait(5))
+
+        def run(name):
+            with Invocation('Perf', name) as outer:
+                job()
+                seen[name] = current() is outer
+
+        threads = [threading.Thread(target=run, args=(name,))
+                   for name in ('profile', 'perf_stats')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(seen, {'profile': True, 'perf_stats': True})
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_percentile(self):
+        histogram = Histogram()
+        self.assertIsNone(histogram.percentile(50))
+        for seconds in [0.0001] * 50 + [0.1] * 45 + [2] * 4 + [7200]:
+            histogram.add(seconds)
+        self.assertEqual(histogram.count, 100)
+        self.assertEqual(histogram.percentile(50), 0.001)
+        # bounds of the buckets, at most 25% above
+        self.assertTrue(0.1 <= histogram.percentile(95) <= 0.125)
+        self.assertTrue(2 <= histogram.percentile(99) <= 2.5)
+        self.assertEqual(histogram.percentile(100), 7200)
+        self.assertEqual(len(histogram.counts), Histogram.BUCKETS + 1)
+
+
+class TestRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.recorder = Recorder()
+        self.plugin = Plugin(Mock(), 'Plugin')
+        self.recorder.instrument(self.plugin)
+
+    def test_of(self):
+        bot = Mock(spec=[])
+        self.assertIs(Recorder.of(bot), Recorder.of(bot))
+        self.assertIsNot(Recorder.of(bot), Recorder.of(Mock(spec=[])))
+
+    def test_function(self):
+        self.assertEqual(self.plugin.echo(None, 'hi'), 'hi')
+        with self.assertRaises(ValueError):
+            self.plugin.echo(None, 'fail')
+        self.plugin.callback_message(None)
+
+        echo = self.recorder.timings('Plugin', 'echo')
+        self.assertEqual((echo.latency.count, echo.errors), (2, 1))
+        self.assertEqual(echo.first.count, 0)
+        self.assertEqual(self.plugin.echo._err_command_name, 'echo')
+        callback = self.recorder.timings('Plugin', 'callback_message')
+        self.assertEqual(callback.latency.count, 1)
+
+    def test_generator(self):
+        with patch('time.perf_counter', side_effect=[0, 1, 3]):
+            self.assertEqual(list(self.plugin.lines(None, '')),
+                             ['first', 'second'])
+        lines = self.recorder.timings('Plugin', 'lines')
+        self.assertEqual(lines.first.max, 1)
+        self.assertEqual(lines.latency.max, 3)
+
+        replies = self.plugin.lines(None, 'fail')
+        next(replies)
+        with self.assertRaises(ValueError):
+            next(replies)
+        self.assertEqual((lines.latency.count, lines.errors), (2, 1))
+        self.assertEqual(lines.first.count, 2)
+
+        # replies the caller didn't read
+        closed = []
+
+        def unread(self, msg, arg):
+            try:
+                yield 'first'
+                yield 'second'
+            finally:
+                closed.append(current())
+        replies = Recorder.timed(unread, lines)(self.plugin, None, '')
+        next(replies)
+        replies.close()
+        self.assertEqual(len(closed), 1)
+        self.assertEqual(closed[0].name, 'lines')
+
+    def test_instrument(self):
+        echo = self.plugin.echo
+        self.recorder.instrument(self.plugin)
+        self.assertIs(self.plugin.echo.__func__, echo.__func__)
+
+        self.assertFalse(Recorder.corobo(self.plugin))
+
+    def test_install(self):
+        bot = Mock()
+        inject = bot.inject_commands_from
+        plugin, other = Plugin(bot, 'Plugin'), Plugin(bot, 'Other')
+        bot.plugin_manager.get_all_active_plugin_objects.return_value = [
+            plugin]
+        with patch('plugins.timing.PLUGINS_DIR', os.path.dirname(__file__)):
+            self.recorder.install(bot)
+            self.recorder.install(bot)
+        bot.remove_commands_from.assert_called_once_with(plugin)
+        inject.assert_called_once_with(plugin)
+        self.assertTrue(plugin.echo.timed)
+
+        # plugins activated later, which aren't corobo's here
+        bot.inject_commands_from(other)
+        inject.assert_called_with(other)
+        self.assertFalse(hasattr(other.echo, 'timed'))
+
+        bot.plugin_manager.get_all_active_plugin_objects.return_value = [
+            plugin, other]
+        self.recorder.uninstall(bot)
+        self.recorder.uninstall(bot)
+        self.assertIs(bot.inject_commands_from, inject)
+        self.assertFalse(hasattr(plugin.echo, 'timed'))
+        self.assertEqual(bot.remove_commands_from.call_count, 2)
+        inject.assert_called_with(plugin)
+        self.assertEqual(inject.call_count, 3)
+        self.assertFalse(self.recorder.installed)
+
+    def test_stats(self):
+        self.assertEqual(self.recorder.stats(), '')
+        # lines is clearly slower, so that it's listed first
+        with patch('time.perf_counter', side_effect=[0, 0.001, 0, 0.1, 0.2]):
+            self.plugin.echo(None, 'hi')
+            self.plugin.lines(None, '')
+            list(self.plugin.lines(None, ''))
+        stats = self.recorder.stats('plugin').split('\n')
+        self.assertEqual(len(stats), 2)
+        self.assertIn('Plugin.lines: 1 calls, 0 errors, p50 ', stats[0])
+        self.assertIn('first reply p50', stats[0])
+        self.assertRegex(stats[1],
+                         r'^Plugin.echo: 1 calls, 0 errors, p50 [\d.]+ ms, '
+                         r'p95 [\d.]+ ms, p99 [\d.]+ ms$')
+        self.assertEqual(self.recorder.stats('other'), '')
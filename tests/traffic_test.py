@@ -0,0 +1,124 @@
+import unittest
+from unittest.mock import Mock, patch
+import urllib.request
+
+from requests.adapters import HTTPAdapter
+
+from plugins import sessions
+from plugins.ratelimit import Scheduler
+from plugins.timing import Invocation, carry
+from plugins.traffic import CountingAdapter, Traffic, counted
+
+
+class TestTraffic(unittest.TestCase):
+
+    def setUp(self):
+        self.traffic = Traffic()
+
+    def test_record(self):
+        with Invocation('LabHub', 'assign_cmd') as invocation:
+            for _ in range(3):
+                self.traffic.record('https://api.github.com/graphql', 10,
+                                    1000, 0.1)
+            self.traffic.record('https://gitlab.com/api', 0, 0, 0.2,
+                                failed=True)
+        with Invocation('LabHub', 'assign_cmd'):
+            self.traffic.record('https://api.github.com/graphql', 10, 1000,
+                                0.1)
+        self.traffic.record('https://api.github.com/orgs', 0, 500, 0.5)
+        self.assertEqual(invocation.counts,
+                         {'api.github.com': 3, 'gitlab.com': 1})
+
+        dump = self.traffic.dump()
+        self.assertEqual(dump['LabHub', 'assign_cmd', 'api.github.com'], {
+            'requests': 4, 'errors': 0, 'sent': 40, 'received': 4000,
+            'seconds': 0.4, 'invocations': 2, 'most': 3})
+        self.assertEqual(dump['LabHub', 'assign_cmd', 'gitlab.com']['errors'],
+                         1)
+        self.assertEqual(dump[None, None, 'api.github.com']['invocations'],
+                         0)
+        # restored from a dump
+        self.assertEqual(Traffic(dump).dump(), dump)
+
+    def test_stats(self):
+        self.assertEqual(self.traffic.stats(), '')
+        with Invocation('LabHub', 'assign_cmd'):
+            self.traffic.record('https://api.github.com/a', 1000, 2000, 0.1)
+            self.traffic.record('https://api.github.com/b', 1000, 2000, 0.3)
+        self.traffic.record('https://gitlab.com/a', 0, 0, 0.1)
+        self.assertEqual(self.traffic.stats().split('\n'), [
+            'LabHub.assign_cmd api.github.com: 2 requests in 1 calls (at '
+            'most 2), 0 errors, 2.0 kB sent, 4.0 kB received, 200.0 ms per '
+            'request',
+            'background gitlab.com: 1 requests, 0 errors, 0.0 kB sent, '
+            '0.0 kB received, 100.0 ms per request'])
+        self.assertEqual(self.traffic.stats('labhub').count('\n'), 0)
+        self.assertEqual(self.traffic.stats('other'), '')
+
+    def test_carry(self):
+        self.assertIs(carry(print), print)
+        with Invocation('Coatils', 'run'):
+            run = carry(lambda: self.traffic.record('http://x.org/', 0, 0, 0))
+        run()
+        self.assertIn(('Coatils', 'run', 'x.org'), self.traffic.dump())
+
+    def test_install(self):
+        opener = urllib.request._opener
+        other = Traffic()
+        self.traffic.install()
+        other.install()
+        self.assertIs(Traffic.active, other)
+        # nothing outside the plugins is patched
+        self.assertIs(HTTPAdapter.send, HTTPAdapter.__dict__['send'])
+        self.assertIs(urllib.request._opener, opener)
+        self.traffic.uninstall()
+        self.assertIs(Traffic.active, other)
+        other.uninstall()
+        self.assertIsNone(Traffic.active)
+
+
+class TestHooks(unittest.TestCase):
+
+    def setUp(self):
+        self.traffic = Traffic()
+        self.traffic.install()
+
+    def tearDown(self):
+        self.traffic.uninstall()
+
+    @patch.object(HTTPAdapter, 'send')
+    def test_adapter(self, send):
+        send.return_value = Mock(status_code=404, content=b'abc',
+                                 headers={'Content-Length': '10'})
+        adapter = CountingAdapter()
+        request = Mock(url='https://gitlab.com/a', body='{}')
+        self.assertIs(adapter.send(request), send.return_value)
+        adapter.send(request, stream=True)
+        send.side_effect = ConnectionError
+        with self.assertRaises(ConnectionError):
+            adapter.send(Mock(url='https://gitlab.com/a', body=None))
+
+        usage = self.traffic.dump()[None, None, 'gitlab.com']
+        self.assertEqual((usage['requests'], usage['errors'], usage['sent'],
+                          usage['received']), (3, 3, 4, 13))
+
+    def test_sessions(self):
+        for session in (sessions.shared(), Scheduler(
+                rate=1, burst=1, reserve=0, max_wait=0).session()):
+            self.assertIsInstance(session.get_adapter('https://x.org'),
+                                  CountingAdapter)
+
+    def test_counted(self):
+        url = 'https://api.wolframalpha.com/v2/query'
+        with counted(url):
+            pass
+        with self.assertRaises(ValueError), counted(url):
+            raise ValueError
+        usage = self.traffic.dump()[None, None, 'api.wolframalpha.com']
+        self.assertEqual((usage['requests'], usage['errors']), (2, 1))
+
+        self.traffic.uninstall()
+        with counted(url):
+            pass
+        self.assertEqual(self.traffic.dump()[
+            None, None, 'api.wolframalpha.com']['requests'], 2)
@@ -0,0 +1,13 @@
+pytest_plugins = ['errbot.backends.test']
+
+extra_plugin_dir = 'plugins'
+
+
+def test_triggers(testbot):
+    testbot.assertCommand('!triggers', '1 messages, 0 searches')
+    testbot.assertCommand('what is a CEP?',
+                          'cEP is always written with a lower case c')
+    testbot.push_message('!triggers')
+    stats = testbot.pop_message()
+    assert 'cEP: 1 searches, 1 matches' in stats
+    assert 'hello world: 0 searches' in stats
@@ -0,0 +1,65 @@
+import os
+import pickle
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import ramlient
+from ramlient import Client
+
+from plugins.webservices import LazyClient, RAML_PATH
+
+
+class TestLazyClient(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def test_lazy(self):
+        with patch.object(Client, 'parse_raml') as parse_raml:
+            client = LazyClient(RAML_PATH)
+            self.assertFalse(parse_raml.called)
+
+        self.assertEqual(client.list.bears.resource.absolute_uri,
+                         'http://webservices.coala.io/list/bears')
+        self.assertIs(client.client, client.client)
+
+    def test_precompiled(self):
+        client = LazyClient(RAML_PATH, cache_dir=self.cache_dir)
+        self.assertEqual(client.base_uri, 'http://webservices.coala.io')
+        artifacts = os.listdir(self.cache_dir)
+        self.assertEqual(len(artifacts), 1)
+        self.assertTrue(artifacts[0].startswith(
+            'webservices.raml-{}-'.format(ramlient.__version__)))
+
+        with patch.object(Client, 'parse_raml') as parse_raml:
+            client = LazyClient(RAML_PATH, cache_dir=self.cache_dir)
+            self.assertEqual(client.contrib.resource.absolute_uri,
+                             'http://webservices.coala.io/contrib/')
+            self.assertFalse(parse_raml.called)
+
+    def test_unusable_cache(self):
+        client = LazyClient(RAML_PATH, cache_dir=self.cache_dir)
+        client.base_uri
+        artifact = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        for content in (b'', pickle.dumps(LazyClient)):
+            with open(artifact, 'wb') as corrupt:
+                corrupt.write(content)
+
+            client = LazyClient(RAML_PATH, cache_dir=self.cache_dir)
+            # e.g. pickled by another version of ramlient
+            with self.assertLogs('plugins.webservices', 'ERROR'):
+                self.assertEqual(client.base_uri,
+                                 'http://webservices.coala.io')
+
+        client = LazyClient(RAML_PATH,
+                            cache_dir=os.path.join(self.cache_dir, 'missing'))
+        with self.assertLogs('plugins.webservices', 'ERROR'):
+            self.assertEqual(client.base_uri, 'http://webservices.coala.io')
+
+    def test_unpicklable(self):
+        client = LazyClient(RAML_PATH, cache_dir=self.cache_dir)
+        with patch('pickle.dump', side_effect=pickle.PicklingError), \
+                self.assertLogs('plugins.webservices', 'ERROR'):
+            self.assertEqual(client.base_uri, 'http://webservices.coala.io')
+        self.assertEqual(os.listdir(self.cache_dir), [])
@@ -1,9 +1,11 @@
 import unittest
 import logging
+from unittest.mock import patch
 
 import vcr
 from errbot.backends.test import TestBot
 
+from plugins import constants, sessions
 from plugins.wolfram_alpha import WolframAlpha
 
 my_vcr = vcr.VCR(match_on=['method', 'scheme', 'host', 'port', 'path'],
@@ -25,3 +27,13 @@ class WolframAlphaTest(unittest.TestCase):
                                        'Dunno')
         self.assertIn('INFO:errbot.plugins.wolfram alpha:KeyError triggered on '
                       'retrieving pods.', cm.output)
+
+    @my_vcr.use_cassette('tests/cassettes/wa.yaml')
+    def test_timeout(self):
+        plugin = self.testbot.bot.plugin_manager.get_plugin_obj_by_name(
+            'wolfram alpha')
+        session = sessions.shared()
+        with patch.object(session, 'get', wraps=session.get) as get:
+            plugin.query('2^6')
+        self.assertEqual(get.call_args[1]['timeout'],
+                         sessions.timeout(constants.WOLFRAM_ALPHA_TIMEOUT))